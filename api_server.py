@@ -9,38 +9,301 @@ import json
 import re
 import threading
 import logging
+import queue
+import gzip
+import time
+import base64
+import hashlib
+import hmac
+import socket
+import selectors
+from email.utils import formatdate, parsedate_to_datetime
 from datetime import datetime, timezone
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 from configparser import ConfigParser
 
+from status import read_status
+from history import get_history_store, DEFAULT_QUERY_LIMIT
+from journal import get_job_journal, JOB_STATES, PENDING_STATES
+from scheduler import active_queue
+from farm import active_coordinator
+from events import event_bus
+from metrics import clip_metrics
+
 # Will be set by start_api_server()
 _config = None
 _base_dir = None
+_control = None
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_PENDING = 32
+DEFAULT_REQUEST_TIMEOUT = 10
+DEFAULT_KEEPALIVE_TIMEOUT = 60
+DEFAULT_MAX_IDLE_CONNECTIONS = 256
+DEFAULT_MAX_EVENT_STREAMS = 32
+
+# Seconds between SSE keep-alive comments when nothing happens
+_EVENT_HEARTBEAT = 15
+
+
+DEFAULT_FOLDER_CACHE_TTL = 5
+# 0: whole listing unless the client asks for ?limit=
+DEFAULT_FOLDER_PAGE_SIZE = 0
+
+# JSON bodies at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = 1024
+
+DEFAULT_LOG_LINES = 100
+MAX_LOG_LINES = 5000
+_LOG_BLOCK_SIZE = 64 * 1024
+_LOG_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)$")
+_LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+def _etag(content: bytes) -> str:
+    return f'W/"{hashlib.blake2b(content, digest_size=12).hexdigest()}"'
+
+
+def _log_entry(header, continuation):
+    entry = {"timestamp": header.group(1), "level": header.group(2), "message": header.group(3).strip()}
+    extra = [line.strip() for line in continuation if line.strip()]
+    if extra:
+        entry["message"] += "\n" + "\n".join(extra)
+    return entry
+
+
+def _reverse_lines(f, end):
+    """Yield the complete lines before byte offset end, last first, reading backwards in blocks."""
+    pos = end
+    tail = b""
+    while pos > 0:
+        size = min(_LOG_BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        chunk = f.read(size) + tail
+        parts = chunk.split(b"\n")
+        # parts[0] may be the second half of a line that starts in an earlier block
+        tail = parts[0]
+        for part in reversed(parts[1:]):
+            if part:
+                yield part
+    if tail:
+        yield tail
+
+
+def _last_newline(f, end):
+    """Return the offset just past the last newline before end."""
+    pos = end
+    while pos > 0:
+        size = min(_LOG_BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        idx = f.read(size).rfind(b"\n")
+        if idx >= 0:
+            return pos + idx + 1
+    return 0
+
+
+def read_log_tail(log_path, lines=DEFAULT_LOG_LINES, min_level=0):
+    """Return (entries, end_offset) for the last `lines` entries at or above min_level."""
+    with open(log_path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        # Ignore a partially written last line; the next ?since= poll picks it up
+        end = _last_newline(f, end)
+        entries = []
+        continuation = []
+        for raw in _reverse_lines(f, end):
+            line = raw.decode('utf-8', errors='replace')
+            match = _LOG_PATTERN.match(line)
+            if not match:
+                continuation.append(line)
+                continue
+            if _LOG_LEVELS[match.group(2)] >= min_level:
+                entries.append(_log_entry(match, reversed(continuation)))
+                if len(entries) >= lines:
+                    break
+            continuation = []
+    entries.reverse()
+    return entries, end
+
+
+def read_log_since(log_path, offset, lines=DEFAULT_LOG_LINES, min_level=0):
+    """
+    Return (entries, next_offset) reading forward from byte offset. Stops
+    after `lines` entries at or above min_level; an offset past the end of the
+    file (log was reset) starts again from the beginning.
+    """
+    entries = []
+    with open(log_path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        if offset > size or offset < 0:
+            offset = 0
+        f.seek(offset)
+        pos = offset
+        current = None  # (match, continuation lines)
+        while True:
+            raw = f.readline()
+            if not raw.endswith(b"\n"):
+                break  # EOF or a line still being written
+            line = raw[:-1].decode('utf-8', errors='replace')
+            match = _LOG_PATTERN.match(line)
+            if match:
+                if current and _LOG_LEVELS[current[0].group(2)] >= min_level:
+                    entries.append(_log_entry(*current))
+                if len(entries) >= lines:
+                    return entries, pos
+                current = (match, [])
+            elif current:
+                current[1].append(line)
+            pos += len(raw)
+        if current and _LOG_LEVELS[current[0].group(2)] >= min_level and len(entries) < lines:
+            entries.append(_log_entry(*current))
+    return entries, pos
+
 
 class IngestAPIHandler(BaseHTTPRequestHandler):
     """HTTP request handler for the Transcoder API."""
 
+    # Keep-alive: every response carries Content-Length, so clients can reuse the connection
+    protocol_version = 'HTTP/1.1'
+    # Socket timeout for reading a request once it has started arriving
+    timeout = DEFAULT_REQUEST_TIMEOUT
+    # Headers and body go out in separate writes; without TCP_NODELAY a kept-alive
+    # connection stalls ~40 ms per response on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+
     def log_message(self, format, *args):
         """Override to use our logging instead of printing to stderr."""
         logging.debug(f"API: {args[0]}")
 
-    def _send_json_response(self, data, status=200):
-        """Send a JSON response."""
-        self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
+    def handle(self):
+        """
+        Serve a single request. A kept-alive connection then goes back to the
+        server's idle selector instead of holding a pool thread until the
+        client's next request.
+        """
+        self.close_connection = True
+        try:
+            self.handle_one_request()
+        except BaseException:
+            self.close_connection = True
+            raise
+
+    def finish(self):
+        if self.close_connection:
+            super().finish()
+        else:
+            # Kept alive: the server parks the connection until the next request
+            self.wfile.flush()
+
+    def resume(self):
+        """Serve the next request on a parked connection (called by the pool)."""
+        try:
+            self.handle()
+        finally:
+            self.finish()
+
+    def _send_cors_headers(self):
+        # Read-only endpoints are open to any origin; state-changing POSTs are not
+        if self.command == 'POST':
+            return
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match, If-Modified-Since')
+        self.send_header('Access-Control-Expose-Headers', 'ETag, Last-Modified, X-Log-Offset')
+
+    def _check_token(self, token, header):
+        """True if token is unset or the request's header matches it; otherwise answers 403."""
+        if not token or hmac.compare_digest(self.headers.get(header, '').encode('utf-8'), token.encode('utf-8')):
+            return True
+        self._send_json_response({"error": f"Missing or invalid {header}"}, 403)
+        return False
+
+    def _authorize_post(self, path):
+        """
+        Refuse state-changing requests a browser sends from another origin (a
+        plain cross-origin POST needs no preflight), then check the shared
+        secret: [Farm] token / X-Farm-Token for farm endpoints, [API] token /
+        X-API-Token for everything else. Answers the request when it refuses.
+        """
+        origin = self.headers.get('Origin')
+        if origin and urlparse(origin).netloc != self.headers.get('Host', ''):
+            self._send_json_response({"error": "Cross-origin requests may not change engine state"}, 403)
+            return False
+        if path.startswith('/api/farm/'):
+            return self._check_token(_config.get('Farm', 'token', fallback=''), 'X-Farm-Token')
+        return self._check_token(_config.get('API', 'token', fallback=''), 'X-API-Token')
+
+    def _is_not_modified(self, etag, last_modified=None):
+        """True if the client's If-None-Match / If-Modified-Since still matches."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            tags = [t.strip() for t in if_none_match.split(',')]
+            return '*' in tags or etag in tags or etag.removeprefix('W/') in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and last_modified is not None:
+            try:
+                return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_not_modified(self, etag, last_modified=None, headers=None):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        if last_modified is not None:
+            self.send_header('Last-Modified', formatdate(last_modified, usegmt=True))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self._send_cors_headers()
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+
+    def _send_json_response(self, data, status=200, headers=None, etag=None, last_modified=None):
+        """
+        Send a JSON response. Successful GETs carry a weak ETag (content hash
+        unless one is given) and answer 304 when the client already has it;
+        bodies of GZIP_MIN_BYTES or more are gzipped if the client accepts it.
+        """
+        body = json.dumps(data).encode('utf-8')
+        headers = dict(headers or {})
+        if status == 200 and self.command == 'GET':
+            etag = etag or _etag(body)
+            if self._is_not_modified(etag, last_modified):
+                self._send_not_modified(etag, last_modified, headers)
+                return
+            headers['ETag'] = etag
+            headers['Cache-Control'] = 'no-cache'
+            if last_modified is not None:
+                headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+            headers['Vary'] = 'Accept-Encoding'
+            if len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body, compresslevel=5)
+                headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self._send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text_response(self, text, content_type='text/plain', status=200):
+        """Send a non-JSON response (Prometheus metrics)."""
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8' if 'charset' not in content_type else content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self._send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
 
     def do_OPTIONS(self):
         """Handle CORS preflight requests."""
         self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
+        self._send_cors_headers()
         self.end_headers()
 
     def do_GET(self):
@@ -52,81 +315,277 @@ class IngestAPIHandler(BaseHTTPRequestHandler):
             if path == '/api/status':
                 self._handle_status()
             elif path == '/api/history':
-                self._handle_history()
+                self._handle_history(parse_qs(parsed.query))
+            elif path == '/api/queue':
+                self._handle_queue(parse_qs(parsed.query))
             elif path == '/api/logs':
-                self._handle_logs()
+                self._handle_logs(parse_qs(parsed.query))
             elif path.startswith('/api/folders/'):
                 folder_name = path.split('/api/folders/')[-1]
-                self._handle_folder(folder_name)
+                self._handle_folder(folder_name, parse_qs(parsed.query))
+            elif path == '/api/control':
+                self._handle_control_state()
+            elif path == '/api/events':
+                self._handle_events(parse_qs(parsed.query))
+            elif path == '/api/farm':
+                self._handle_farm_state()
+            elif path == '/api/metrics':
+                self._send_text_response(clip_metrics.render(), 'text/plain; version=0.0.4')
             elif path == '/api/health':
                 self._send_json_response({"status": "ok"})
             elif path == '/':
-                self._send_json_response({"message": "Transcoder API", "endpoints": ["/api/status", "/api/history", "/api/logs", "/api/folders/{name}", "/api/health"]})
+                self._send_json_response({"message": "Transcoder API", "endpoints": ["/api/status", "/api/queue", "/api/history", "/api/logs", "/api/folders/{name}", "/api/control", "/api/events", "/api/farm", "/api/metrics", "/api/health"]})
             else:
                 self._send_json_response({"error": "Not found"}, 404)
         except Exception as e:
             logging.error(f"API error handling {path}: {e}")
             self._send_json_response({"error": str(e)}, 500)
 
-    def _handle_status(self):
-        """Return current processing status."""
-        status_path = os.path.join(_base_dir, _config['Paths']['status_file'])
-        if not os.path.exists(status_path):
-            self._send_json_response({"status": "idle", "file": "None", "progress": 0, "stage": "Idle"})
+    def do_POST(self):
+        """Handle POST requests (engine control, queue boosts and farm leases)."""
+        parsed = urlparse(self.path)
+        path = parsed.path
+
+        try:
+            # Always read the body so keep-alive clients stay in sync
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b""
+            if not self._authorize_post(path):
+                return
+            if path.startswith('/api/farm/'):
+                self._handle_farm_action(path.split('/api/farm/')[-1], body)
+            elif path.startswith('/api/control/'):
+                self._handle_control_action(path.split('/api/control/')[-1], parse_qs(parsed.query))
+            elif path == '/api/queue/boost':
+                self._handle_queue_boost(parse_qs(parsed.query))
+            else:
+                self._send_json_response({"error": "Not found"}, 404)
+        except Exception as e:
+            logging.error(f"API error handling {path}: {e}")
+            self._send_json_response({"error": str(e)}, 500)
+
+    def _handle_control_state(self):
+        """Return the engine's pause state."""
+        if _control is None:
+            self._send_json_response({"error": "Engine control not available"}, 503)
+            return
+        self._send_json_response(_control.state())
+
+    def _handle_control_action(self, action, params):
+        """Pause (after the current file, or immediately with ?immediate=1) or resume the engine."""
+        if _control is None:
+            self._send_json_response({"error": "Engine control not available"}, 503)
             return
+        if action == 'pause':
+            if params.get('immediate', ['0'])[0].lower() in ('1', 'true', 'yes'):
+                _control.pause()
+            else:
+                _control.request_pause()
+        elif action == 'resume':
+            _control.resume()
+        else:
+            self._send_json_response({"error": f"Unknown control action: {action}"}, 400)
+            return
+        logging.info(f"API control: {action}")
+        self._send_json_response(_control.state())
+
+    def _farm_coordinator(self):
+        """The coordinator if this engine runs one; otherwise answer 503 and return None."""
+        coordinator = active_coordinator()
+        if coordinator is None:
+            self._send_json_response({"error": "This engine is not a farm coordinator"}, 503)
+        return coordinator
+
+    def _handle_farm_state(self):
+        """Return the leases currently held by farm workers."""
+        if not self._check_token(_config.get('Farm', 'token', fallback=''), 'X-Farm-Token'):
+            return
+        coordinator = self._farm_coordinator()
+        if coordinator is not None:
+            self._send_json_response({"lease_seconds": coordinator.lease_seconds, "leases": coordinator.leases()})
+
+    def _handle_farm_action(self, action, body):
+        """lease / heartbeat / complete for farm workers (JSON bodies, see farm.py)."""
+        coordinator = self._farm_coordinator()
+        if coordinator is None:
+            return
+        try:
+            payload = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            self._send_json_response({"error": "Body must be JSON"}, 400)
+            return
+        if action == 'lease':
+            lease = coordinator.lease(str(payload.get('worker') or self.client_address[0]))
+            if lease is None:
+                self.send_response(204)
+                self.end_headers()
+                return
+            self._send_json_response(lease)
+        elif action == 'heartbeat':
+            if coordinator.heartbeat(str(payload.get('lease_id', ''))):
+                self._send_json_response({"lease_seconds": coordinator.lease_seconds})
+            else:
+                self._send_json_response({"error": "Lease expired or unknown"}, 410)
+        elif action == 'complete':
+            succeeded = payload.get('status') == 'succeeded'
+            if coordinator.complete(str(payload.get('lease_id', '')), succeeded, payload.get('error')):
+                self._send_json_response({"ok": True})
+            else:
+                self._send_json_response({"error": "Lease expired or unknown"}, 410)
+        else:
+            self._send_json_response({"error": f"Unknown farm action: {action}"}, 404)
+
+    def _handle_events(self, params):
+        """
+        Server-Sent Events stream of status, queue, history, control and log events.
+        Resumes after the Last-Event-ID header (or ?last_event_id=) on reconnect.
+        """
+        if not self.server.acquire_stream():
+            self._send_json_response({"error": "Too many event streams"}, 503)
+            return
+        last_id = self.headers.get('Last-Event-ID') or params.get('last_event_id', [None])[0]
+        try:
+            last_id = int(last_id) if last_id is not None else None
+        except ValueError:
+            last_id = None
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
 
+        # Stream from a dedicated thread so the handler pool stays free for REST polls
+        self.server.detach(self.request)
+        threading.Thread(target=_stream_events, args=(self.server, self.request, last_id),
+                         name="api-events", daemon=True).start()
+
+    def _handle_status(self):
+        """Return current processing status (served from memory when the engine runs in-process)."""
+        status_path = os.path.join(_base_dir, os.path.expanduser(_config['Paths']['status_file']))
         try:
-            with open(status_path, 'r') as f:
-                data = json.load(f)
-            self._send_json_response(data)
+            self._send_json_response(read_status(status_path))
         except (json.JSONDecodeError, IOError) as e:
             self._send_json_response({"error": f"Error reading status: {e}"}, 500)
 
-    def _handle_history(self):
-        """Return processing history."""
-        history_path = os.path.join(_base_dir, _config['Paths']['history_file'])
-        if not os.path.exists(history_path):
-            self._send_json_response([])
+    def _handle_history(self, params):
+        """
+        Return processing history, newest first.
+        Filters: ?since=&until= (ISO start_time range), ?status=, ?session=, ?limit= (default 100, 0 = all), ?offset=
+        """
+        store = get_history_store(_store_path('history_file'))
+        try:
+            limit = int(params.get('limit', [DEFAULT_QUERY_LIMIT])[0])
+            offset = int(params.get('offset', ['0'])[0])
+        except ValueError:
+            self._send_json_response({"error": "limit and offset must be integers"}, 400)
+            return
+        etag = _etag(f"{store.version()}?{self.path}".encode('utf-8'))
+        if self._is_not_modified(etag):
+            self._send_not_modified(etag)
+            return
+        records = store.query(
+            since=params.get('since', [None])[0],
+            until=params.get('until', [None])[0],
+            status=params.get('status', [None])[0],
+            session=params.get('session', [None])[0],
+            limit=limit,
+            offset=offset,
+        )
+        self._send_json_response(records, etag=etag)
+
+    def _handle_queue(self, params):
+        """
+        Return jobs from the job journal in queue order with per-state counts.
+        ?state=queued,running picks states (default: everything not yet finished).
+        """
+        journal = get_job_journal(_store_path('queue_file'))
+        states = tuple(s.strip().lower() for s in params.get('state', [''])[0].split(',') if s.strip()) or PENDING_STATES
+        unknown = [s for s in states if s not in JOB_STATES]
+        if unknown:
+            self._send_json_response({"error": f"Invalid state: {', '.join(unknown)}"}, 400)
+            return
+        etag = _etag(f"{journal.version()}?{self.path}".encode('utf-8'))
+        if self._is_not_modified(etag):
+            self._send_not_modified(etag)
             return
+        self._send_json_response({"jobs": journal.jobs(states), "counts": journal.counts()}, etag=etag)
 
+    def _handle_queue_boost(self, params):
+        """
+        Move queued clips ahead: ?path= (full path, or a file name matching every
+        queued clip with that name) and ?priority= (default 1, higher first, 0 clears).
+        """
+        engine_queue = active_queue()
+        if engine_queue is None:
+            self._send_json_response({"error": "Engine queue not available"}, 503)
+            return
+        target = params.get('path', [''])[0]
         try:
-            with open(history_path, 'r') as f:
-                data = json.load(f)
-            self._send_json_response(data)
-        except (json.JSONDecodeError, IOError) as e:
-            self._send_json_response({"error": f"Error reading history: {e}"}, 500)
+            priority = int(params.get('priority', ['1'])[0])
+        except ValueError:
+            self._send_json_response({"error": "priority must be an integer"}, 400)
+            return
+        if not target:
+            self._send_json_response({"error": "path is required"}, 400)
+            return
+        matches = [p for p in engine_queue.order() if p == target or os.path.basename(p) == target]
+        if not matches:
+            self._send_json_response({"error": f"Not queued: {target}"}, 404)
+            return
+        for match in matches:
+            engine_queue.boost(match, priority)
+        logging.info(f"API boost: {', '.join(os.path.basename(m) for m in matches)} -> priority {priority}")
+        self._send_json_response({"boosted": matches, "priority": priority, "order": engine_queue.order()})
 
-    def _handle_logs(self):
-        """Return recent log entries."""
-        log_dir = os.path.join(_base_dir, _config['Paths']['logs'])
+    def _handle_logs(self, params):
+        """
+        Return log entries, oldest first.
+        ?lines= (default 100) entries from the end of the log, or from byte
+        offset ?since= forward; ?level= keeps that severity and above. The
+        X-Log-Offset header is the cursor to pass as ?since= next time.
+        """
+        log_dir = os.path.join(_base_dir, os.path.expanduser(_config['Paths']['logs']))
         log_path = os.path.join(log_dir, 'ingest_engine.log')
 
         if not os.path.exists(log_path):
-            self._send_json_response([])
-            return
-
-        logs = []
-        log_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (INFO|WARNING|ERROR) - (.*)$")
-
-        try:
-            with open(log_path, 'r') as f:
-                all_lines = f.readlines()
-                for line in all_lines[-100:]:
-                    match = log_pattern.match(line)
-                    if match:
-                        logs.append({
-                            "timestamp": match.group(1),
-                            "level": match.group(2),
-                            "message": match.group(3).strip()
-                        })
-                    elif logs and line.strip():
-                        logs[-1]["message"] += "\n" + line.strip()
-            self._send_json_response(logs)
+            self._send_json_response([], headers={'X-Log-Offset': '0'})
+            return
+
+        try:
+            lines = min(max(int(params.get('lines', [DEFAULT_LOG_LINES])[0]), 1), MAX_LOG_LINES)
+            since = params.get('since', [None])[0]
+            since = int(since) if since is not None else None
+        except ValueError:
+            self._send_json_response({"error": "lines and since must be integers"}, 400)
+            return
+        min_level = _LOG_LEVELS.get(params.get('level', [''])[0].upper(), 0)
+
+        st = os.stat(log_path)
+        etag = _etag(f"{st.st_size}-{st.st_mtime_ns}?{self.path}".encode('utf-8'))
+        if self._is_not_modified(etag, st.st_mtime):
+            self._send_not_modified(etag, st.st_mtime)
+            return
+        try:
+            if since is None:
+                logs, offset = read_log_tail(log_path, lines, min_level)
+            else:
+                logs, offset = read_log_since(log_path, since, lines, min_level)
+            self._send_json_response(logs, headers={'X-Log-Offset': str(offset)}, etag=etag, last_modified=st.st_mtime)
         except IOError as e:
             self._send_json_response({"error": f"Error reading logs: {e}"}, 500)
 
-    def _handle_folder(self, folder_name):
-        """Return contents of a specific folder."""
+    def _handle_folder(self, folder_name, params):
+        """
+        Return contents of a specific folder.
+        ?ext=.mov,.mxf and ?since= (ISO time or epoch seconds) filter; ?sort=name|mtime|size
+        with ?order=asc|desc; ?limit= and ?cursor= page (next_cursor in the response);
+        ?summary=1 returns only totals.
+        """
         folder_map = {
             "watch": _config.get('Paths', 'watch', fallback=None),
             "processing": _config.get('Paths', 'processing', fallback=None),
@@ -145,23 +604,323 @@ class IngestAPIHandler(BaseHTTPRequestHandler):
             self._send_json_response({"error": f"Path not found: {path}"}, 404)
             return
 
+        sort = params.get('sort', ['name'])[0]
+        if sort not in _FOLDER_SORT_KEYS:
+            self._send_json_response({"error": f"Invalid sort: {sort}"}, 400)
+            return
+        descending = params.get('order', ['asc'])[0].lower() == 'desc'
+        extensions = {e.strip().lower() for e in params.get('ext', [''])[0].split(',') if e.strip()}
+        extensions = {e if e.startswith('.') else f".{e}" for e in extensions}
+        try:
+            since = _parse_since(params.get('since', [None])[0])
+            limit = int(params.get('limit', [_config.getint('API', 'folder_page_size', fallback=DEFAULT_FOLDER_PAGE_SIZE)])[0])
+            cursor = _decode_cursor(params.get('cursor', [None])[0])
+        except ValueError as e:
+            self._send_json_response({"error": f"Invalid parameter: {e}"}, 400)
+            return
+
         try:
-            files_data = []
-            for f_name in os.listdir(path):
-                full_path = os.path.join(path, f_name)
-                if os.path.isfile(full_path) and not f_name.startswith('.'):
-                    stat = os.stat(full_path)
-                    files_data.append({
-                        "name": f_name,
-                        "size": stat.st_size,
-                        "modified_time": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
-                    })
-            self._send_json_response({"folder": folder_name, "files": files_data})
+            entries = _folder_cache.list(path)
         except Exception as e:
             self._send_json_response({"error": f"Error listing folder: {e}"}, 500)
+            return
+
+        if extensions:
+            entries = [e for e in entries if os.path.splitext(e[0])[1].lower() in extensions]
+        if since is not None:
+            entries = [e for e in entries if e[2] >= since]
+
+        if params.get('summary', ['0'])[0].lower() in ('1', 'true', 'yes'):
+            self._send_json_response({
+                "folder": folder_name,
+                "count": len(entries),
+                "total_size": sum(e[1] for e in entries),
+                "latest_modified": _iso(max(e[2] for e in entries)) if entries else None,
+            })
+            return
+
+        key = _FOLDER_SORT_KEYS[sort]
+        entries = sorted(entries, key=key, reverse=descending)
+        total = len(entries)
+        if cursor is not None:
+            if cursor.get("sort") != sort or cursor.get("desc") != descending:
+                self._send_json_response({"error": "cursor belongs to a different sort or order"}, 400)
+                return
+            # Keyset paging: resume after the last item of the previous page
+            after = tuple(cursor["after"])
+            entries = [e for e in entries if (key(e) < after if descending else key(e) > after)]
+        page = entries[:limit] if limit > 0 else entries
+        next_cursor = _encode_cursor(sort, descending, key(page[-1])) if limit > 0 and len(entries) > limit else None
+
+        files_data = [{"name": name, "size": size, "modified_time": _iso(mtime)} for name, size, mtime in page]
+        self._send_json_response({"folder": folder_name, "files": files_data, "total": total, "next_cursor": next_cursor})
+
+
+class FolderListingCache:
+    """
+    scandir listings of API folders, reused for up to ttl seconds as long as
+    the directory's mtime hasn't changed (a file added, removed or renamed).
+    """
+
+    def __init__(self, ttl: float = DEFAULT_FOLDER_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}  # path -> (mtime_ns, fetched_at, [(name, size, mtime)])
+        self._lock = threading.Lock()
+
+    def list(self, path: str) -> list[tuple[str, int, float]]:
+        mtime_ns = os.stat(path).st_mtime_ns
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(path)
+        if cached and cached[0] == mtime_ns and now - cached[1] < self.ttl:
+            return cached[2]
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.name, st.st_size, st.st_mtime))
+        with self._lock:
+            self._entries[path] = (mtime_ns, now, entries)
+        return entries
+
+
+_folder_cache = FolderListingCache()
+
+_FOLDER_SORT_KEYS = {
+    "name": lambda e: (e[0],),
+    "mtime": lambda e: (e[2], e[0]),
+    "size": lambda e: (e[1], e[0]),
+}
+
+
+def _store_path(key: str) -> str:
+    # Opened the way the engine opens it (relative to its cwd), so both share one journal/history store
+    return os.path.expanduser(_config['Paths'][key])
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def _parse_since(value):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.astimezone()
+        return parsed.timestamp()
+
+
+def _encode_cursor(sort: str, descending: bool, key: tuple) -> str:
+    # The sort travels with the key: a name cursor can't be compared with mtimes
+    data = {"sort": sort, "desc": descending, "after": list(key)}
+    return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(value):
+    if not value:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("cursor")
+    if not isinstance(cursor, dict) or not isinstance(cursor.get("after"), list):
+        raise ValueError("cursor")
+    return cursor
+
+
+def _sse(event_type: str, data, event_id: int | None = None) -> bytes:
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{lines}event: {event_type}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+def _stream_events(server, sock, last_id):
+    """Write events to a detached SSE connection until the client goes away."""
+    try:
+        sock.sendall(b"retry: 3000\n\n")
+        if last_id is None:
+            # Fresh client: current state first, then only new events
+            last_id = event_bus.latest_id
+            status_path = os.path.join(_base_dir, os.path.expanduser(_config['Paths']['status_file']))
+            try:
+                sock.sendall(_sse("status", read_status(status_path)))
+            except (json.JSONDecodeError, IOError):
+                pass
+            sock.sendall(_sse("queue", get_job_journal(_store_path('queue_file')).pending()))
+            if _control is not None:
+                sock.sendall(_sse("control", _control.state()))
+        while True:
+            events, reset = event_bus.wait_since(last_id, timeout=_EVENT_HEARTBEAT)
+            if reset:
+                # Missed events are gone; the client should re-fetch the REST endpoints
+                last_id = event_bus.latest_id
+                sock.sendall(_sse("reset", {"latest_id": last_id}, last_id))
+                continue
+            if not events:
+                sock.sendall(b": ping\n\n")
+                continue
+            sock.sendall(b"".join(_sse(event_type, data, event_id) for event_id, event_type, data in events))
+            last_id = events[-1][0]
+    except OSError:
+        pass
+    finally:
+        server.shutdown_request(sock)
+        server.release_stream()
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that handles connections on a fixed pool of handler threads.
+
+    A slow client only ties up one handler thread. Connections beyond
+    max_workers busy + max_pending waiting are answered with 503 instead of
+    queueing without limit. Between requests, keep-alive connections wait in
+    a selector rather than in a handler thread, so clients that poll often
+    can't starve the pool; they are closed after keepalive_timeout idle
+    seconds, oldest first beyond max_idle.
+    """
+
+    def __init__(self, server_address, handler_class, max_workers=DEFAULT_MAX_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 max_event_streams=DEFAULT_MAX_EVENT_STREAMS, keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT,
+                 max_idle=DEFAULT_MAX_IDLE_CONNECTIONS):
+        super().__init__(server_address, handler_class)
+        self.keepalive_timeout = keepalive_timeout
+        self.max_idle = max_idle
+        self._pending = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._stream_slots = threading.BoundedSemaphore(max_event_streams)
+        self._detached = set()
+        # Parked connections are only touched by the idle thread; handlers hand them over here
+        self._to_park = queue.SimpleQueue()
+        self._parked = {}  # socket -> (handler, parked_at), oldest first
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        threading.Thread(target=self._idle_loop, name="api-keepalive", daemon=True).start()
+        for i in range(max_workers):
+            threading.Thread(target=self._handler_loop, name=f"api-{i + 1}", daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self._dispatch(request, client_address, None)
+
+    def _dispatch(self, request, client_address, handler):
+        if self._slots.acquire(blocking=False):
+            self._pending.put((request, client_address, handler))
+            return
+        try:
+            request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        except OSError:
+            pass
+        if handler is not None:
+            self._close_handler(handler)
+        else:
+            self.shutdown_request(request)
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def _handler_loop(self):
+        while True:
+            request, client_address, handler = self._pending.get()
+            keep_alive = False
+            try:
+                if handler is None:
+                    handler = self.finish_request(request, client_address)
+                else:
+                    handler.resume()
+                keep_alive = not handler.close_connection
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                if request in self._detached:
+                    # Now owned by an event stream thread
+                    self._detached.discard(request)
+                elif not keep_alive:
+                    self.shutdown_request(request)
+                self._slots.release()
+            if keep_alive:
+                self._park(handler)
+
+    def _park(self, handler):
+        """Wait for the next request on handler's connection without holding a thread."""
+        try:
+            # Pipelined requests already read into the buffer won't wake the selector
+            handler.connection.setblocking(False)
+            buffered = handler.rfile.peek(1)
+            handler.connection.settimeout(handler.timeout)
+        except OSError:
+            self._close_handler(handler)
+            return
+        if buffered:
+            self._dispatch(handler.connection, handler.client_address, handler)
+        else:
+            self._to_park.put(handler)
+            try:
+                self._wake_w.send(b"\0")
+            except BlockingIOError:
+                pass  # Already woken
+
+    def _idle_loop(self):
+        while True:
+            for key, _ in self._selector.select(timeout=1.0):
+                if key.fileobj is self._wake_r:
+                    try:
+                        self._wake_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._selector.unregister(key.fileobj)
+                handler, _ = self._parked.pop(key.fileobj)
+                self._dispatch(key.fileobj, handler.client_address, handler)
+            while True:
+                try:
+                    handler = self._to_park.get_nowait()
+                except queue.Empty:
+                    break
+                self._parked[handler.connection] = (handler, time.monotonic())
+                self._selector.register(handler.connection, selectors.EVENT_READ)
+            cutoff = time.monotonic() - self.keepalive_timeout
+            for sock, (handler, parked_at) in list(self._parked.items()):
+                if parked_at > cutoff and len(self._parked) <= self.max_idle:
+                    break
+                self._selector.unregister(sock)
+                del self._parked[sock]
+                self._close_handler(handler)
+
+    def _close_handler(self, handler):
+        try:
+            BaseHTTPRequestHandler.finish(handler)
+        except OSError:
+            pass
+        self.shutdown_request(handler.connection)
+
+    def detach(self, request):
+        """Keep a connection open after its handler returns (long-lived event streams)."""
+        self._detached.add(request)
+
+    def acquire_stream(self) -> bool:
+        return self._stream_slots.acquire(blocking=False)
+
+    def release_stream(self):
+        self._stream_slots.release()
+
+    def handle_error(self, request, client_address):
+        logging.debug(f"API connection error from {client_address[0]}", exc_info=True)
 
 
-def start_api_server(config: ConfigParser, base_dir: str, host: str = '0.0.0.0', port: int = 8080):
+def start_api_server(config: ConfigParser, base_dir: str, host: str = '0.0.0.0', port: int = 8080, control=None):
     """
     Start the API server in a background thread.
 
@@ -170,12 +929,22 @@ def start_api_server(config: ConfigParser, base_dir: str, host: str = '0.0.0.0',
         base_dir: Base directory of the ingest engine
         host: Host to bind to (default 0.0.0.0 for all interfaces)
         port: Port to listen on (default 8080)
+        control: The engine's EngineControl, enabling /api/control
     """
-    global _config, _base_dir
+    global _config, _base_dir, _control
     _config = config
     _base_dir = base_dir
+    _control = control
+    _folder_cache.ttl = config.getfloat('API', 'folder_cache_ttl', fallback=DEFAULT_FOLDER_CACHE_TTL)
 
-    server = HTTPServer((host, port), IngestAPIHandler)
+    IngestAPIHandler.timeout = config.getfloat('API', 'request_timeout', fallback=DEFAULT_REQUEST_TIMEOUT)
+    server = PooledHTTPServer(
+        (host, port), IngestAPIHandler,
+        max_workers=config.getint('API', 'max_workers', fallback=DEFAULT_MAX_WORKERS),
+        max_pending=config.getint('API', 'max_pending', fallback=DEFAULT_MAX_PENDING),
+        max_event_streams=config.getint('API', 'max_event_streams', fallback=DEFAULT_MAX_EVENT_STREAMS),
+        keepalive_timeout=config.getfloat('API', 'keepalive_timeout', fallback=DEFAULT_KEEPALIVE_TIMEOUT),
+    )
 
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
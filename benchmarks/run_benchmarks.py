@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the ingest pipeline.
+
+Generates synthetic clips with FFmpeg's testsrc2/sine sources (one per
+container in [Processing] allowed_extensions, plus an ARRI-named MXF that goes
+through a stub art-cmd), runs them through every preset in config.ini and
+reports clips/hour, realtime factor, peak RSS and probe/subprocess counts.
+It also times a CardScanner pass over a synthetic card and the API endpoints.
+
+Results are written as JSON so runs can be compared across engine versions:
+
+    python benchmarks/run_benchmarks.py --ffmpeg /opt/homebrew/bin/ffmpeg --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import statistics
+import http.client
+from datetime import datetime
+from configparser import ConfigParser
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import processor  # noqa: E402
+from pipeline import ClipPipeline  # noqa: E402
+from scanner import CardScanner  # noqa: E402
+from api_server import start_api_server  # noqa: E402
+
+STUB_ART = os.path.join(REPO_ROOT, 'benchmarks', 'stub_art_cmd.py')
+
+# Video/audio codecs FFmpeg can always write into each container
+SYNTHETIC_CODECS = {
+    ".mxf": ["-c:v", "mpeg2video", "-pix_fmt", "yuv422p", "-b:v", "50M", "-c:a", "pcm_s16le"],
+    ".mov": ["-c:v", "prores_ks", "-profile:v", "2", "-c:a", "pcm_s16le"],
+    ".mp4": ["-c:v", "mpeg4", "-q:v", "3", "-c:a", "aac"],
+}
+DEFAULT_CODECS = ["-c:v", "mpeg4", "-q:v", "3", "-c:a", "aac"]
+
+
+class SubprocessCounter:
+    """
+    Counts subprocesses started by the engine, grouped by tool, and records
+    each one's peak RSS from wait4() as it is reaped.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.peak_rss = {}  # tool -> largest ru_maxrss of any one process
+        self._original = subprocess.Popen
+
+    def __enter__(self):
+        counter = self
+        original = self._original
+
+        class CountingPopen(original):
+            def __init__(self, args, *a, **kw):
+                argv0 = args[0] if isinstance(args, (list, tuple)) else str(args).split()[0]
+                tool = os.path.basename(str(argv0))
+                if 'ffprobe' in tool:
+                    tool = 'ffprobe'
+                elif 'ffmpeg' in tool:
+                    tool = 'ffmpeg'
+                elif 'art' in tool:
+                    tool = 'art-cmd'
+                counter.counts[tool] = counter.counts.get(tool, 0) + 1
+                self._bench_tool = tool
+                super().__init__(args, *a, **kw)
+
+            def _wait4(self, pid, flags, _wait4=os.wait4):
+                reaped, sts, usage = _wait4(pid, flags)
+                if reaped == pid:
+                    counter.peak_rss[self._bench_tool] = max(counter.peak_rss.get(self._bench_tool, 0), usage.ru_maxrss)
+                return reaped, sts
+
+            # Popen reaps through waitpid() in both wait() and poll(); use wait4() to get rusage
+            def _try_wait(self, wait_flags):
+                try:
+                    return self._wait4(self.pid, wait_flags)
+                except ChildProcessError:
+                    return self.pid, 0
+
+            def _internal_poll(self, _deadstate=None, **kw):
+                return super()._internal_poll(_deadstate, _waitpid=self._wait4)
+
+        subprocess.Popen = CountingPopen
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen = self._original
+
+
+def _rss_mb(maxrss: int) -> float:
+    # Linux reports KiB, macOS bytes
+    return round(maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024, 1)
+
+
+def _peak_rss_mb(who) -> float:
+    """Process-lifetime high-water mark (RUSAGE_CHILDREN: the largest child reaped so far)."""
+    return _rss_mb(resource.getrusage(who).ru_maxrss)
+
+
+def _engine_version() -> str:
+    try:
+        return subprocess.run(["git", "-C", REPO_ROOT, "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def generate_clips(ffmpeg: str, out_dir: str, extensions, duration: float, size: str, rate: int) -> list[str]:
+    """Write one synthetic clip per extension plus an ARRI-named MXF for the ART path."""
+    os.makedirs(out_dir, exist_ok=True)
+    targets = [(f"BENCH_{ext[1:].upper()}_C001{ext}", ext) for ext in extensions]
+    if ".mxf" in extensions:
+        # Filename is enough for camera detection to pick the ARRI Alexa 35 / ART path
+        targets.append(("BENCH_ARRI_ALEXA35_A001C001.mxf", ".mxf"))
+    clips = []
+    for name, ext in targets:
+        path = os.path.join(out_dir, name)
+        cmd = [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={rate}:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=1000:sample_rate=48000:duration={duration}",
+            *SYNTHETIC_CODECS.get(ext, DEFAULT_CODECS),
+            "-shortest", path,
+        ]
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        clips.append(path)
+    return clips
+
+
+def make_config(base_config: str, workdir: str, ffmpeg: str, art_streaming: bool) -> ConfigParser:
+    config = ConfigParser()
+    config.read(base_config)
+    for key in ('temp', 'output', 'logs'):
+        os.makedirs(os.path.join(workdir, key), exist_ok=True)
+    config['Paths']['art_cli'] = STUB_ART
+    config['Paths']['ffmpeg'] = ffmpeg
+    config['Paths']['temp'] = os.path.join(workdir, 'temp')
+    config['Paths']['output'] = os.path.join(workdir, 'output')
+    config['Paths']['logs'] = os.path.join(workdir, 'logs')
+    config['Paths']['status_file'] = os.path.join(workdir, 'status.json')
+    config['Paths']['history_file'] = os.path.join(workdir, 'history.json')
+    config['Settings']['art_streaming'] = 'true' if art_streaming else 'false'
+    if not config.has_section('Cache'):
+        config.add_section('Cache')
+    config['Cache']['probe_cache'] = os.path.join(workdir, 'probe_cache.sqlite')
+    config['Cache']['output_index'] = os.path.join(workdir, 'output_index.sqlite')
+    return config
+
+
+def _preset_names(config: ConfigParser) -> list[str]:
+    return [s.split('.', 1)[1] for s in config.sections() if s.startswith('Preset.')]
+
+
+def bench_presets(config: ConfigParser, clips: list[str], presets: list[str], use_pipeline: bool) -> dict:
+    results = {}
+    output_dir = config['Paths']['output']
+    for preset in presets:
+        os.environ["TEN2_OUTPUT_PRESET"] = preset
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir)
+        # Cold probe cache per preset so probe counts are comparable
+        processor.get_probe_cache(config).clear()
+        jobs = []
+        with SubprocessCounter() as counter:
+            started = time.monotonic()
+            if use_pipeline:
+                pipeline = ClipPipeline(config).start()
+                for clip in clips:
+                    pipeline.submit(clip, on_done=jobs.append)
+                pipeline.shutdown()
+            else:
+                for clip in clips:
+                    jobs.append(processor.process_clip(clip, config))
+            wall = time.monotonic() - started
+        media_seconds = sum(j.media.duration for j in jobs if j.media and j.status == "succeeded")
+        succeeded = sum(1 for j in jobs if j.status == "succeeded")
+        results[preset] = {
+            "clips": len(jobs),
+            "succeeded": succeeded,
+            "errors": {j.filename: j.error_details for j in jobs if j.status != "succeeded"},
+            "wall_seconds": round(wall, 3),
+            "clips_per_hour": round(succeeded / wall * 3600, 1) if wall > 0 else None,
+            "realtime_factor": round(media_seconds / wall, 3) if wall > 0 else None,
+            "subprocesses": dict(sorted(counter.counts.items())),
+            "probe_count": counter.counts.get('ffprobe', 0),
+            # Largest single subprocess started for this preset
+            "peak_child_rss_mb": _rss_mb(max(counter.peak_rss.values(), default=0)),
+            "peak_rss_mb_by_tool": {tool: _rss_mb(rss) for tool, rss in sorted(counter.peak_rss.items())},
+            "per_clip": [{"file": j.filename, "camera": j.camera_family, "status": j.status, "timings": j.timings} for j in jobs],
+        }
+        print(f"{preset}: {succeeded}/{len(jobs)} clips in {wall:.1f}s", file=sys.stderr)
+    os.environ.pop("TEN2_OUTPUT_PRESET", None)
+    return results
+
+
+def bench_scanner(workdir: str, extensions, file_count: int) -> dict:
+    """Time a cold and a warm CardScanner pass over an ARRI-style card."""
+    card = os.path.join(workdir, 'card')
+    reels = max(1, file_count // 500)
+    for r in range(reels):
+        reel = os.path.join(card, f"A{r + 1:03d}R1AB")
+        os.makedirs(reel, exist_ok=True)
+        for c in range(file_count // reels):
+            open(os.path.join(reel, f"A{r + 1:03d}C{c + 1:04d}{extensions[c % len(extensions)]}"), 'w').close()
+    scanner = CardScanner(card, extensions)
+    started = time.monotonic()
+    found = len(scanner.scan())
+    cold = time.monotonic() - started
+    started = time.monotonic()
+    scanner.scan()
+    warm = time.monotonic() - started
+    return {"files": found, "directories": reels, "cold_seconds": round(cold, 4), "warm_seconds": round(warm, 4)}
+
+
+def bench_api(config: ConfigParser, workdir: str, requests_per_endpoint: int) -> dict:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    log_dir = config['Paths']['logs']
+    with open(os.path.join(log_dir, 'ingest_engine.log'), 'w') as f:
+        for i in range(20000):
+            f.write(f"2026-01-01 00:00:00,000 - INFO - synthetic log line {i}\n")
+    server = start_api_server(config, workdir, host='127.0.0.1', port=port)
+    results = {}
+    try:
+        for endpoint in ('/api/status', '/api/history', '/api/logs?lines=100', '/api/folders/output', '/api/folders/output?summary=1'):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            latencies = []
+            for _ in range(requests_per_endpoint):
+                started = time.perf_counter()
+                conn.request('GET', endpoint)
+                conn.getresponse().read()
+                latencies.append(time.perf_counter() - started)
+            conn.close()
+            latencies.sort()
+            results[endpoint] = {
+                "requests": len(latencies),
+                "requests_per_second": round(len(latencies) / sum(latencies), 1),
+                "p50_ms": round(statistics.median(latencies) * 1000, 3),
+                "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the 10-2 Transcoder pipeline with synthetic media.")
+    parser.add_argument("--config", default=os.path.join(REPO_ROOT, 'config.ini'), help="config.ini with the presets to benchmark")
+    parser.add_argument("--ffmpeg", default=shutil.which('ffmpeg') or 'ffmpeg', help="FFmpeg binary (ffprobe must sit next to it)")
+    parser.add_argument("--workdir", help="Working directory (default: a temp dir, removed afterwards)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--presets", help="Comma separated preset names (default: every [Preset.*] section)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of synthetic media per clip")
+    parser.add_argument("--size", default="1920x1080", help="Synthetic frame size")
+    parser.add_argument("--rate", type=int, default=25, help="Synthetic frame rate")
+    parser.add_argument("--pipeline", action="store_true", help="Run clips through ClipPipeline instead of serial process_clip")
+    parser.add_argument("--art-streaming", action="store_true", help="Stream the stub ART output through a FIFO")
+    parser.add_argument("--scan-files", type=int, default=5000, help="Files on the synthetic card for the scanner benchmark")
+    parser.add_argument("--api-requests", type=int, default=200, help="Requests per API endpoint")
+    parser.add_argument("--skip", default="", help="Comma separated sections to skip: clips, scanner, api")
+    args = parser.parse_args()
+
+    skip = {s.strip() for s in args.skip.split(',') if s.strip()}
+    workdir = args.workdir or tempfile.mkdtemp(prefix='transcoder-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["BENCH_FFMPEG"] = args.ffmpeg
+    # Benchmarks shouldn't depend on the user's LUT library
+    os.environ["TEN2_EMBED_LUT"] = "0"
+
+    config = make_config(args.config, workdir, args.ffmpeg, args.art_streaming)
+    extensions = [e.strip().lower() for e in config.get('Processing', 'allowed_extensions', fallback='.mov,.mxf,.mp4').split(',') if e.strip()]
+    presets = [p.strip() for p in args.presets.split(',')] if args.presets else _preset_names(config)
+
+    report = {
+        "engine_version": _engine_version(),
+        "timestamp": datetime.now().isoformat(),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {
+            "duration": args.duration, "size": args.size, "rate": args.rate,
+            "pipeline": args.pipeline, "art_streaming": args.art_streaming, "presets": presets,
+        },
+    }
+    try:
+        if 'clips' not in skip:
+            clips = generate_clips(args.ffmpeg, os.path.join(workdir, 'source'), extensions, args.duration, args.size, args.rate)
+            report["presets"] = bench_presets(config, clips, presets, args.pipeline)
+        if 'scanner' not in skip:
+            report["scanner"] = bench_scanner(workdir, extensions, args.scan_files)
+        if 'api' not in skip:
+            report["api"] = bench_api(config, workdir, args.api_requests)
+        report["peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_SELF)
+        report["peak_child_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Stand-in for ARRI Reference Tool's art-cmd, used by the benchmark suite.
+
+Accepts the same `process --input ... --output ...` arguments the engine
+passes and remuxes the input to the output with FFmpeg, so the ARRI path
+(bake, analyze, encode, cleanup) can be timed on machines without ART.
+Set BENCH_ART_DELAY to add a fixed per-clip processing cost in seconds.
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+
+def main():
+    parser = argparse.ArgumentParser(description="art-cmd stub for benchmarks")
+    parser.add_argument("command")
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--embedded-look", action="store_true")
+    parser.add_argument("--video-codec")
+    parser.add_argument("--target-colorspace")
+    args = parser.parse_args()
+
+    if args.command != "process":
+        print(f"Unknown command: {args.command}", file=sys.stderr)
+        return 2
+
+    delay = float(os.environ.get("BENCH_ART_DELAY", "0") or 0)
+    if delay > 0:
+        time.sleep(delay)
+
+    ffmpeg = os.environ.get("BENCH_FFMPEG", "ffmpeg")
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", args.input, "-c", "copy", "-f", "mxf", args.output]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return 1
+    print(f"Processed {os.path.basename(args.input)} -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
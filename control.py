@@ -0,0 +1,98 @@
+"""
+In-process pause/resume control shared by the engine, the GUI and the API.
+
+The engine used to poll pause_control.json every loop iteration and the GUI
+re-read it every 500 ms. State now lives in an EngineControl object guarded by
+a condition variable, so workers block until resumed and changes take effect
+immediately. The JSON file is kept only as an optional mirror of the state for
+tools outside the process.
+"""
+
+import os
+import json
+import logging
+import threading
+
+from events import event_bus
+
+
+class EngineControl:
+    """Pause state: 'paused' stops workers taking new files, 'pause_requested' pauses after the current one."""
+
+    def __init__(self, mirror_path: str | None = None):
+        self._cond = threading.Condition()
+        self._paused = False
+        self._pause_requested = False
+        self.mirror_path = mirror_path
+
+    def reset(self, mirror_path: str | None = None):
+        """Clear any pause state at engine start and (re)point the persisted mirror."""
+        with self._cond:
+            self.mirror_path = mirror_path
+            self._paused = False
+            self._pause_requested = False
+            self._changed()
+
+    def state(self) -> dict:
+        with self._cond:
+            return {"paused": self._paused, "pause_requested": self._pause_requested}
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @property
+    def pause_requested(self) -> bool:
+        return self._pause_requested
+
+    def update(self, paused=None, pause_requested=None):
+        with self._cond:
+            if paused is not None:
+                self._paused = bool(paused)
+            if pause_requested is not None:
+                self._pause_requested = bool(pause_requested)
+            self._changed()
+
+    def request_pause(self):
+        """Pause once the clips currently in flight have finished."""
+        with self._cond:
+            if not self._paused:
+                self._pause_requested = True
+                self._changed()
+
+    def pause(self):
+        """Stop handing out new files right away."""
+        self.update(paused=True, pause_requested=False)
+
+    def resume(self):
+        self.update(paused=False, pause_requested=False)
+
+    def complete_pending_pause(self) -> bool:
+        """Called after a file completes: turn a pending request into a pause. Returns True if it did."""
+        with self._cond:
+            if not self._pause_requested:
+                return False
+            self._paused = True
+            self._pause_requested = False
+            self._changed()
+            return True
+
+    def wait_while_paused(self, timeout: float | None = None) -> bool:
+        """Block while paused. Returns True if running, False if still paused after timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._paused, timeout=timeout)
+
+    def _changed(self):
+        # Caller holds the condition
+        self._cond.notify_all()
+        state = {"paused": self._paused, "pause_requested": self._pause_requested}
+        event_bus.publish("control", state)
+        if not self.mirror_path:
+            return
+        try:
+            tmp_path = f"{self.mirror_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.mirror_path)
+        except Exception as e:
+            logging.error(f"Failed to write pause state: {e}")
@@ -0,0 +1,71 @@
+"""
+In-process event bus behind the API's /api/events stream.
+
+The engine publishes status changes, queue changes, history appends, pause
+state and log lines here as they happen. Events get increasing integer ids and
+are kept in a bounded ring buffer, so an SSE client that reconnects with
+Last-Event-ID receives everything it missed (or a "reset" event telling it to
+re-fetch the REST endpoints if it fell too far behind).
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+
+DEFAULT_CAPACITY = 1000
+
+
+class EventBus:
+    """Ring buffer of (id, type, data) events with blocking reads."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._events = deque(maxlen=capacity)
+        self._next_id = 1
+        self._cond = threading.Condition()
+
+    @property
+    def latest_id(self) -> int:
+        return self._next_id - 1
+
+    def publish(self, event_type: str, data) -> int:
+        with self._cond:
+            event_id = self._next_id
+            self._next_id += 1
+            self._events.append((event_id, event_type, data))
+            self._cond.notify_all()
+            return event_id
+
+    def wait_since(self, last_id: int, timeout: float | None = None) -> tuple[list, bool]:
+        """
+        Block until there are events newer than last_id (or timeout).
+        Returns (events, reset); reset is True when last_id is no longer
+        covered by the buffer (evicted, or from before an engine restart).
+        """
+        with self._cond:
+            if last_id > self.latest_id or (self._events and last_id < self._events[0][0] - 1):
+                return [], True
+            self._cond.wait_for(lambda: self.latest_id > last_id, timeout=timeout)
+            return [e for e in self._events if e[0] > last_id], False
+
+
+class EventLogHandler(logging.Handler):
+    """Forwards log records to the event bus as "log" events."""
+
+    def __init__(self, bus: EventBus, level=logging.INFO):
+        super().__init__(level)
+        self.bus = bus
+
+    def emit(self, record):
+        try:
+            self.bus.publish("log", {
+                "time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.created)),
+                "level": record.levelname,
+                "message": record.getMessage(),
+            })
+        except Exception:
+            self.handleError(record)
+
+
+# Process-wide bus shared by the engine, the GUI and the API server
+event_bus = EventBus()
@@ -0,0 +1,336 @@
+"""
+Transcode farm: one coordinator engine hands clips to worker engines over HTTP.
+
+The coordinator is a normal engine with [Farm] coordinator = true. Its job
+list (scanner, journal, scheduler) stays the single source of work, and
+api_server exposes it as leases:
+
+    POST /api/farm/lease      {"worker": id}         -> 200 lease | 204 nothing to do
+    POST /api/farm/heartbeat  {"lease_id": id}       -> 200 | 410 lease gone
+    POST /api/farm/complete   {"lease_id": id, "status": "succeeded"|"failed", "error": ...}
+    GET  /api/farm                                   -> active leases
+
+A lease not renewed within lease_seconds is taken back and the clip is queued
+again, so a crashed or unplugged node only costs the clip it was working on.
+A worker whose heartbeat is refused cancels the clip (its tools are killed
+and its partial output removed) so it never overwrites the new owner's file.
+Worker engines (main.py --worker-of http://coordinator:8080) run the usual
+clip pipeline on leased clips, mapping the coordinator's paths to their own
+mount points with [Farm] path_map.
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import logging
+import threading
+import urllib.request
+import urllib.error
+from dataclasses import dataclass
+from configparser import ConfigParser
+
+from journal import CLAIMED, RUNNING, DONE, FAILED, QUEUED
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_POLL_INTERVAL = 5
+DEFAULT_REQUEST_TIMEOUT = 10
+
+# The running coordinator, for the API
+_coordinator = None
+
+
+@dataclass
+class Lease:
+    lease_id: str
+    path: str
+    worker: str
+    granted_at: float
+    expires_at: float  # time.monotonic()
+
+    def to_dict(self) -> dict:
+        return {
+            "lease_id": self.lease_id,
+            "path": self.path,
+            "worker": self.worker,
+            "age": round(time.monotonic() - self.granted_at, 1),
+            "expires_in": round(self.expires_at - time.monotonic(), 1),
+        }
+
+
+class LeaseCoordinator:
+    """
+    Leases clips from the engine queue to remote workers.
+
+    A leased clip counts as an unfinished queue task until it is completed or
+    its lease expires, so the engine's queue.join() waits for remote work too.
+    """
+
+    def __init__(self, file_queue: queue.Queue, journal=None, control=None, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.file_queue = file_queue
+        self.journal = journal
+        self.control = control
+        self.lease_seconds = lease_seconds
+        self._leases = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._reap_loop, name="farm-leases", daemon=True).start()
+        logging.info(f"Farm coordinator: leasing clips to workers ({self.lease_seconds:g}s leases).")
+        return self
+
+    def close(self):
+        """Stop handing out leases (engine shutdown). Outstanding leases can still complete."""
+        self._closed.set()
+
+    def lease(self, worker: str) -> dict | None:
+        """Take the next clip off the queue for worker, or None if there is nothing to do."""
+        if self._closed.is_set() or (self.control is not None and self.control.paused):
+            return None
+        try:
+            path = self.file_queue.get_nowait()
+        except queue.Empty:
+            return None
+        if path is None:
+            # A worker stop signal: leave it for the local workers
+            self.file_queue.put(None)
+            self.file_queue.task_done()
+            return None
+        now = time.monotonic()
+        lease = Lease(uuid.uuid4().hex, path, worker, now, now + self.lease_seconds)
+        with self._lock:
+            self._leases[lease.lease_id] = lease
+        if self.journal:
+            self.journal.transition(path, CLAIMED)
+            self.journal.transition(path, RUNNING)
+        logging.info(f"Farm: leased {os.path.basename(path)} to {worker}.")
+        return {"lease_id": lease.lease_id, "path": path, "lease_seconds": self.lease_seconds}
+
+    def heartbeat(self, lease_id: str) -> bool:
+        """Extend a lease. False if it expired (and was re-issued) or never existed."""
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is None:
+                return False
+            lease.expires_at = time.monotonic() + self.lease_seconds
+        return True
+
+    def complete(self, lease_id: str, succeeded: bool, error: str | None = None) -> bool:
+        """Record a worker's result for a lease. False if the lease is no longer held."""
+        with self._lock:
+            lease = self._leases.pop(lease_id, None)
+        if lease is None:
+            return False
+        if self.journal:
+            self.journal.transition(lease.path, DONE if succeeded else FAILED, None if succeeded else error)
+        self.file_queue.task_done()
+        outcome = "finished" if succeeded else f"failed ({error})"
+        logging.info(f"Farm: {lease.worker} {outcome} {os.path.basename(lease.path)}.")
+        return True
+
+    def expire_stale(self) -> int:
+        """Queue the clips of expired leases again. Returns how many were re-issued."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [lease for lease in self._leases.values() if lease.expires_at <= now]
+            for lease in expired:
+                del self._leases[lease.lease_id]
+        for lease in expired:
+            logging.warning(f"Farm: lease on {os.path.basename(lease.path)} held by {lease.worker} expired; queuing it again.")
+            if self.journal:
+                self.journal.transition(lease.path, QUEUED)
+            self.file_queue.put(lease.path)
+            self.file_queue.task_done()
+        return len(expired)
+
+    def leases(self) -> list[dict]:
+        with self._lock:
+            return [lease.to_dict() for lease in self._leases.values()]
+
+    def _reap_loop(self):
+        interval = max(1.0, self.lease_seconds / 4)
+        while True:
+            time.sleep(interval)
+            try:
+                self.expire_stale()
+            except Exception as e:
+                logging.error(f"Farm lease check failed: {e}")
+
+
+def start_coordinator(config: ConfigParser, file_queue: queue.Queue, journal=None, control=None) -> LeaseCoordinator:
+    """Create the process-wide coordinator from [Farm] settings and start expiring leases."""
+    global _coordinator
+    lease_seconds = config.getfloat('Farm', 'lease_seconds', fallback=DEFAULT_LEASE_SECONDS)
+    _coordinator = LeaseCoordinator(file_queue, journal, control, lease_seconds).start()
+    return _coordinator
+
+
+def active_coordinator() -> LeaseCoordinator | None:
+    return _coordinator
+
+
+# --- Worker side ---
+
+def parse_path_map(raw: str) -> list[tuple[str, str]]:
+    """'/Volumes/QNAP=/mnt/qnap, /Volumes/RAID=/mnt/raid' -> [(coordinator prefix, local prefix)]."""
+    mapping = []
+    for part in (raw or '').split(','):
+        remote, sep, local = part.partition('=')
+        if sep and remote.strip() and local.strip():
+            mapping.append((remote.strip().rstrip('/'), local.strip().rstrip('/')))
+    # Longest prefix first
+    mapping.sort(key=lambda m: len(m[0]), reverse=True)
+    return mapping
+
+
+def map_path(path: str, mapping: list[tuple[str, str]]) -> str:
+    for remote, local in mapping:
+        if path == remote or path.startswith(remote + '/'):
+            return local + path[len(remote):]
+    return path
+
+
+class FarmClient:
+    """JSON-over-HTTP client for the coordinator's /api/farm endpoints."""
+
+    def __init__(self, base_url: str, token: str = "", timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def _post(self, endpoint: str, payload: dict) -> tuple[int, dict | None]:
+        request = urllib.request.Request(
+            f"{self.base_url}/api/farm/{endpoint}",
+            data=json.dumps(payload).encode('utf-8'),
+            headers={"Content-Type": "application/json", "X-Farm-Token": self.token},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                return response.status, json.loads(body) if body else None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def lease(self, worker: str) -> dict | None:
+        status, data = self._post("lease", {"worker": worker})
+        if status == 200:
+            return data
+        if status != 204:
+            raise RuntimeError(f"coordinator answered {status} to a lease request")
+        return None
+
+    def heartbeat(self, lease_id: str) -> bool:
+        status, _ = self._post("heartbeat", {"lease_id": lease_id})
+        return status == 200
+
+    def complete(self, lease_id: str, status: str, error: str | None = None) -> bool:
+        code, _ = self._post("complete", {"lease_id": lease_id, "status": status, "error": error})
+        return code == 200
+
+
+def run_farm_worker(config: ConfigParser, coordinator_url: str, pipeline, slots: int):
+    """
+    Lease clips from the coordinator and run them through pipeline, with up
+    to `slots` clips in flight. Returns on KeyboardInterrupt once in-flight
+    clips have finished.
+    """
+    worker_id = config.get('Farm', 'worker_name', fallback='') or f"{socket.gethostname()}-{os.getpid()}"
+    client = FarmClient(coordinator_url, config.get('Farm', 'token', fallback=''))
+    mapping = parse_path_map(config.get('Farm', 'path_map', fallback=''))
+    poll_interval = config.getfloat('Farm', 'poll_interval', fallback=DEFAULT_POLL_INTERVAL)
+    active = {}  # lease_id -> local path
+    jobs = {}  # lease_id -> ClipJob, once pipeline.submit has returned it
+    lost = set()  # leases lost before their job was known
+    active_lock = threading.Lock()
+    stopping = threading.Event()
+    heartbeat_interval = [DEFAULT_LEASE_SECONDS / 3]
+
+    def heartbeat_loop():
+        while not stopping.is_set() or active:
+            time.sleep(heartbeat_interval[0])
+            with active_lock:
+                leases = list(active.items())
+            for lease_id, path in leases:
+                try:
+                    if client.heartbeat(lease_id):
+                        continue
+                except OSError as e:
+                    logging.warning(f"Heartbeat to {coordinator_url} failed: {e}")
+                    continue
+                # Another node now owns the clip: stop writing its output
+                logging.warning(f"Lease on {os.path.basename(path)} was lost; the coordinator has re-issued it.")
+                with active_lock:
+                    active.pop(lease_id, None)
+                    job = jobs.get(lease_id)
+                    if job is None:
+                        lost.add(lease_id)
+                if job is not None:
+                    job.cancel("lease lost; the coordinator re-issued the clip")
+
+    def intake_loop():
+        while not stopping.is_set():
+            try:
+                lease = client.lease(worker_id)
+            except (OSError, RuntimeError) as e:
+                logging.warning(f"Could not reach coordinator {coordinator_url}: {e}")
+                lease = None
+            if lease is None:
+                stopping.wait(poll_interval)
+                continue
+            heartbeat_interval[0] = max(1.0, lease.get("lease_seconds", DEFAULT_LEASE_SECONDS) / 3)
+            lease_id = lease["lease_id"]
+            local_path = map_path(lease["path"], mapping)
+            if not os.path.exists(local_path):
+                logging.error(f"Leased clip not found on this node: {local_path}. Check [Farm] path_map.")
+                client.complete(lease_id, "failed", f"Source not found on {worker_id}: {local_path}")
+                continue
+            with active_lock:
+                active[lease_id] = local_path
+            finished = threading.Event()
+
+            def _done(job, lease_id=lease_id, finished=finished):
+                with active_lock:
+                    active.pop(lease_id, None)
+                    jobs.pop(lease_id, None)
+                    was_lost = lease_id in lost
+                    finished.set()
+                if job.cancel_reason is not None or was_lost:
+                    # The coordinator no longer holds this lease; the node that does reports the clip
+                    return
+                try:
+                    if not client.complete(lease_id, job.status, job.error_details or None):
+                        logging.warning(f"Coordinator rejected the result for {job.filename}; its lease had expired.")
+                except OSError as e:
+                    logging.error(f"Could not report {job.filename} to the coordinator: {e}")
+
+            logging.info(f"{threading.current_thread().name} leased {local_path}")
+            job = pipeline.submit(local_path, on_done=_done)
+            with active_lock:
+                was_lost = lease_id in lost
+                lost.discard(lease_id)
+                if not finished.is_set():
+                    jobs[lease_id] = job
+            if was_lost and not finished.is_set():
+                job.cancel("lease lost; the coordinator re-issued the clip")
+            # One clip per slot: don't hold leases other nodes could be working on
+            finished.wait()
+
+    threads = [threading.Thread(target=heartbeat_loop, name="farm-heartbeat", daemon=True)]
+    threads += [threading.Thread(target=intake_loop, name=f"farm-{i + 1}", daemon=True) for i in range(slots)]
+    for t in threads:
+        t.start()
+    logging.info(f"Farm worker {worker_id}: leasing up to {slots} clip(s) at a time from {coordinator_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logging.info("Farm worker stopping after in-flight clips...")
+    finally:
+        stopping.set()
+        for t in threads[1:]:
+            t.join()
+        pipeline.shutdown()
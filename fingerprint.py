@@ -0,0 +1,215 @@
+"""
+Output fingerprints for incremental re-runs.
+
+Every finished output gets a hidden sidecar (.<output name>.fingerprint.json)
+recording the source it came from (size, mtime, inode and a partial content
+hash), a digest of the encode recipe (resolved preset, LUT file contents, ART
+settings and filter chain) and the output's own size and mtime. Before a clip
+is transcoded, a sidecar that still matches means the output is already valid
+and the clip is skipped. An output index under ~/.10-2-transcoder/ maps source
+content + recipe to outputs written anywhere else, so a copy of the same card
+pointed at a new output folder is hard-linked instead of re-encoded.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from configparser import ConfigParser
+
+DEFAULT_INDEX_PATH = '~/.10-2-transcoder/output_index.sqlite'
+
+# Bytes hashed from the start, middle and end of a source file
+PARTIAL_HASH_BYTES = 1024 * 1024
+
+_SIDECAR_VERSION = 1
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def partial_hash(path: str, chunk: int = PARTIAL_HASH_BYTES) -> str:
+    """Hash of the file size plus its first, middle and last `chunk` bytes."""
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode('ascii'), digest_size=16)
+    with open(path, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - chunk // 2), max(0, size - chunk)}):
+            f.seek(offset)
+            digest.update(f.read(chunk))
+    return digest.hexdigest()
+
+
+def file_digest(path: str) -> str | None:
+    """Full-content hash of a small file (LUTs), or None if it can't be read."""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    except OSError:
+        return None
+
+
+def recipe_digest(recipe: dict) -> str:
+    return hashlib.blake2b(json.dumps(recipe, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def sidecar_path(output_path: str) -> str:
+    directory, name = os.path.split(output_path)
+    return os.path.join(directory, f".{name}.fingerprint.json")
+
+
+class SourceFingerprint:
+    """stat() identity of a source clip, with the partial content hash computed on demand."""
+
+    def __init__(self, path: str):
+        st = os.stat(path)
+        self.path = path
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.inode = st.st_ino
+        self._hash = None
+
+    @property
+    def hash(self) -> str:
+        if self._hash is None:
+            self._hash = partial_hash(self.path)
+        return self._hash
+
+    def matches(self, recorded: dict) -> bool:
+        """Same size and either the same stat identity or, failing that, the same content hash."""
+        if recorded.get("size") != self.size:
+            return False
+        if recorded.get("mtime_ns") == self.mtime_ns and recorded.get("inode") == self.inode:
+            return True
+        # Re-mounted or copied cards change inodes (and sometimes mtimes); trust the content
+        return recorded.get("hash") == self.hash
+
+    def content_key(self, recipe: str) -> str:
+        return f"{self.size}:{self.hash}:{recipe}"
+
+    def to_dict(self) -> dict:
+        return {"size": self.size, "mtime_ns": self.mtime_ns, "inode": self.inode, "hash": self.hash}
+
+
+def _output_identity(output_path: str):
+    try:
+        st = os.stat(output_path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def read_sidecar(output_path: str) -> dict | None:
+    try:
+        with open(sidecar_path(output_path), 'r') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, dict) and data.get("version") == _SIDECAR_VERSION else None
+
+
+def output_is_current(output_path: str, source: SourceFingerprint, recipe: str) -> bool:
+    """True if output_path exists, is untouched since it was written, and came from this source and recipe."""
+    sidecar = read_sidecar(output_path)
+    if not sidecar or sidecar.get("recipe") != recipe:
+        return False
+    identity = _output_identity(output_path)
+    if identity is None or list(identity) != [sidecar.get("output_size"), sidecar.get("output_mtime_ns")]:
+        return False
+    return source.matches(sidecar.get("source") or {})
+
+
+def write_sidecar(output_path: str, source: SourceFingerprint, recipe: str):
+    identity = _output_identity(output_path)
+    if identity is None:
+        return
+    data = {
+        "version": _SIDECAR_VERSION,
+        "source_path": source.path,
+        "source": source.to_dict(),
+        "recipe": recipe,
+        "output_size": identity[0],
+        "output_mtime_ns": identity[1],
+    }
+    path = sidecar_path(output_path)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write fingerprint for {output_path}: {e}")
+
+
+class OutputIndex:
+    """SQLite map of source content + recipe -> an output file known to be valid for it."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                " content_key TEXT NOT NULL,"
+                " output_path TEXT NOT NULL,"
+                " output_size INTEGER NOT NULL,"
+                " output_mtime_ns INTEGER NOT NULL,"
+                " PRIMARY KEY (content_key, output_path))"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Output index unavailable at {db_path}: {e}")
+            self._conn = None
+
+    def find(self, content_key: str, exclude: str | None = None) -> str | None:
+        """Return an existing, unmodified output for content_key, dropping entries that went stale."""
+        if self._conn is None:
+            return None
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    "SELECT output_path, output_size, output_mtime_ns FROM outputs WHERE content_key = ?", (content_key,)
+                ).fetchall()
+                for output_path, size, mtime_ns in rows:
+                    if output_path == exclude:
+                        continue
+                    if _output_identity(output_path) == (size, mtime_ns):
+                        return output_path
+                    self._conn.execute("DELETE FROM outputs WHERE content_key = ? AND output_path = ?", (content_key, output_path))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Output index lookup failed: {e}")
+        return None
+
+    def record(self, content_key: str, output_path: str):
+        identity = _output_identity(output_path)
+        if self._conn is None or identity is None:
+            return
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO outputs (content_key, output_path, output_size, output_mtime_ns) VALUES (?, ?, ?, ?)",
+                    (content_key, output_path) + identity
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to record {output_path} in output index: {e}")
+
+
+def get_output_index(config: ConfigParser | None = None) -> OutputIndex:
+    """Return the process-wide output index configured by [Cache] output_index."""
+    db_path = DEFAULT_INDEX_PATH
+    if config is not None:
+        db_path = config.get('Cache', 'output_index', fallback=DEFAULT_INDEX_PATH)
+    db_path = os.path.expanduser(db_path)
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            index = OutputIndex(db_path)
+            _indexes[db_path] = index
+        return index
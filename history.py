@@ -0,0 +1,226 @@
+"""
+Append-only processing history.
+
+log_to_history used to load all of history.json, insert at the top, cut the
+list to 100 entries and rewrite the file after every clip. Records now go into
+a SQLite database next to the configured history file (history.json ->
+history.sqlite), one INSERT per clip, indexed on start_time, status and
+session. Nothing is dropped until the [History] retention policy says so, and
+the API and GUI query by time range or session instead of reading everything.
+An existing history.json is imported the first time the database is created.
+"""
+
+import os
+import json
+import uuid
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from configparser import ConfigParser
+
+from events import event_bus
+
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_MAX_RECORDS = 0  # 0 = no limit
+DEFAULT_QUERY_LIMIT = 100
+
+# Apply the retention policy once every this many appends
+_RETENTION_EVERY = 50
+
+_COLUMNS = ("file", "source_path", "start_time", "end_time", "status", "error_details", "session")
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def new_session_id() -> str:
+    """Identifier stamped on every record written by one engine run."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def history_db_path(history_path: str) -> str:
+    # Absolute, so every caller gets the same process-wide instance
+    return os.path.splitext(os.path.abspath(os.path.expanduser(history_path)))[0] + '.sqlite'
+
+
+class HistoryStore:
+    """SQLite-backed history log with time/status/session queries."""
+
+    def __init__(self, db_path: str, retention_days: int = DEFAULT_RETENTION_DAYS, max_records: int = DEFAULT_MAX_RECORDS,
+                 legacy_json_path: str | None = None):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.max_records = max_records
+        self.session_id = None
+        self._appends = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            created = not os.path.exists(db_path)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " file TEXT,"
+                " source_path TEXT,"
+                " start_time TEXT NOT NULL,"
+                " end_time TEXT,"
+                " status TEXT,"
+                " error_details TEXT,"
+                " session TEXT,"
+                " extra TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS history_start_time ON history (start_time)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS history_status ON history (status, start_time)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS history_session ON history (session, start_time)")
+            self._conn.commit()
+            if created and legacy_json_path:
+                self._import_legacy(legacy_json_path)
+        except sqlite3.Error as e:
+            logging.error(f"History store unavailable at {db_path}: {e}")
+            self._conn = None
+
+    def _import_legacy(self, json_path: str):
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, 'r') as f:
+                records = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logging.warning(f"Could not import legacy history {json_path}: {e}")
+            return
+        if not isinstance(records, list):
+            return
+        # history.json was newest-first
+        for record in reversed(records):
+            if isinstance(record, dict) and record.get('start_time'):
+                self._insert(record)
+        self._conn.commit()
+        logging.info(f"Imported {len(records)} record(s) from {json_path} into {self.db_path}")
+
+    def _insert(self, record: dict):
+        extra = {k: v for k, v in record.items() if k not in _COLUMNS}
+        self._conn.execute(
+            "INSERT INTO history (file, source_path, start_time, end_time, status, error_details, session, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            tuple(record.get(c) for c in _COLUMNS) + (json.dumps(extra) if extra else None,)
+        )
+
+    def append(self, record: dict):
+        """Add one record, stamped with the current session if it has none."""
+        if self._conn is None:
+            return
+        record = dict(record)
+        if self.session_id and not record.get('session'):
+            record['session'] = self.session_id
+        with self._lock:
+            try:
+                self._insert(record)
+                self._conn.commit()
+                self._appends += 1
+                if self._appends % _RETENTION_EVERY == 0:
+                    self._apply_retention()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to write to history {self.db_path}: {e}")
+                return
+        event_bus.publish("history", record)
+
+    def query(self, since: str | None = None, until: str | None = None, status: str | None = None,
+              session: str | None = None, limit: int | None = DEFAULT_QUERY_LIMIT, offset: int = 0) -> list[dict]:
+        """
+        Return records newest first. since/until are ISO timestamps compared
+        against start_time (since inclusive, until exclusive).
+        """
+        if self._conn is None:
+            return []
+        clauses = []
+        params = []
+        if since:
+            clauses.append("start_time >= ?")
+            params.append(since)
+        if until:
+            clauses.append("start_time < ?")
+            params.append(until)
+        if status:
+            clauses.append("status = ?")
+            params.append(status.lower())
+        if session:
+            clauses.append("session = ?")
+            params.append(session)
+        sql = f"SELECT {', '.join(_COLUMNS)}, extra FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY start_time DESC, id DESC"
+        if limit:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                logging.error(f"History query failed: {e}")
+                return []
+        records = []
+        for row in rows:
+            record = dict(zip(_COLUMNS, row))
+            if record['session'] is None:
+                del record['session']
+            if row[-1]:
+                record.update(json.loads(row[-1]))
+            records.append(record)
+        return records
+
+    def version(self) -> str:
+        """Changes whenever records are added or removed; used for API ETags."""
+        if self._conn is None:
+            return "0"
+        with self._lock:
+            try:
+                max_id, count = self._conn.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM history").fetchone()
+            except sqlite3.Error:
+                return "0"
+        return f"{max_id}-{count}"
+
+    def _apply_retention(self):
+        # Caller holds the lock
+        removed = 0
+        if self.retention_days > 0:
+            cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+            removed += self._conn.execute("DELETE FROM history WHERE start_time < ?", (cutoff,)).rowcount
+        if self.max_records > 0:
+            removed += self._conn.execute(
+                "DELETE FROM history WHERE id NOT IN (SELECT id FROM history ORDER BY start_time DESC, id DESC LIMIT ?)",
+                (self.max_records,)
+            ).rowcount
+        self._conn.commit()
+        if removed:
+            self._conn.execute("PRAGMA incremental_vacuum")
+            logging.info(f"History retention removed {removed} record(s).")
+
+    def compact(self):
+        """Apply the retention policy now."""
+        if self._conn is None:
+            return
+        with self._lock:
+            try:
+                self._apply_retention()
+            except sqlite3.Error as e:
+                logging.error(f"History compaction failed: {e}")
+
+
+def get_history_store(history_path: str, config: ConfigParser | None = None) -> HistoryStore:
+    """Return the process-wide store for history_path, applying [History] settings when config is given."""
+    db_path = history_db_path(history_path)
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = HistoryStore(db_path, legacy_json_path=os.path.expanduser(history_path))
+            _stores[db_path] = store
+    if config is not None:
+        store.retention_days = config.getint('History', 'retention_days', fallback=DEFAULT_RETENTION_DAYS)
+        store.max_records = config.getint('History', 'max_records', fallback=DEFAULT_MAX_RECORDS)
+    return store
@@ -0,0 +1,297 @@
+"""
+Write-ahead job journal.
+
+The engine's work list used to live only in a queue.Queue, with queue.json
+rewritten every second or so for the GUI. A crash or power loss mid-card lost
+the plan and the next run started from scratch. Every job transition
+(queued -> claimed -> running -> done | failed) is now committed to a SQLite
+database next to the configured queue file (queue.json -> queue.sqlite)
+before the engine acts on it. On restart, jobs that never finished and were
+queued for the same output folder are queued again in their original order,
+and the GUI and API read the live queue from here. Whether a finished clip
+needs transcoding again is decided by its output fingerprint (fingerprint.py),
+not by the journal.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from configparser import ConfigParser
+
+from events import event_bus
+
+QUEUED = "queued"
+CLAIMED = "claimed"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_STATES = (QUEUED, CLAIMED, RUNNING, DONE, FAILED)
+PENDING_STATES = (QUEUED, CLAIMED, RUNNING)
+
+DEFAULT_RETENTION_DAYS = 30
+# Minimum seconds between "queue" events; a burst of changes is sent as one snapshot
+DEFAULT_PUBLISH_INTERVAL = 1.0
+
+_COLUMNS = ("id", "path", "state", "source", "destination", "size", "mtime_ns", "attempts", "session", "error",
+            "enqueued_at", "updated_at")
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def journal_db_path(queue_path: str) -> str:
+    # Absolute, so every caller gets the same process-wide instance
+    return os.path.splitext(os.path.abspath(os.path.expanduser(queue_path)))[0] + '.sqlite'
+
+
+def _identity(path: str):
+    """(size, mtime_ns) of a source file, or (None, None) if it can't be read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+
+class JobJournal:
+    """SQLite-backed record of every job and its current state."""
+
+    def __init__(self, db_path: str, retention_days: int = DEFAULT_RETENTION_DAYS,
+                 publish_interval: float = DEFAULT_PUBLISH_INTERVAL):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.publish_interval = publish_interval
+        self.session_id = None
+        # Output folder of this run; recorded with each job and matched on resume
+        self.destination = None
+        # Callable returning queued paths in dispatch order (the engine's scheduler)
+        self.order_source = None
+        self._lock = threading.Lock()
+        self._publish_cond = threading.Condition()
+        self._publish_pending = False
+        self._publisher = None
+        self._rev = 0
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # A transition must survive power loss once it is recorded
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " path TEXT NOT NULL UNIQUE,"
+                " state TEXT NOT NULL,"
+                " source TEXT,"
+                " destination TEXT,"
+                " size INTEGER,"
+                " mtime_ns INTEGER,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " session TEXT,"
+                " error TEXT,"
+                " enqueued_at TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL,"
+                " rev INTEGER NOT NULL DEFAULT 0)"
+            )
+            if "destination" not in {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN destination TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+            self._conn.commit()
+            self._rev = self._conn.execute("SELECT COALESCE(MAX(rev), 0) FROM jobs").fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error(f"Job journal unavailable at {db_path}: {e}")
+            self._conn = None
+
+    def _next_rev(self) -> int:
+        # Monotonic even when the newest row is deleted and re-inserted
+        self._rev += 1
+        return self._rev
+
+    def add(self, path: str, source: str = "") -> bool:
+        """
+        Record a job as queued for this session and its output folder.
+        Returns False if this session already queued it, or already finished
+        it and the file hasn't changed since. A job another run left pending
+        (and this one didn't resume) is taken over.
+        """
+        if self._conn is None:
+            return True
+        size, mtime_ns = _identity(path)
+        now = datetime.now().isoformat()
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT state, size, mtime_ns, session FROM jobs WHERE path = ?", (path,)).fetchone()
+                if row:
+                    state, old_size, old_mtime, session = row
+                    if state in PENDING_STATES and (not self.session_id or session == self.session_id):
+                        return False
+                    if session and session == self.session_id and (old_size, old_mtime) == (size, mtime_ns):
+                        return False
+                    # Re-queue behind everything already waiting
+                    self._conn.execute("DELETE FROM jobs WHERE path = ?", (path,))
+                self._conn.execute(
+                    "INSERT INTO jobs (path, state, source, destination, size, mtime_ns, session, enqueued_at, updated_at, rev)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, QUEUED, source, self.destination, size, mtime_ns, self.session_id, now, now, self._next_rev())
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to journal {path}: {e}")
+                return True
+        self.publish_queue()
+        return True
+
+    def transition(self, path: str, state: str, error: str | None = None):
+        """Move a job to state. Entering RUNNING counts an attempt."""
+        if self._conn is None:
+            return
+        if state not in JOB_STATES:
+            raise ValueError(f"Unknown job state: {state}")
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, error = ?, updated_at = ?, rev = ?,"
+                    " attempts = attempts + ? WHERE path = ?",
+                    (state, error, datetime.now().isoformat(), self._next_rev(), 1 if state == RUNNING else 0, path)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to journal {state} for {path}: {e}")
+                return
+        if state in (CLAIMED, DONE, FAILED):
+            self.publish_queue()
+
+    def recover(self) -> list[str]:
+        """
+        Requeue jobs a previous run left claimed or running and drop finished
+        jobs past retention. Queued jobs for this run's destination (or
+        recorded without one) are taken over by this session and returned in original order;
+        jobs for other output folders wait for a run that writes there.
+        """
+        if self._conn is None:
+            return []
+        with self._lock:
+            try:
+                interrupted = self._conn.execute(
+                    "UPDATE jobs SET state = ?, updated_at = ?, rev = ? WHERE state IN (?, ?)",
+                    (QUEUED, datetime.now().isoformat(), self._next_rev(), CLAIMED, RUNNING)
+                ).rowcount
+                if self.retention_days > 0:
+                    cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+                    self._conn.execute("DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?", (DONE, FAILED, cutoff))
+                self._conn.execute(
+                    "UPDATE jobs SET session = ?, rev = ? WHERE state = ? AND (destination IS NULL OR destination = ?)",
+                    (self.session_id, self._next_rev(), QUEUED, self.destination)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Job journal recovery failed: {e}")
+                return []
+        pending = self.pending()
+        if pending:
+            logging.info(f"Job journal: resuming {len(pending)} job(s) ({interrupted} interrupted mid-clip).")
+        return pending
+
+    def pending(self) -> list[str]:
+        """Queued paths in the order they will run."""
+        return [job["path"] for job in self.jobs((QUEUED,))]
+
+    def _owned_filter(self) -> tuple[str, list]:
+        # Pending jobs of another run that this session didn't take over aren't part of its queue
+        if not self.session_id:
+            return "", []
+        return f" AND (state NOT IN ({', '.join('?' * len(PENDING_STATES))}) OR session = ?)", [*PENDING_STATES, self.session_id]
+
+    def jobs(self, states=PENDING_STATES, limit: int | None = None) -> list[dict]:
+        """Jobs in the given states: started ones first, then queued ones in dispatch order."""
+        if self._conn is None:
+            return []
+        owned, owned_params = self._owned_filter()
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE state IN ({', '.join('?' * len(states))}){owned} ORDER BY id"
+        params = list(states) + owned_params
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                logging.error(f"Job journal query failed: {e}")
+                return []
+        jobs = [dict(zip(_COLUMNS, row)) for row in rows]
+        if self.order_source is not None:
+            position = {path: i for i, path in enumerate(self.order_source())}
+            jobs.sort(key=lambda job: (job["state"] == QUEUED, position.get(job["path"], len(position))))
+        return jobs
+
+    def counts(self) -> dict:
+        """Number of jobs in each state."""
+        counts = dict.fromkeys(JOB_STATES, 0)
+        if self._conn is None:
+            return counts
+        owned, owned_params = self._owned_filter()
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    f"SELECT state, COUNT(*) FROM jobs WHERE state IN ({', '.join('?' * len(JOB_STATES))}){owned} GROUP BY state",
+                    [*JOB_STATES, *owned_params]
+                ).fetchall()
+            except sqlite3.Error:
+                return counts
+        counts.update(rows)
+        return counts
+
+    def version(self) -> str:
+        """Changes on every transition; used for API ETags."""
+        if self._conn is None:
+            return "0"
+        with self._lock:
+            try:
+                rev = self._conn.execute("SELECT COALESCE(MAX(rev), 0) FROM jobs").fetchone()[0]
+            except sqlite3.Error:
+                return "0"
+        return str(rev)
+
+    def publish_queue(self):
+        """
+        Send the queued paths to event listeners. Cheap to call on every
+        change: the snapshot is built off the write path, at most once per
+        publish_interval, so queuing a whole card sends a handful of events.
+        """
+        with self._publish_cond:
+            self._publish_pending = True
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._publish_loop, name="journal-publisher", daemon=True)
+                self._publisher.start()
+            self._publish_cond.notify()
+
+    def _publish_loop(self):
+        while True:
+            with self._publish_cond:
+                self._publish_cond.wait_for(lambda: self._publish_pending)
+                self._publish_pending = False
+            try:
+                event_bus.publish("queue", self.pending())
+            except Exception as e:
+                logging.error(f"Failed to publish queue: {e}")
+            # Changes in the meantime coalesce into the next snapshot
+            time.sleep(self.publish_interval)
+
+
+def get_job_journal(queue_path: str, config: ConfigParser | None = None) -> JobJournal:
+    """Return the process-wide journal for queue_path, applying [Journal] settings when config is given."""
+    db_path = journal_db_path(queue_path)
+    with _journals_lock:
+        journal = _journals.get(db_path)
+        if journal is None:
+            journal = JobJournal(db_path)
+            _journals[db_path] = journal
+    if config is not None:
+        journal.retention_days = config.getint('Journal', 'retention_days', fallback=DEFAULT_RETENTION_DAYS)
+        journal.publish_interval = config.getfloat('Journal', 'publish_interval', fallback=DEFAULT_PUBLISH_INTERVAL)
+    return journal
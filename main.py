@@ -4,17 +4,31 @@ import time
 import logging
 import atexit
 import shutil
+import subprocess
 import fcntl
+import hashlib
 from configparser import ConfigParser
 import json
 import threading
 import queue
 import argparse
 from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 
 # These imports will fail if the modules don't exist, but they are part of the project
-from processor import process_clip, update_status
+from processor import update_status
+from status import get_status_publisher, DEFAULT_RATE_HZ
+from history import get_history_store, new_session_id
+from journal import get_job_journal, JobJournal, CLAIMED, RUNNING, DONE, FAILED
+from pipeline import ClipPipeline
+from thread_budget import thread_planner
+from scheduler import create_queue
+from farm import start_coordinator, run_farm_worker
+from scanner import CardScanner, StabilizationTracker, IdentityIndex, DEFAULT_IDENTITY_INDEX_SIZE
 from api_server import start_api_server
+from control import EngineControl
+from events import event_bus, EventLogHandler
 
 # Use temp directory for lock files (works in bundled apps)
 import tempfile
@@ -25,191 +39,367 @@ _lock_file_handle = None
 # Global queue for files to be processed
 file_queue = queue.Queue()
 
-# Track files that have been queued to prevent duplicates
-queued_files = set()
-queued_files_lock = threading.Lock()
+# Track files that have been queued this session to prevent duplicates
+queued_files = IdentityIndex()
 
-# Pause control - shared between GUI and engine
-_pause_control_path = None
-_pause_lock = threading.Lock()
+# Pause control - shared in-process by the GUI, the API and the engine workers
+engine_control = EngineControl()
 
 
 def get_pause_state():
-    """Read the current pause state from control file."""
-    global _pause_control_path
-    if not _pause_control_path or not os.path.exists(_pause_control_path):
-        return {"paused": False, "pause_requested": False}
-    try:
-        with open(_pause_control_path, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {"paused": False, "pause_requested": False}
+    """Return the current pause state."""
+    return engine_control.state()
 
 
 def set_pause_state(paused=None, pause_requested=None):
-    """Update the pause state control file."""
-    global _pause_control_path
-    if not _pause_control_path:
-        return
-    with _pause_lock:
-        state = get_pause_state()
-        if paused is not None:
-            state["paused"] = paused
-        if pause_requested is not None:
-            state["pause_requested"] = pause_requested
-        try:
-            with open(_pause_control_path, 'w') as f:
-                json.dump(state, f)
-        except Exception as e:
-            logging.error(f"Failed to write pause state: {e}")
+    """Update the pause state; workers waiting on a pause wake immediately."""
+    engine_control.update(paused=paused, pause_requested=pause_requested)
 
 
-def wait_for_file_to_stabilize(file_path: str, delay: int = 2):
-    """Waits for the file to stop changing size."""
-    logging.info(f"Waiting for {os.path.basename(file_path)} to stabilize...")
-    last_size = -1
-    attempt = 0
-    max_attempts = 5  # Reduced - camera card files are already complete
-    while attempt < max_attempts:
+CLAIM_DIR = os.path.join(_temp_dir, '.field_ingest_claims')
+
+
+def claim_file(file_path: str):
+    """
+    Claim a clip for this worker using a per-file lock.
+    Returns the open lock handle, or None if another worker already holds it.
+    """
+    os.makedirs(CLAIM_DIR, exist_ok=True)
+    digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+    lock_path = os.path.join(CLAIM_DIR, f"{digest}.lock")
+    while True:
+        handle = open(lock_path, 'a')
         try:
-            current_size = os.path.getsize(file_path)
-            if current_size == last_size and current_size > 0:
-                logging.info(f"File {os.path.basename(file_path)} has stabilized.")
-                return True
-            else:
-                last_size = current_size
-                attempt += 1
-                time.sleep(delay)
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            handle.close()
+            return None
+        # release_claim unlinks the file while holding the lock; if that happened
+        # after we opened it, our lock is on a dead inode and we must reopen
+        try:
+            opened, current = os.fstat(handle.fileno()), os.stat(lock_path)
+            if (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino):
+                break
         except FileNotFoundError:
-            logging.warning(f"File {file_path} disappeared during stabilization check.")
-            return False
-        except Exception as e:
-            logging.error(f"Error checking file stability for {file_path}: {e}")
-            return False
-    logging.warning(f"File {file_path} did not stabilize after {max_attempts * delay} seconds.")
-    return False
+            pass
+        handle.close()
+    handle.truncate(0)
+    handle.write(file_path)
+    handle.flush()
+    return handle
+
+
+def release_claim(handle):
+    """Release a per-file claim taken with claim_file() and remove its lock file."""
+    if not handle:
+        return
+    try:
+        # Unlinked while still locked, so claim_file never keeps a lock on a removed file
+        os.unlink(handle.name)
+    except OSError:
+        pass
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    except Exception:
+        pass
+    try:
+        handle.close()
+    except Exception:
+        pass
+
+
+def sweep_stale_claims():
+    """Remove lock files left by workers that crashed while holding a claim."""
+    try:
+        names = os.listdir(CLAIM_DIR)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith('.lock'):
+            continue
+        try:
+            handle = open(os.path.join(CLAIM_DIR, name), 'a')
+        except OSError:
+            continue
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            handle.close()  # held by a running worker
+            continue
+        release_claim(handle)
 
-WORKER_LOCK_FILE = os.path.join(_temp_dir, '.field_ingest_worker.lock')
 
-def worker(q: queue.Queue, config: ConfigParser):
-    """Worker thread function to process files from the queue."""
-    processing_folder = os.path.expanduser(config['Paths'].get('processing', ''))
+def get_worker_count(config: ConfigParser) -> int:
+    """Resolve [Processing] workers (auto or a number) to a thread count."""
+    raw = config.get('Processing', 'workers', fallback='auto').strip().lower()
+    if raw in ('', 'auto'):
+        # FFmpeg is already multi-threaded; one clip per ~4 cores keeps the box busy
+        return max(1, (os.cpu_count() or 1) // 4)
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        logging.warning(f"Invalid [Processing] workers value '{raw}'; using 1.")
+        return 1
 
+
+def _check_pause_requested():
+    """After completing a file, pause if the GUI asked for it."""
+    if engine_control.complete_pending_pause():
+        logging.info("Pause requested. Engine pausing after completing current file.")
+
+
+def worker(q: queue.Queue, config: ConfigParser, pipeline: ClipPipeline, journal: JobJournal | None = None,
+           one_at_a_time: bool = False):
+    """
+    Worker thread function: claims files from the queue and feeds the pipeline.
+    The worker runs the probe stage itself; bake/encode run on the pipeline's
+    stage threads, and the claim is released once the clip is finalized.
+    Each step is recorded in the job journal so a restart can resume.
+    With one_at_a_time the worker waits for its clip to finish before taking
+    another, leaving the rest of the queue to farm workers.
+    """
     while True:
         # Check if paused before getting next file
-        while True:
-            pause_state = get_pause_state()
-            if pause_state.get("paused", False):
-                logging.info("Engine is paused. Waiting to resume...")
-                time.sleep(1)
-                continue
-            break
+        if engine_control.paused:
+            logging.info("Engine is paused. Waiting to resume...")
+            engine_control.wait_while_paused()
 
-        # Use timeout so we can check pause state periodically
+        # Use timeout so a pause issued while idle is honoured before the next file
         try:
             original_path = q.get(timeout=1)
         except queue.Empty:
             continue
 
         if original_path is None:  # Signal to stop the worker
+            q.task_done()
             break
 
         file_path = original_path
         filename = os.path.basename(file_path)
-
-        try:
-            worker_lock = open(WORKER_LOCK_FILE, 'w')
-            fcntl.flock(worker_lock.fileno(), fcntl.LOCK_EX)
-        except Exception as e:
-            logging.error(f"Failed to acquire worker lock: {e}")
+        claim = claim_file(file_path)
+        if claim is None:
+            # The worker holding the claim journals this clip; leave its entry alone
+            logging.info(f"Skipping {filename}: already claimed by another worker.")
             q.task_done()
             continue
+        if journal:
+            journal.transition(file_path, CLAIMED)
 
-        logging.info(f"Worker processing file from queue: {file_path}")
+        finished = threading.Event()
 
-        if not wait_for_file_to_stabilize(file_path):
-            logging.warning(f"Skipping {file_path}: Not stabilized or disappeared.")
-        elif not os.path.exists(file_path):
-            logging.warning(f"Skipping {file_path}: Disappeared after stabilization.")
-        else:
-            # Process file in place (don't move from source - it may be read-only)
-            logging.info(f"Starting transcode of: {filename}")
-            try:
-                process_clip(file_path, config)
-            except Exception as e:
-                logging.error(f"Error processing {file_path} from worker: {e}")
+        def _done(job, claim=claim, file_path=file_path, finished=finished):
+            finished.set()
+            if journal:
+                if job.status == "succeeded":
+                    journal.transition(file_path, DONE)
+                else:
+                    journal.transition(file_path, FAILED, job.error_details or None)
+            release_claim(claim)
+            q.task_done()
+            _check_pause_requested()
+
+        logging.info(f"{threading.current_thread().name} processing file from queue: {file_path}")
 
         try:
-            fcntl.flock(worker_lock.fileno(), fcntl.LOCK_UN)
-            worker_lock.close()
-        except:
-            pass
+            # Files only reach the queue once the StabilizationTracker saw them settle
+            if not os.path.exists(file_path):
+                logging.warning(f"Skipping {file_path}: Disappeared after stabilization.")
+                error = "Source file disappeared"
+            else:
+                # Process file in place (don't move from source - it may be read-only)
+                logging.info(f"Starting transcode of: {filename}")
+                if journal:
+                    journal.transition(file_path, RUNNING)
+                pipeline.submit(file_path, on_done=_done)
+                if one_at_a_time:
+                    finished.wait()
+                continue
+        except Exception as e:
+            logging.error(f"Error processing {file_path} from worker: {e}")
+            error = str(e)
+        if journal:
+            journal.transition(file_path, FAILED, error)
+        release_claim(claim)
         q.task_done()
 
-        # After completing a file, check if pause was requested
-        pause_state = get_pause_state()
-        if pause_state.get("pause_requested", False):
-            logging.info("Pause requested. Engine pausing after completing current file.")
-            set_pause_state(paused=True, pause_requested=False)
-
-def enqueue_file(file_path: str, file_queue: queue.Queue, source: str):
-    """Safely add a file to the processing queue."""
-    filename = os.path.basename(file_path)
-    with queued_files_lock:
-        if filename in queued_files:
-            return False
-        queued_files.add(filename)
+
+def start_workers(q: queue.Queue, config: ConfigParser, journal: JobJournal | None = None):
+    """Start the clip pipeline and the configured number of worker threads on the queue."""
+    count = get_worker_count(config)
+    sweep_stale_claims()
+    thread_planner.configure(config.get('Pipeline', 'cpu_budget', fallback='auto'))
+    pipeline = ClipPipeline(config).start()
+    one_at_a_time = config.getboolean('Farm', 'coordinator', fallback=False)
+    if one_at_a_time:
+        # Coordinator: only take as many clips as the pipeline can work on, like a farm worker
+        count = pipeline.bake_workers + pipeline.encode_workers if config.getboolean('Farm', 'local_transcode', fallback=True) else 0
+    threads = []
+    for i in range(count):
+        t = threading.Thread(target=worker, args=(q, config, pipeline, journal, one_at_a_time), name=f"worker-{i + 1}", daemon=True)
+        t.start()
+        threads.append(t)
+    logging.info(f"Started {count} intake worker(s).")
+    return pipeline, threads
+
+
+def stop_workers(q: queue.Queue, pipeline: ClipPipeline, threads):
+    """Signal every worker thread to exit once the queue drains, then stop the pipeline."""
+    for _ in threads:
+        q.put(None)
+    q.join()
+    pipeline.shutdown()
+
+def enqueue_file(file_path: str, file_queue: queue.Queue, source: str, journal: JobJournal | None = None):
+    """Safely add a file to the processing queue, journaling it first."""
+    if not queued_files.add(file_path):
+        return False
+    if journal and not journal.add(file_path, source):
+        return False
     logging.info(f"New file detected by {source}: {file_path}")
     file_queue.put(file_path)
     return True
 
 class IngestEventHandler(FileSystemEventHandler):
-    # ... (rest of the class is unchanged)
-    def __init__(self, config: ConfigParser, file_queue: queue.Queue):
+    """Enqueues media files as the observer reports them created or moved in."""
+    def __init__(self, config: ConfigParser, file_queue: queue.Queue, watch_path: str | None = None,
+                 journal: JobJournal | None = None):
         super().__init__()
         self.config = config
         self.file_queue = file_queue
+        self.journal = journal
         self.processing_extensions = config.get('Processing', 'allowed_extensions').split(',')
         self.skip_extensions = config.get('Processing', 'skip_extensions', fallback='').split(',')
         self.last_seen_files = set()
+        self.tracker = StabilizationTracker(
+            settle_age=config.getfloat('Watch', 'settle_age', fallback=30.0),
+            min_interval=config.getfloat('Watch', 'stabilize_interval', fallback=2.0),
+        )
+        self.scanner = None
+        if watch_path:
+            self.scanner = CardScanner(watch_path, self.processing_extensions, self.skip_extensions)
+
+    def _handle_path(self, path: str):
+        _, ext = os.path.splitext(path)
+        if ext.lower() in self.skip_extensions:
+            logging.warning(f"Skipping unsupported image sequence file: {path}")
+            return
+        if self.scanner is not None and not self.scanner.is_candidate(path):
+            return
+        if ext.lower() in self.processing_extensions:
+            self.tracker.add(path, "watchdog")
+
+    def release_stable_files(self):
+        """Move files that have finished stabilizing onto the processing queue."""
+        for path, source in self.tracker.poll():
+            enqueue_file(path, self.file_queue, source, self.journal)
 
     def on_created(self, event):
         if not event.is_directory:
-            _, ext = os.path.splitext(event.src_path)
-            if ext.lower() in self.skip_extensions:
-                logging.warning(f"Skipping unsupported image sequence file: {event.src_path}")
-                return
-            if ext.lower() in self.processing_extensions:
-                enqueue_file(event.src_path, self.file_queue, "watchdog")
+            self._handle_path(event.src_path)
 
     def on_moved(self, event):
         if not event.is_directory:
-            _, ext = os.path.splitext(event.dest_path)
-            if ext.lower() in self.skip_extensions:
-                logging.warning(f"Skipping unsupported image sequence file: {event.dest_path}")
-                return
-            if ext.lower() in self.processing_extensions:
-                enqueue_file(event.dest_path, self.file_queue, "watchdog")
+            self._handle_path(event.dest_path)
 
 def scan_watch_folder(handler: IngestEventHandler, watch_path: str):
-    """Scans the watch folder for new files."""
+    """Scans the watch folder (and the card structure below it) for new files."""
     try:
-        current_files = set(os.listdir(watch_path))
-        new_files = current_files - handler.last_seen_files
-        # Sort alphabetically so clips process in order (C001, C002, C003...)
-        for file_name in sorted(new_files):
-            full_path = os.path.join(watch_path, file_name)
-            if os.path.isfile(full_path):
-                _, ext = os.path.splitext(file_name)
-                if ext.lower() in handler.skip_extensions:
-                    logging.warning(f"Skipping unsupported image sequence file: {full_path}")
-                    continue
-                if ext.lower() in handler.processing_extensions:
-                    enqueue_file(full_path, handler.file_queue, "polling")
+        if handler.scanner is None or handler.scanner.root != watch_path:
+            handler.scanner = CardScanner(watch_path, handler.processing_extensions, handler.skip_extensions)
+        # Results come back sorted by path so clips process in order (C001, C002, C003...)
+        scanned = handler.scanner.scan()
+        current_files = {f.path for f in scanned}
+        for f in scanned:
+            if f.path not in handler.last_seen_files:
+                handler.tracker.add(f.path, "polling")
         handler.last_seen_files = current_files
     except Exception as e:
         logging.error(f"Error during folder scan: {e}")
 
+
+# Filesystems where inotify/FSEvents don't report changes made by other machines
+NETWORK_FS_TYPES = {'smbfs', 'cifs', 'smb3', 'nfs', 'nfs4', 'afpfs', 'webdav', 'fuse.sshfs', 'sshfs'}
+
+
+def _list_mounts():
+    """Return (mount_point, fs_type) pairs for the mounted filesystems."""
+    mounts = []
+    if os.path.exists('/proc/mounts'):
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3:
+                    mounts.append((parts[1].replace('\\040', ' '), parts[2]))
+        return mounts
+    # macOS: "//user@nas/share on /Volumes/share (smbfs, nodev, nosuid, mounted by user)"
+    try:
+        output = subprocess.check_output(['mount'], text=True, timeout=5)
+    except Exception:
+        return mounts
+    for line in output.splitlines():
+        if ' on ' not in line or ' (' not in line:
+            continue
+        rest = line.split(' on ', 1)[1]
+        mount_point, options = rest.rsplit(' (', 1)
+        mounts.append((mount_point, options.split(',')[0].strip()))
+    return mounts
+
+
+def is_network_mount(path: str) -> bool:
+    """True if path lives on an SMB/NFS/AFP-style network filesystem."""
+    real = os.path.realpath(path)
+    best_mount, best_type = '', ''
+    for mount_point, fs_type in _list_mounts():
+        prefix = mount_point.rstrip('/') + '/'
+        if (real == mount_point or real.startswith(prefix)) and len(mount_point) > len(best_mount):
+            best_mount, best_type = mount_point, fs_type
+    return best_type.lower() in NETWORK_FS_TYPES
+
+
+def create_observer(config: ConfigParser, watch_path: str):
+    """
+    Build a watchdog observer for the watch folder.
+    [Watch] observer = auto picks the native observer unless the folder is on a
+    network mount, where native events don't fire and PollingObserver is used.
+    """
+    mode = config.get('Watch', 'observer', fallback='auto').strip().lower()
+    poll_interval = config.getfloat('Watch', 'polling_interval', fallback=2.0)
+    if mode == 'auto':
+        mode = 'polling' if is_network_mount(watch_path) else 'native'
+    if mode == 'polling':
+        return PollingObserver(timeout=poll_interval), 'polling'
+    return Observer(), 'native'
+
+
+def start_observer(config: ConfigParser, handler: FileSystemEventHandler, watch_path: str):
+    """Start an observer on watch_path, falling back to polling if native events are unavailable."""
+    observer, kind = create_observer(config, watch_path)
+    try:
+        observer.schedule(handler, watch_path, recursive=True)
+        observer.start()
+    except Exception as e:
+        if kind == 'polling':
+            raise
+        logging.warning(f"Native file events unavailable for {watch_path} ({e}); falling back to polling.")
+        observer = PollingObserver(timeout=config.getfloat('Watch', 'polling_interval', fallback=2.0))
+        observer.schedule(handler, watch_path, recursive=True)
+        observer.start()
+        kind = 'polling'
+    return observer, kind
+
+
+def resume_journal(journal: JobJournal, file_queue: queue.Queue):
+    """Put the jobs a previous run didn't finish back on the queue, in their original order."""
+    for file_path in journal.recover():
+        if not os.path.exists(file_path):
+            logging.warning(f"Not resuming {file_path}: source is no longer there.")
+            journal.transition(file_path, FAILED, "Source missing on resume")
+            continue
+        queued_files.add(file_path)
+        logging.info(f"Resuming journaled job: {file_path}")
+        file_queue.put(file_path)
+
+
 def acquire_lock():
     """Prevent multiple instances using atomic file locking."""
     global _lock_file_handle
@@ -241,18 +431,8 @@ def release_lock():
         if os.path.exists(LOCK_FILE):
             os.remove(LOCK_FILE)
 
-def start_engine(config: ConfigParser):
-    """
-    The core logic of the ingest engine.
-    This function is designed to be called from main() or from the GUI.
-    """
-    paths = config['Paths']
-    watch_path = os.path.expanduser(paths['watch'])
-    log_path = os.path.expanduser(paths['logs'])
-    processing_path = os.path.expanduser(paths.get('processing', ''))
-    queue_file_path = os.path.expanduser(paths.get('queue_file', 'queue.json'))
-
-    # --- Setup Logging ---
+def setup_logging(log_path: str):
+    """Log to ingest_engine.log in log_path, the console and the event bus."""
     log_file = os.path.join(log_path, 'ingest_engine.log')
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
@@ -261,17 +441,32 @@ def start_engine(config: ConfigParser):
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
             logging.FileHandler(log_file),
-            logging.StreamHandler()
+            logging.StreamHandler(),
+            EventLogHandler(event_bus)
         ],
         force=True
     )
+
+
+def start_engine(config: ConfigParser):
+    """
+    The core logic of the ingest engine.
+    This function is designed to be called from main() or from the GUI.
+    """
+    paths = config['Paths']
+    watch_path = os.path.expanduser(paths['watch'])
+    log_path = os.path.expanduser(paths['logs'])
+    queue_file_path = os.path.expanduser(paths.get('queue_file', 'queue.json'))
+
+    # --- Setup Logging ---
+    setup_logging(log_path)
     logging.info("--- Starting Transcoder ---")
 
     # --- Start API Server ---
     api_port = int(config.get('API', 'port', fallback='8081'))
     api_host = config.get('API', 'host', fallback='0.0.0.0')
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    start_api_server(config, base_dir, host=api_host, port=api_port)
+    start_api_server(config, base_dir, host=api_host, port=api_port, control=engine_control)
 
     # --- Create Folders ---
     for key in ['processing', 'temp', 'output', 'processed', 'error']:
@@ -280,22 +475,32 @@ def start_engine(config: ConfigParser):
             os.makedirs(p)
             logging.info(f"Created folder: {p}")
 
-    # --- Recover stuck files ---
-    if processing_path and os.path.isdir(processing_path):
-        pass
-
-    # --- Initialize Status & Queue Files ---
+    # --- Initialize Status ---
     status_path = os.path.expanduser(config['Paths']['status_file'])
+    status_publisher = get_status_publisher(status_path, rate_hz=config.getfloat('Status', 'publish_rate_hz', fallback=DEFAULT_RATE_HZ))
     update_status(status_path, {"status": "idle", "file": "None", "progress": 0, "stage": "Idle"})
-    with open(queue_file_path, 'w') as f:
-        json.dump([], f)
+
+    # --- Open History Store (one session per engine run) ---
+    history_store = get_history_store(config['Paths']['history_file'], config)
+    history_store.session_id = new_session_id()
+    history_store.compact()
+    logging.info(f"History: {history_store.db_path} (session {history_store.session_id})")
+
+    # --- Open Job Journal (the live queue; survives crashes) ---
+    journal = get_job_journal(queue_file_path, config)
+    journal.session_id = history_store.session_id
+    journal.destination = os.path.abspath(os.path.expanduser(paths['output']))
+    queued_files.max_entries = config.getint('Watch', 'identity_index_size', fallback=DEFAULT_IDENTITY_INDEX_SIZE)
+    queued_files.start_session(history_store.session_id)
+    logging.info(f"Job journal: {journal.db_path}")
 
     # --- Initialize Pause Control File ---
-    global _pause_control_path
-    _pause_control_path = os.path.expanduser(paths.get('pause_file', os.path.join(os.path.dirname(status_path), 'pause_control.json')))
-    with open(_pause_control_path, 'w') as f:
-        json.dump({"paused": False, "pause_requested": False}, f)
-    logging.info(f"Pause control file: {_pause_control_path}")
+    # pause_control.json is only a mirror of the in-process state for outside tools
+    pause_mirror_path = None
+    if config.getboolean('Control', 'persist_pause_file', fallback=True):
+        pause_mirror_path = os.path.expanduser(paths.get('pause_file', os.path.join(os.path.dirname(status_path), 'pause_control.json')))
+        logging.info(f"Pause control mirror: {pause_mirror_path}")
+    engine_control.reset(mirror_path=pause_mirror_path)
 
     # --- Check for tool paths ---
     art_cli_path = os.path.expanduser(paths['art_cli'])
@@ -307,70 +512,110 @@ def start_engine(config: ConfigParser):
         logging.error(f"Watch folder not found at '{watch_path}'.")
         return
 
-    processing_queue = queue.Queue()
-    worker_thread = threading.Thread(target=worker, args=(processing_queue, config), daemon=True)
-    worker_thread.start()
+    processing_queue = create_queue(config)
+    journal.order_source = processing_queue.order
+    processing_queue.on_change = journal.publish_queue
+    pipeline, worker_threads = start_workers(processing_queue, config, journal)
+    event_handler = IngestEventHandler(config, processing_queue, watch_path, journal)
+
+    # --- Farm: lease queued clips to --worker-of engines as well ---
+    coordinator = None
+    if config.getboolean('Farm', 'coordinator', fallback=False):
+        coordinator = start_coordinator(config, processing_queue, journal, engine_control)
 
     # --- Manual file list mode (from GUI) ---
+    file_list = []
     file_list_raw = os.environ.get("TEN2_FILE_LIST", "")
     if file_list_raw:
         try:
             file_list = json.loads(file_list_raw)
         except Exception:
             file_list = []
-        if isinstance(file_list, list) and file_list:
-            logging.info(f"Processing {len(file_list)} selected file(s).")
-            for file_path in file_list:
-                if os.path.isfile(file_path):
-                    enqueue_file(file_path, processing_queue, "manual")
-                else:
-                    logging.warning(f"Selected file not found: {file_path}")
-
-            while not processing_queue.empty():
-                try:
-                    queue_snapshot = list(processing_queue.queue)
-                    with open(queue_file_path, 'w') as f:
-                        json.dump(queue_snapshot, f)
-                except Exception as e:
-                    logging.error(f"Failed to write queue status file: {e}")
-                time.sleep(1)
-
-            processing_queue.join()
-            try:
-                with open(queue_file_path, 'w') as f:
-                    json.dump([], f)
-            except Exception as e:
-                logging.error(f"Failed to clear queue status file: {e}")
-            try:
-                with queued_files_lock:
-                    queued_files.clear()
-            except Exception as e:
-                logging.error(f"Failed to clear queued files set: {e}")
-            update_status(status_path, {"status": "idle", "file": "None", "progress": 0, "stage": "Idle"})
-            logging.info("--- Manual file list complete ---")
-            return
+    manual_mode = isinstance(file_list, list) and bool(file_list)
+
+    # --- Resume whatever the last run left unfinished (not for a GUI file selection) ---
+    if not manual_mode:
+        resume_journal(journal, processing_queue)
+    else:
+        logging.info(f"Processing {len(file_list)} selected file(s).")
+        for file_path in file_list:
+            if os.path.isfile(file_path):
+                event_handler.tracker.add(file_path, "manual")
+            else:
+                logging.warning(f"Selected file not found: {file_path}")
+
+        while len(event_handler.tracker) or not processing_queue.empty():
+            event_handler.release_stable_files()
+            time.sleep(1)
+
+        # Waits for every clip, including any leased to farm workers
+        stop_workers(processing_queue, pipeline, worker_threads)
+        if coordinator:
+            coordinator.close()
+        queued_files.start_session(None)
+        update_status(status_path, {"status": "idle", "file": "None", "progress": 0, "stage": "Idle"})
+        status_publisher.flush()
+        logging.info("--- Manual file list complete ---")
+        return
 
-    event_handler = IngestEventHandler(config, processing_queue)
-    logging.info(f"Monitoring folder: {watch_path} (polling every 5 seconds)")
+    reconcile_interval = config.getfloat('Watch', 'reconcile_interval', fallback=60.0)
 
+    # Pick up everything already on the card, then let file events drive new arrivals
+    scan_watch_folder(event_handler, watch_path)
+    observer, observer_kind = start_observer(config, event_handler, watch_path)
+    logging.info(f"Monitoring folder: {watch_path} ({observer_kind} events, reconciling every {reconcile_interval:g} seconds)")
+
+    last_reconcile = time.time()
     try:
         while True:
-            scan_watch_folder(event_handler, watch_path)
-            
-            # Write queue contents to file for GUI
-            try:
-                queue_snapshot = list(processing_queue.queue)
-                with open(queue_file_path, 'w') as f:
-                    json.dump(queue_snapshot, f)
-            except Exception as e:
-                logging.error(f"Failed to write queue status file: {e}")
-
-            time.sleep(5)  # Poll every 5 seconds
+            # Slow safety-net scan in case an event was missed
+            if time.time() - last_reconcile >= reconcile_interval:
+                scan_watch_folder(event_handler, watch_path)
+                last_reconcile = time.time()
+
+            # One batched size/mtime pass over everything still settling
+            event_handler.release_stable_files()
+
+            time.sleep(1)
     except KeyboardInterrupt:
         logging.info("--- Stopping Transcoder ---")
     finally:
-        processing_queue.put(None) # Signal worker to stop
-        processing_queue.join()
+        observer.stop()
+        observer.join(timeout=5)
+        if coordinator:
+            coordinator.close()
+        stop_workers(processing_queue, pipeline, worker_threads)  # Signal workers to stop
+        status_publisher.flush()
+        logging.shutdown()
+
+
+def start_farm_worker(config: ConfigParser, coordinator_url: str):
+    """
+    Run as a farm worker: no watch folder, API or local queue; clips are
+    leased from the coordinator at coordinator_url and results reported back.
+    """
+    paths = config['Paths']
+    setup_logging(os.path.expanduser(paths['logs']))
+    logging.info(f"--- Starting Transcoder farm worker for {coordinator_url} ---")
+
+    for key in ['temp', 'output']:
+        p = os.path.expanduser(paths.get(key, ''))
+        if p and not os.path.exists(p):
+            os.makedirs(p)
+            logging.info(f"Created folder: {p}")
+
+    status_path = os.path.expanduser(paths['status_file'])
+    status_publisher = get_status_publisher(status_path, rate_hz=config.getfloat('Status', 'publish_rate_hz', fallback=DEFAULT_RATE_HZ))
+    update_status(status_path, {"status": "idle", "file": "None", "progress": 0, "stage": "Idle"})
+    history_store = get_history_store(paths['history_file'], config)
+    history_store.session_id = new_session_id()
+
+    thread_planner.configure(config.get('Pipeline', 'cpu_budget', fallback='auto'))
+    pipeline = ClipPipeline(config).start()
+    try:
+        run_farm_worker(config, coordinator_url, pipeline, slots=pipeline.bake_workers + pipeline.encode_workers)
+    finally:
+        status_publisher.flush()
         logging.shutdown()
 
 
@@ -378,16 +623,20 @@ def main(path_overrides=None):
     """
     Entry point: parses args, loads config, and starts the engine.
     """
-    acquire_lock()
-
     # CLI arguments can still be used if the app is not run from the GUI
     parser = argparse.ArgumentParser(description="10-2 Transcoder.")
     parser.add_argument("--watch", help="Override the watch folder path.")
     parser.add_argument("--output", help="Override the output folder path.")
+    parser.add_argument("--worker-of", metavar="URL", help="Run as a farm worker leasing clips from the coordinator at URL.")
+    parser.add_argument("--config", default="config.ini", help="Config file to read (default: config.ini).")
     args = parser.parse_args()
 
+    # Farm workers share the machine with other engines; only a full engine is single-instance
+    if not args.worker_of:
+        acquire_lock()
+
     config = ConfigParser()
-    config.read('config.ini')
+    config.read(args.config)
 
     # Build a dictionary of overrides from CLI args
     cli_overrides = {}
@@ -404,7 +653,10 @@ def main(path_overrides=None):
         for key, value in final_overrides.items():
             config.set('Paths', key, value)
 
-    start_engine(config)
+    if args.worker_of:
+        start_farm_worker(config, args.worker_of)
+    else:
+        start_engine(config)
 
 
 if __name__ == "__main__":
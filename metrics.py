@@ -0,0 +1,116 @@
+"""
+Per-clip processing metrics, exposed by the API at /api/metrics.
+
+finalize_clip hands every finished clip's history record (stage timings,
+bytes read/written, realtime factor) to clip_metrics, which aggregates them
+into Prometheus histograms and counters for the life of the process.
+"""
+
+import threading
+
+# Upper bounds (seconds) for stage duration buckets
+STAGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+# Upper bounds for media-seconds-per-wall-second buckets
+REALTIME_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _render_histogram(lines, name, histogram, **labels):
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f"{name}_bucket{_labels(**labels, le=f'{bound:g}')} {count}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+class ClipMetrics:
+    """Aggregates finished-clip records into histograms and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stage_seconds = {}  # stage -> Histogram
+        self._clip_seconds = Histogram(STAGE_BUCKETS)
+        self._realtime = Histogram(REALTIME_BUCKETS)
+        self._clips = {}          # status -> count
+        self._bytes_read = 0
+        self._bytes_written = 0
+        self._media_seconds = 0.0
+
+    def observe(self, record: dict):
+        with self._lock:
+            status = record.get("status", "unknown")
+            self._clips[status] = self._clips.get(status, 0) + 1
+            for stage, seconds in (record.get("timings") or {}).items():
+                self._stage_seconds.setdefault(stage, Histogram(STAGE_BUCKETS)).observe(seconds)
+            if record.get("wall_time"):
+                self._clip_seconds.observe(record["wall_time"])
+            if status == "succeeded" and record.get("realtime_factor"):
+                self._realtime.observe(record["realtime_factor"])
+                self._media_seconds += record.get("media_duration") or 0.0
+            self._bytes_read += record.get("bytes_read") or 0
+            self._bytes_written += record.get("bytes_written") or 0
+
+    def render(self) -> str:
+        """Return the metrics in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append("# HELP transcoder_clips_total Clips finished, by result.")
+            lines.append("# TYPE transcoder_clips_total counter")
+            for status, count in sorted(self._clips.items()):
+                lines.append(f"transcoder_clips_total{_labels(status=status)} {count}")
+
+            lines.append("# HELP transcoder_stage_seconds Wall time spent in each processing stage per clip (queue_wait: waiting for a stage worker).")
+            lines.append("# TYPE transcoder_stage_seconds histogram")
+            for stage, histogram in sorted(self._stage_seconds.items()):
+                _render_histogram(lines, "transcoder_stage_seconds", histogram, stage=stage)
+
+            lines.append("# HELP transcoder_clip_seconds Wall time per clip from start to finalize, excluding queue_wait.")
+            lines.append("# TYPE transcoder_clip_seconds histogram")
+            _render_histogram(lines, "transcoder_clip_seconds", self._clip_seconds)
+
+            lines.append("# HELP transcoder_realtime_factor Media duration divided by wall time for succeeded clips.")
+            lines.append("# TYPE transcoder_realtime_factor histogram")
+            _render_histogram(lines, "transcoder_realtime_factor", self._realtime)
+
+            lines.append("# HELP transcoder_media_seconds_total Media seconds transcoded successfully.")
+            lines.append("# TYPE transcoder_media_seconds_total counter")
+            lines.append(f"transcoder_media_seconds_total {self._media_seconds:.3f}")
+
+            lines.append("# HELP transcoder_bytes_read_total Bytes read from sources and intermediates.")
+            lines.append("# TYPE transcoder_bytes_read_total counter")
+            lines.append(f"transcoder_bytes_read_total {self._bytes_read}")
+
+            lines.append("# HELP transcoder_bytes_written_total Bytes written to outputs and intermediates.")
+            lines.append("# TYPE transcoder_bytes_written_total counter")
+            lines.append(f"transcoder_bytes_written_total {self._bytes_written}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics shared by the engine and the API server
+clip_metrics = ClipMetrics()
@@ -0,0 +1,125 @@
+"""
+Staged clip pipeline: probe -> bake -> encode -> finalize.
+
+ART baking is GPU/CPU heavy while FFmpeg encoding is CPU/disk heavy, so each
+stage gets its own worker threads connected by bounded queues. The next clip's
+ART bake runs while the current clip encodes, and a full queue pushes back on
+the stage feeding it instead of piling intermediates up in the temp folder.
+"""
+
+import queue
+import logging
+import threading
+from configparser import ConfigParser
+
+from processor import (ClipJob, prepare_clip, bake_clip, encode_clip, finalize_clip, run_stage, mark_queued,
+                       end_queue_wait, _get_output_preset)
+from thread_budget import thread_planner, preset_scaling, useful_threads
+
+
+def _stage_limit(config: ConfigParser, key: str, default: int) -> int:
+    raw = config.get('Pipeline', key, fallback='auto').strip().lower()
+    if raw in ('', 'auto'):
+        return default
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        logging.warning(f"Invalid [Pipeline] {key} value '{raw}'; using {default}.")
+        return default
+
+
+class ClipPipeline:
+    """
+    Runs clips through the pipeline stages with per-stage concurrency limits.
+
+    submit() runs the probe stage in the caller's thread (the engine workers)
+    and hands the job on to the bake and encode stages. on_done is called with
+    the finished ClipJob once finalize has run, whether the clip succeeded or not.
+    """
+
+    def __init__(self, config: ConfigParser, encode_default: int | None = None):
+        self.config = config
+        if encode_default is None:
+            # encode_workers = auto: as many encodes as the preset's scaling makes worthwhile
+            preset = _get_output_preset(config)
+            encode_default = thread_planner.recommended_jobs(preset)
+            logging.info(f"Thread plan: {preset['name']} scales {preset_scaling(preset)} -> {encode_default} encode(s) x "
+                         f"up to {useful_threads(preset)} thread(s) on {thread_planner.cpu_count} CPU(s).")
+        self.bake_workers = _stage_limit(config, 'bake_workers', 1)
+        self.encode_workers = _stage_limit(config, 'encode_workers', encode_default)
+        thread_planner.planned_jobs = self.encode_workers
+        depth = _stage_limit(config, 'queue_depth', 2)
+        self._bake_queue = queue.Queue(maxsize=depth)
+        self._encode_queue = queue.Queue(maxsize=depth)
+        self._threads = []
+
+    def start(self):
+        for i in range(self.bake_workers):
+            self._spawn(f"bake-{i + 1}", self._bake_loop)
+        for i in range(self.encode_workers):
+            self._spawn(f"encode-{i + 1}", self._encode_loop)
+        logging.info(f"Pipeline started: {self.bake_workers} bake / {self.encode_workers} encode worker(s).")
+        return self
+
+    def _spawn(self, name, target):
+        t = threading.Thread(target=target, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def submit(self, source_path: str, on_done=None) -> ClipJob:
+        """Probe a clip and queue it for baking. Blocks while the bake queue is full."""
+        job = ClipJob(source_path, self.config)
+        if run_stage(prepare_clip, job):
+            mark_queued(job)
+            self._bake_queue.put((job, on_done))
+        else:
+            self._finish(job, on_done)
+        return job
+
+    def _bake_loop(self):
+        while True:
+            item = self._bake_queue.get()
+            if item is None:
+                self._bake_queue.task_done()
+                break
+            job, on_done = item
+            end_queue_wait(job)
+            try:
+                if run_stage(bake_clip, job):
+                    mark_queued(job)
+                    self._encode_queue.put((job, on_done))
+                else:
+                    self._finish(job, on_done)
+            finally:
+                self._bake_queue.task_done()
+
+    def _encode_loop(self):
+        while True:
+            item = self._encode_queue.get()
+            if item is None:
+                self._encode_queue.task_done()
+                break
+            job, on_done = item
+            end_queue_wait(job)
+            try:
+                run_stage(encode_clip, job)
+                self._finish(job, on_done)
+            finally:
+                self._encode_queue.task_done()
+
+    def _finish(self, job: ClipJob, on_done):
+        finalize_clip(job)
+        if on_done:
+            try:
+                on_done(job)
+            except Exception as e:
+                logging.error(f"Pipeline completion callback failed for {job.filename}: {e}")
+
+    def shutdown(self):
+        """Drain both stage queues and stop the stage threads."""
+        for _ in range(self.bake_workers):
+            self._bake_queue.put(None)
+        self._bake_queue.join()
+        for _ in range(self.encode_workers):
+            self._encode_queue.put(None)
+        self._encode_queue.join()
@@ -0,0 +1,181 @@
+"""
+Persistent ffprobe cache shared by the engine, the GUI and the PDF report.
+
+Parsed ffprobe JSON is stored in a small SQLite database under
+~/.10-2-transcoder/, keyed by file path and validated against the file's
+size, mtime and inode so an edited or replaced clip is always re-probed.
+Entries are evicted least-recently-used once the entry or size limit is hit.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import subprocess
+from configparser import ConfigParser
+
+DEFAULT_DB_PATH = '~/.10-2-transcoder/probe_cache.sqlite'
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_MAX_MB = 64
+
+# Only bump last_access when it is older than this, so hot reads don't write
+_TOUCH_INTERVAL = 60
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def run_ffprobe(file_path: str, ffprobe_path: str) -> dict:
+    """
+    Run the single consolidated ffprobe pass (format + streams) and return
+    the parsed JSON. Raises subprocess.CalledProcessError on failure.
+    """
+    cmd = [
+        ffprobe_path,
+        "-v", "error",
+        "-show_format",
+        "-show_streams",
+        "-of", "json",
+        file_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    try:
+        return json.loads(result.stdout) if result.stdout else {}
+    except json.JSONDecodeError:
+        raise subprocess.CalledProcessError(1, cmd, result.stdout, "ffprobe returned unparseable output")
+
+
+class ProbeCache:
+    """SQLite-backed LRU cache of ffprobe results."""
+
+    def __init__(self, db_path: str, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS probes ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " inode INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " bytes INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS probes_last_access ON probes (last_access)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Probe cache unavailable at {db_path}: {e}")
+            self._conn = None
+
+    @staticmethod
+    def _key(file_path: str):
+        st = os.stat(file_path)
+        return os.path.abspath(file_path), st.st_size, st.st_mtime_ns, st.st_ino
+
+    def get(self, file_path: str) -> dict | None:
+        """Return cached ffprobe JSON for file_path, or None if missing/stale."""
+        if self._conn is None:
+            return None
+        try:
+            path, size, mtime_ns, inode = self._key(file_path)
+        except OSError:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT size, mtime_ns, inode, data, last_access FROM probes WHERE path = ?", (path,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if (row[0], row[1], row[2]) != (size, mtime_ns, inode):
+                    self._conn.execute("DELETE FROM probes WHERE path = ?", (path,))
+                    self._conn.commit()
+                    return None
+                now = time.time()
+                if now - row[4] > _TOUCH_INTERVAL:
+                    self._conn.execute("UPDATE probes SET last_access = ? WHERE path = ?", (now, path))
+                    self._conn.commit()
+                return json.loads(row[3])
+            except (sqlite3.Error, json.JSONDecodeError) as e:
+                logging.debug(f"Probe cache read failed for {file_path}: {e}")
+                return None
+
+    def put(self, file_path: str, data: dict):
+        """Store ffprobe JSON for file_path and evict old entries if needed."""
+        if self._conn is None:
+            return
+        try:
+            path, size, mtime_ns, inode = self._key(file_path)
+        except OSError:
+            return
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO probes (path, size, mtime_ns, inode, data, bytes, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, size, mtime_ns, inode, payload, len(payload), time.time())
+                )
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.debug(f"Probe cache write failed for {file_path}: {e}")
+
+    def _evict(self):
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM probes").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Drop the least recently used rows until both limits are satisfied
+        excess = 0
+        freed = 0
+        for (size,) in self._conn.execute("SELECT bytes FROM probes ORDER BY last_access ASC"):
+            if count - excess <= self.max_entries and total - freed <= self.max_bytes:
+                break
+            excess += 1
+            freed += size
+        self._conn.execute(
+            "DELETE FROM probes WHERE path IN (SELECT path FROM probes ORDER BY last_access ASC LIMIT ?)", (excess,)
+        )
+
+    def probe(self, file_path: str, ffprobe_path: str) -> dict:
+        """Return ffprobe JSON for file_path, running ffprobe only on a cache miss."""
+        data = self.get(file_path)
+        if data is not None:
+            return data
+        data = run_ffprobe(file_path, ffprobe_path)
+        self.put(file_path, data)
+        return data
+
+    def clear(self):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM probes")
+            self._conn.commit()
+
+
+def get_probe_cache(config: ConfigParser | None = None) -> ProbeCache:
+    """Return the process-wide probe cache configured by [Cache] in config.ini."""
+    db_path = DEFAULT_DB_PATH
+    max_entries = DEFAULT_MAX_ENTRIES
+    max_mb = DEFAULT_MAX_MB
+    if config is not None and config.has_section('Cache'):
+        db_path = config.get('Cache', 'probe_cache', fallback=DEFAULT_DB_PATH)
+        max_entries = config.getint('Cache', 'probe_cache_max_entries', fallback=DEFAULT_MAX_ENTRIES)
+        max_mb = config.getint('Cache', 'probe_cache_max_mb', fallback=DEFAULT_MAX_MB)
+    db_path = os.path.expanduser(db_path)
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = ProbeCache(db_path, max_entries=max_entries, max_bytes=max_mb * 1024 * 1024)
+            _caches[db_path] = cache
+        return cache
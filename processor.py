@@ -6,10 +6,23 @@ import re
 import sys
 import json
 import time
+import tempfile
 import threading
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import timedelta, datetime
 from configparser import ConfigParser
 
+from probe_cache import ProbeCache, get_probe_cache, run_ffprobe
+from status import get_status_publisher
+from history import get_history_store
+from metrics import clip_metrics
+from thread_budget import thread_planner, useful_threads
+from segments import segment_settings, keyframe_probe_cmd, keyframe_times, plan_segments, write_concat_list
+from fingerprint import SourceFingerprint, get_output_index, output_is_current, read_sidecar, write_sidecar, recipe_digest, file_digest
+
 CAMERA_FAMILIES = [
     "ARRI Alexa 35",
     "ARRI Alexa Mini",
@@ -33,33 +46,16 @@ logging.basicConfig(
 )
 
 def update_status(status_path, status_data):
-    """Safely writes status data to a JSON file."""
-    try:
-        with open(status_path, 'w') as f:
-            json.dump(status_data, f, indent=4)
-    except Exception as e:
-        logging.error(f"Failed to write status file {status_path}: {e}")
+    """Publishes status data; status.json is rewritten atomically at the configured rate."""
+    get_status_publisher(status_path).publish(status_data)
+
+def finish_status(status_path, filename):
+    """Removes a finished clip from the status; it reads idle once no clips are in flight."""
+    get_status_publisher(status_path).finish(filename)
 
 def log_to_history(history_path, record):
-    """Appends a new record to the history JSON file."""
-    try:
-        history = []
-        if os.path.exists(history_path):
-            with open(history_path, 'r') as f:
-                history = json.load(f)
-        
-        # Add new record to the top of the list
-        history.insert(0, record)
-        
-        # Keep history to a reasonable size, e.g., 100 entries
-        if len(history) > 100:
-            history = history[:100]
-            
-        with open(history_path, 'w') as f:
-            json.dump(history, f, indent=4)
-            
-    except Exception as e:
-        logging.error(f"Failed to write to history file {history_path}: {e}")
+    """Appends a new record to the history store (history.sqlite beside history_path)."""
+    get_history_store(history_path).append(record)
 
 
 def _load_lut_selection():
@@ -75,24 +71,73 @@ def _load_lut_selection():
     return {}
 
 
-def _ffprobe_tags(file_path: str, ffprobe_path: str):
-    cmd = [
-        ffprobe_path,
-        "-v", "error",
-        "-show_entries", "format_tags:stream_tags",
-        "-of", "json",
-        file_path
-    ]
+@dataclass
+class MediaInfo:
+    """Everything the pipeline needs from one ffprobe pass over a clip."""
+    path: str
+    duration: float = 0.0
+    format_name: str = ""
+    codec: str | None = None
+    pix_fmt: str | None = None
+    frame_rate: float | None = None
+    width: int | None = None
+    height: int | None = None
+    tags: dict = field(default_factory=dict)
+    streams: list = field(default_factory=list)
+
+    @classmethod
+    def from_ffprobe(cls, path: str, data: dict):
+        fmt = data.get("format", {}) or {}
+        streams = data.get("streams", []) or []
+        tags = {}
+        tags.update(fmt.get("tags", {}) or {})
+        for stream in streams:
+            tags.update(stream.get("tags", {}) or {})
+        try:
+            duration = float(fmt.get("duration") or 0)
+        except (TypeError, ValueError):
+            duration = 0.0
+        info = cls(path=path, duration=duration, format_name=fmt.get("format_name", ""), tags=tags, streams=streams)
+        video = info.video_stream
+        if video:
+            info.codec = video.get("codec_name")
+            info.pix_fmt = video.get("pix_fmt")
+            info.width = video.get("width")
+            info.height = video.get("height")
+            info.frame_rate = _parse_frame_rate(video.get("avg_frame_rate") or video.get("r_frame_rate"))
+        return info
+
+    @property
+    def video_stream(self):
+        for stream in self.streams:
+            if stream.get("codec_type") == "video":
+                return stream
+        return None
+
+
+def _parse_frame_rate(rate: str | None) -> float | None:
+    if not rate or "/" not in rate:
+        return None
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        data = json.loads(result.stdout) if result.stdout else {}
-    except Exception:
-        return {}
-    tags = {}
-    tags.update(data.get("format", {}).get("tags", {}) or {})
-    for stream in data.get("streams", []) or []:
-        tags.update(stream.get("tags", {}) or {})
-    return tags
+        num, den = rate.split("/", 1)
+        if float(den) == 0:
+            return None
+        return round(float(num) / float(den), 3)
+    except ValueError:
+        return None
+
+
+def probe_media(file_path: str, ffprobe_path: str, cache: ProbeCache | None = None) -> MediaInfo:
+    """
+    Run a single ffprobe pass (format + streams) and return a MediaInfo.
+    When a ProbeCache is given, previously seen files cost no subprocess.
+    Raises subprocess.CalledProcessError if ffprobe cannot read the file.
+    """
+    if cache is not None:
+        data = cache.probe(file_path, ffprobe_path)
+    else:
+        data = run_ffprobe(file_path, ffprobe_path)
+    return MediaInfo.from_ffprobe(file_path, data)
 
 
 def _tag_text(tags: dict):
@@ -105,9 +150,8 @@ def _tag_text(tags: dict):
     return " ".join(parts).upper()
 
 
-def _detect_camera_family(file_path: str, ffprobe_path: str):
-    tags = _ffprobe_tags(file_path, ffprobe_path)
-    combined = _tag_text(tags)
+def _detect_camera_family(file_path: str, media: MediaInfo):
+    combined = _tag_text(media.tags)
     filename = os.path.basename(file_path).upper()
     ext = os.path.splitext(filename)[1].lower()
 
@@ -188,33 +232,21 @@ def _ffmpeg_supports_filter(ffmpeg_path: str, filter_name: str) -> bool:
     return supported
 
 
-def _ffprobe_pix_fmt(file_path: str, ffprobe_path: str) -> str | None:
-    cmd = [
-        ffprobe_path,
-        "-v", "error",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=pix_fmt",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        file_path
-    ]
-    try:
-        out = subprocess.check_output(cmd, text=True).strip()
-        return out or None
-    except Exception:
+def _pre_vf_for_pix_fmt(pix_fmt: str | None, ffmpeg_path: str) -> str | None:
+    """Pick a colorspace conversion for 4:4:4 / RGB sources, if one is needed."""
+    if not (pix_fmt and (pix_fmt.startswith("yuv444p") or "gbr" in pix_fmt)):
         return None
+    if _ffmpeg_supports_filter(ffmpeg_path, "zscale"):
+        return "zscale=primaries=bt709:transfer=bt709:matrix=bt709,format=yuv422p"
+    if _ffmpeg_supports_filter(ffmpeg_path, "colorspace"):
+        return "setparams=color_primaries=bt709:color_trc=bt709:colorspace=bt709,colorspace=all=bt709,format=yuv422p"
+    logging.warning("No colorspace filter available for 4444 input; attempting direct conversion.")
+    return None
 
 
-def _validate_media_readable(file_path: str, ffprobe_path: str) -> tuple[bool, str]:
-    cmd = [
-        ffprobe_path,
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        file_path
-    ]
+def _validate_media_readable(file_path: str, ffprobe_path: str, cache: ProbeCache | None = None) -> tuple[bool, MediaInfo | str]:
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return True, result.stdout.strip()
+        return True, probe_media(file_path, ffprobe_path, cache=cache)
     except subprocess.CalledProcessError as e:
         stderr = (e.stderr or "").strip()
         stdout = (e.stdout or "").strip()
@@ -222,6 +254,11 @@ def _validate_media_readable(file_path: str, ffprobe_path: str) -> tuple[bool, s
         return False, msg
 
 
+def _ffprobe_path(config: ConfigParser) -> str:
+    """The ffprobe that ships next to the configured FFmpeg."""
+    return os.path.expanduser(config.get('Paths', 'ffmpeg', fallback='ffmpeg')).replace('ffmpeg', 'ffprobe')
+
+
 def _get_output_preset(config: ConfigParser):
     preset_name = os.environ.get("TEN2_OUTPUT_PRESET") or config.get('Output', 'default_preset', fallback='DNxHD_145')
     section = f"Preset.{preset_name}"
@@ -240,13 +277,26 @@ def _get_output_preset(config: ConfigParser):
         "acodec": config.get(section, 'acodec', fallback='pcm_s24le'),
         "audio_bitrate": config.get(section, 'audio_bitrate', fallback=''),
         "audio_rate": config.get(section, 'audio_rate', fallback='48000'),
+        "scaling": config.get(section, 'scaling', fallback=''),
+        "threads": config.get(section, 'threads', fallback=''),
+        "cost": config.get(section, 'cost', fallback=''),
     }
     return preset
 
 
-def _build_ffmpeg_cmd(ffmpeg_path: str, input_path: str, output_path: str, preset: dict, vf_chain: str | None):
-    cmd = [ffmpeg_path, "-i", input_path]
+def _build_ffmpeg_cmd(ffmpeg_path: str, input_path: str, output_path: str, preset: dict, vf_chain: str | None,
+                      input_args: list[str] | None = None, threads: int | None = None, audio: bool = True):
+    cmd = [ffmpeg_path]
+    if threads:
+        # Keep decode, filter graph and encoder inside this job's CPU share
+        cmd += ["-filter_threads", str(threads)]
+        input_args = [*(input_args or []), "-threads", str(threads)]
+    cmd += [*(input_args or []), "-i", input_path]
     cmd += ["-c:v", preset["vcodec"]]
+    if threads:
+        cmd += ["-threads", str(threads)]
+        if preset["vcodec"] == "libx265":
+            cmd += ["-x265-params", f"pools={threads}"]
 
     if preset["video_bitrate"]:
         cmd += ["-b:v", preset["video_bitrate"]]
@@ -259,313 +309,899 @@ def _build_ffmpeg_cmd(ffmpeg_path: str, input_path: str, output_path: str, prese
     if vf_chain:
         cmd += ["-vf", vf_chain]
 
-    cmd += ["-c:a", preset["acodec"]]
+    if audio:
+        cmd += _audio_args(preset)
+    else:
+        cmd += ["-an"]
+
+    cmd += ["-f", preset["container"], "-y", output_path]
+    return cmd
+
+
+def _audio_args(preset: dict) -> list[str]:
+    args = ["-c:a", preset["acodec"]]
     if preset["audio_bitrate"]:
-        cmd += ["-b:a", preset["audio_bitrate"]]
+        args += ["-b:a", preset["audio_bitrate"]]
     if preset["audio_rate"]:
-        cmd += ["-ar", str(preset["audio_rate"])]
+        args += ["-ar", str(preset["audio_rate"])]
+    return args
 
-    cmd += ["-f", preset["container"], "-y", output_path]
+def _build_art_cmd(art_cli_path: str, source_path: str, output_path: str, art_colorspace: str | None):
+    cmd = [
+        art_cli_path,
+        "process",
+        "--input", source_path,
+        "--output", output_path,
+        "--embedded-look",
+        "--video-codec", "prores422"
+    ]
+    if art_colorspace:
+        cmd += ["--target-colorspace", art_colorspace]
     return cmd
 
-def process_clip(source_path: str, config: ConfigParser):
+
+def _art_rejected_target_colorspace(output: str) -> bool:
+    # Newer ART builds only accept --target-colorspace for embedded looks with DRT LUTs
+    return "target-colorspace argument is only valid for embedded looks with drt luts" in output.lower()
+
+
+def _run_art(cmd: list[str], status_path: str, filename: str) -> tuple[int, str, str, float]:
+    logging.info(f"Running ART CLI: {' '.join(cmd)}")
+    art_start_time = time.time()
+    process = _popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    # Update status while ART is processing
+    while process.poll() is None:
+        elapsed = time.time() - art_start_time
+        update_status(status_path, {
+            "status": "processing",
+            "file": filename,
+            "progress": 0,
+            "stage": "ARRI Processing",
+            "elapsed": round(elapsed, 1)
+        })
+        # Print progress to console
+        sys.stdout.write(f'\rARRI Processing: Elapsed {str(timedelta(seconds=int(elapsed)))}...')
+        sys.stdout.flush()
+        time.sleep(1)
+
+    stdout, stderr = process.communicate()
+    sys.stdout.write('\n')
+    art_elapsed = time.time() - art_start_time
+    return process.returncode, stdout or "", stderr or "", art_elapsed
+
+
+def _bake_art_intermediate(art_cli_path: str, source_path: str, intermediate_path: str, art_colorspace: str | None,
+                           status_path: str, filename: str):
+    """Bake the embedded look into a ProRes MXF intermediate. Raises CalledProcessError on failure."""
+    base_art_cmd = _build_art_cmd(art_cli_path, source_path, intermediate_path, art_colorspace)
+
+    # Run ART CLI with progress updates showing elapsed time
+    rc, stdout, stderr, art_elapsed = _run_art(base_art_cmd, status_path, filename)
+
+    if rc != 0 and art_colorspace and _art_rejected_target_colorspace(stdout + "\n" + stderr):
+        logging.warning("ART CLI rejected --target-colorspace for this embedded look; retrying without it.")
+        fallback_cmd = _build_art_cmd(art_cli_path, source_path, intermediate_path, None)
+        rc, stdout, stderr, art_elapsed = _run_art(fallback_cmd, status_path, filename)
+
+    if rc != 0:
+        logging.error(f"ART CLI failed with exit code {rc}")
+        if stdout:
+            logging.error(f"ART CLI stdout: {stdout}")
+        if stderr:
+            logging.error(f"ART CLI stderr: {stderr}")
+        # Check if intermediate file was partially created
+        if os.path.exists(intermediate_path):
+            partial_size = os.path.getsize(intermediate_path)
+            logging.error(f"Partial intermediate file exists ({partial_size} bytes) - cleaning up")
+            os.remove(intermediate_path)
+        raise subprocess.CalledProcessError(rc, base_art_cmd, stdout, stderr)
+
+    logging.info(f"ART CLI finished successfully in {str(timedelta(seconds=int(art_elapsed)))}")
+    if stdout:
+        logging.info(f"ART CLI stdout:\n{stdout}")
+    if stderr:
+        logging.warning(f"ART CLI stderr:\n{stderr}")
+
+
+# Set once ART has been seen to fail on a pipe but succeed on a regular file
+_ART_STREAMING_UNSUPPORTED = False
+
+
+def _art_streaming_enabled(settings) -> bool:
+    if _ART_STREAMING_UNSUPPORTED or not hasattr(os, "mkfifo"):
+        return False
+    return settings.get("art_streaming", "true").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _mark_art_streaming_unsupported():
+    global _ART_STREAMING_UNSUPPORTED
+    if not _ART_STREAMING_UNSUPPORTED:
+        logging.warning("Disabling ART streaming for this session; using temp intermediates.")
+    _ART_STREAMING_UNSUPPORTED = True
+
+
+def _release_fifo_reader(fifo_path: str):
+    """Open and close the write end so a reader still blocked in open() sees EOF."""
+    try:
+        fd = os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+        os.close(fd)
+    except OSError:
+        pass
+
+
+def _stream_art_into_ffmpeg(art_cli_path: str, source_path: str, fifo_path: str, art_colorspace: str | None,
+                            ffmpeg_cmd: list[str], total_duration: float, status_path: str, filename: str) -> bool:
     """
-    Processes a single video file by applying ARRI look and transcoding to DNxHD.
+    Run ART writing into a named pipe while FFmpeg encodes from it.
+    Returns False if ART could not produce its output through the pipe, so the
+    caller can fall back to the two-pass intermediate. Raises CalledProcessError
+    if ART succeeded but FFmpeg failed.
     """
-    status_path = os.path.expanduser(config['Paths']['status_file'])
-    history_path = os.path.expanduser(config['Paths']['history_file'])
-    
-    start_time = datetime.now()
-    processing_status = "failed" # Assume failure until proven otherwise
-    error_details = ""
-
-    filename = os.path.basename(source_path) # Define filename here for broader scope
-    
+    art_cmd = _build_art_cmd(art_cli_path, source_path, fifo_path, art_colorspace)
+    if os.path.exists(fifo_path):
+        os.remove(fifo_path)
+    os.mkfifo(fifo_path)
+    art_log = tempfile.TemporaryFile(mode="w+")
     try:
-        logging.info(f"--- Processing: {filename} ---")
-        update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "Starting"})
-
-
-        # --- Read paths and settings from config ---
-        paths = config['Paths']
-        settings = config['Settings']
-
-        art_cli_path = os.path.expanduser(paths['art_cli'])
-        ffmpeg_path = os.path.expanduser(paths['ffmpeg'])
-        ffprobe_path = ffmpeg_path.replace('ffmpeg', 'ffprobe')
-
-        temp_folder = os.path.expanduser(paths['temp'])
-        output_folder = os.path.expanduser(paths['output'])
-        processed_folder = os.path.expanduser(paths['processed'])
-
-        # --- Pre-flight checks ---
-        if not os.path.exists(source_path):
-            raise RuntimeError(f"Source file not found or network share unavailable: {source_path}")
-
-        if not os.path.isdir(temp_folder):
-            raise RuntimeError(f"Temp folder not found: {temp_folder}")
-
-        if not os.path.isdir(output_folder):
-            raise RuntimeError(f"Output folder not found: {output_folder}")
-
-        # --- Validate input is readable ---
-        ok, info = _validate_media_readable(source_path, ffprobe_path)
-        if not ok:
-            raise RuntimeError(f"Invalid or incomplete media file: {info}")
-
-        # --- Detect camera family and LUT ---
-        camera_family = _detect_camera_family(source_path, ffprobe_path)
-        logging.info(f"Detected camera: {camera_family}")
-        use_art = _should_use_art(camera_family, art_cli_path, source_path)
-        if camera_family.startswith("ARRI") and not use_art:
-            ext = os.path.splitext(source_path)[1].lower()
-            if ext in (".mov", ".mp4", ".m4v"):
-                logging.info("ART CLI skipped for MOV/MP4 container; using LUT/FFmpeg pipeline.")
-        embed_lut = os.environ.get("TEN2_EMBED_LUT", "1") != "0"
-        skip_lut_env = os.environ.get("TEN2_SKIP_LUT_CAMERAS", "")
-        skip_lut = {c.strip() for c in skip_lut_env.split(";") if c.strip()}
-        lut_path = None
-        if embed_lut and not use_art and camera_family not in skip_lut:
-            lut_path = _get_lut_for_camera(camera_family, config)
-        if not use_art and lut_path is None:
-            logging.warning(f"No LUT found for {camera_family}. Proceeding without LUT.")
-
-        if use_art and not os.path.exists(art_cli_path):
-            raise RuntimeError(f"ARRI Reference Tool (art-cmd) not found at: {art_cli_path}")
-
-        # --- Output preset ---
-        preset = _get_output_preset(config)
-        container_ext = preset["container"]
-
-        # --- Define file paths ---
-        intermediate_path = os.path.join(temp_folder, f"{os.path.splitext(filename)[0]}_BAKED.mxf")
-        final_output_path = os.path.join(output_folder, f"{os.path.splitext(filename)[0]}.{container_ext}")
-        
-        if use_art:
-            # --- 1. Run ARRI CLI ---
-            logging.info("Step 1: Baking ARRI Look with ART CLI...")
-            update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "ARRI Processing", "elapsed": 0})
-            use_target_colorspace = settings.get("art_use_target_colorspace", "true").strip().lower() in ("1", "true", "yes", "on")
-            base_art_cmd = [
-                art_cli_path,
-                "process",
-                "--input", source_path,
-                "--output", intermediate_path,
-                "--embedded-look",
-                "--video-codec", "prores422"
-            ]
-            if use_target_colorspace:
-                base_art_cmd += ["--target-colorspace", settings['art_colorspace']]
-
-            def _run_art(cmd: list[str]) -> tuple[int, str, str, float]:
-                logging.info(f"Running ART CLI: {' '.join(cmd)}")
-                art_start_time = time.time()
-                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-                # Update status while ART is processing
-                while process.poll() is None:
-                    elapsed = time.time() - art_start_time
-                    update_status(status_path, {
-                        "status": "processing",
-                        "file": filename,
-                        "progress": 0,
-                        "stage": "ARRI Processing",
-                        "elapsed": round(elapsed, 1)
-                    })
-                    # Print progress to console
-                    sys.stdout.write(f'\rARRI Processing: Elapsed {str(timedelta(seconds=int(elapsed)))}...')
-                    sys.stdout.flush()
-                    time.sleep(1)
-
-                stdout, stderr = process.communicate()
-                sys.stdout.write('\n')
-                art_elapsed = time.time() - art_start_time
-                return process.returncode, stdout or "", stderr or "", art_elapsed
-
-            # Run ART CLI with progress updates showing elapsed time
-            rc, stdout, stderr, art_elapsed = _run_art(base_art_cmd)
-
-            if rc != 0:
-                # Fallback for newer ART behavior: target-colorspace only valid with DRT LUTs
-                err_text = (stdout + "\n" + stderr).lower()
-                if "target-colorspace argument is only valid for embedded looks with drt luts" in err_text:
-                    logging.warning("ART CLI rejected --target-colorspace for this embedded look; retrying without it.")
-                    fallback_cmd = [arg for arg in base_art_cmd if arg not in ("--target-colorspace", settings['art_colorspace'])]
-                    rc, stdout, stderr, art_elapsed = _run_art(fallback_cmd)
-
-            if rc != 0:
-                logging.error(f"ART CLI failed with exit code {rc}")
-                if stdout:
-                    logging.error(f"ART CLI stdout: {stdout}")
-                if stderr:
-                    logging.error(f"ART CLI stderr: {stderr}")
-                # Check if intermediate file was partially created
-                if os.path.exists(intermediate_path):
-                    partial_size = os.path.getsize(intermediate_path)
-                    logging.error(f"Partial intermediate file exists ({partial_size} bytes) - cleaning up")
-                    os.remove(intermediate_path)
-                raise subprocess.CalledProcessError(rc, base_art_cmd, stdout, stderr)
-
-            logging.info(f"ART CLI finished successfully in {str(timedelta(seconds=int(art_elapsed)))}")
-            if stdout:
-                logging.info(f"ART CLI stdout:\n{stdout}")
-            if stderr:
-                logging.warning(f"ART CLI stderr:\n{stderr}")
-
-            # --- 2. Get video duration for progress calculation ---
-            logging.info("Step 2: Analyzing intermediate file...")
-            update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "Analyzing"})
-            ffprobe_cmd = [
-                ffprobe_path,
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                intermediate_path
-            ]
-            try:
-                duration_str = subprocess.check_output(ffprobe_cmd, text=True).strip()
-                total_duration = float(duration_str)
-                logging.info(f"Total duration to process: {total_duration:.2f}s")
-            except (subprocess.CalledProcessError, ValueError) as e:
-                logging.error(f"Failed to get video duration from intermediate file: {e}")
-                total_duration = 0
-
-            # --- 3. Run FFmpeg and monitor progress ---
-            logging.info("Step 3: Transcoding with FFmpeg...")
-            update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "FFmpeg Transcoding"})
-            pix_fmt = _ffprobe_pix_fmt(intermediate_path, ffprobe_path)
-            pre_vf = None
-            if pix_fmt and (pix_fmt.startswith("yuv444p") or "gbr" in pix_fmt):
-                if _ffmpeg_supports_filter(ffmpeg_path, "zscale"):
-                    pre_vf = "zscale=primaries=bt709:transfer=bt709:matrix=bt709,format=yuv422p"
-                elif _ffmpeg_supports_filter(ffmpeg_path, "colorspace"):
-                    pre_vf = "setparams=color_primaries=bt709:color_trc=bt709:colorspace=bt709,colorspace=all=bt709,format=yuv422p"
-                else:
-                    logging.warning("No colorspace filter available for 4444 input; attempting direct conversion.")
-            vf_chain = _build_vf_chain(None, preset.get("vf") or "", pre_vf=pre_vf)
-            ffmpeg_cmd = _build_ffmpeg_cmd(ffmpeg_path, intermediate_path, final_output_path, preset, vf_chain)
+        logging.info(f"Running ART CLI (streaming): {' '.join(art_cmd)}")
+        art_start_time = time.time()
+        art = _popen(art_cmd, stdout=art_log, stderr=subprocess.STDOUT, text=True)
+        ffmpeg = _popen(ffmpeg_cmd, stderr=subprocess.PIPE, universal_newlines=True)
+
+        def _watch_art():
+            art.wait()
+            if art.returncode != 0:
+                if ffmpeg.poll() is None:
+                    ffmpeg.kill()
+                return
+            # A reader that never got to open() the pipe would block forever; keep offering EOF
+            deadline = time.time() + 10
+            while ffmpeg.poll() is None and time.time() < deadline:
+                _release_fifo_reader(fifo_path)
+                time.sleep(0.2)
+
+        watcher = threading.Thread(target=_watch_art, daemon=True)
+        watcher.start()
+        ffmpeg_rc = _monitor_ffmpeg(ffmpeg, total_duration, status_path, filename)
+        if art.poll() is None and ffmpeg_rc != 0:
+            # FFmpeg gave up first; ART would otherwise block on a pipe nobody reads
+            art.kill()
+        watcher.join()
+
+        art_log.seek(0)
+        art_output = art_log.read()
+        if art.returncode != 0:
+            if art_colorspace and _art_rejected_target_colorspace(art_output):
+                logging.warning("ART CLI rejected --target-colorspace for this embedded look; retrying without it.")
+                return _stream_art_into_ffmpeg(art_cli_path, source_path, fifo_path, None, ffmpeg_cmd,
+                                               total_duration, status_path, filename)
+            logging.warning(f"ART CLI streaming failed with exit code {art.returncode}")
+            if art_output:
+                logging.warning(f"ART CLI output: {art_output}")
+            return False
+
+        logging.info(f"ART CLI finished streaming in {str(timedelta(seconds=int(time.time() - art_start_time)))}")
+        if art_output:
+            logging.info(f"ART CLI output:\n{art_output}")
+        if ffmpeg_rc != 0:
+            raise subprocess.CalledProcessError(ffmpeg_rc, ffmpeg_cmd, stderr="FFmpeg failed. See warnings above.")
+        return True
+    finally:
+        art_log.close()
+        if os.path.exists(fifo_path):
+            os.remove(fifo_path)
+
+
+def _monitor_ffmpeg(process: subprocess.Popen, total_duration: float, status_path: str, filename: str,
+                    on_progress=None) -> int:
+    """
+    Follow FFmpeg's stderr, publishing progress, and return its exit code.
+    With on_progress, encoded seconds are passed to it instead of being published.
+    """
+    time_regex = re.compile(r"time=(\d{2}:\d{2}:\d{2}\.\d{2})")
+
+    for line in iter(process.stderr.readline, ''):
+        match = time_regex.search(line)
+        if match:
+            elapsed_time_str = match.group(1)
+            h, m, s = map(float, elapsed_time_str.split(':'))
+            elapsed_seconds = h * 3600 + m * 60 + s
+
+            if on_progress:
+                on_progress(elapsed_seconds)
+            elif total_duration > 0:
+                percent = (elapsed_seconds / total_duration) * 100
+                bar = '█' * int(percent / 2) + '-' * (50 - int(percent / 2))
+                sys.stdout.write(f'\rProgress: [{bar}] {percent:.2f}% | Elapsed: {str(timedelta(seconds=int(elapsed_seconds)))} / {str(timedelta(seconds=int(total_duration)))}')
+                sys.stdout.flush()
+                update_status(status_path, {"status": "processing", "file": filename, "progress": round(percent, 2), "stage": "FFmpeg Transcoding", "elapsed": round(elapsed_seconds, 2), "total_duration": round(total_duration, 2)})
         else:
-            # --- Direct FFmpeg transcode (optional LUT) ---
-            logging.info("Step 1: Analyzing source file...")
-            update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "Analyzing"})
-            ffprobe_cmd = [
-                ffprobe_path,
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                source_path
-            ]
-            try:
-                duration_str = subprocess.check_output(ffprobe_cmd, text=True).strip()
-                total_duration = float(duration_str)
-                logging.info(f"Total duration to process: {total_duration:.2f}s")
-            except (subprocess.CalledProcessError, ValueError) as e:
-                logging.error(f"Failed to get video duration from source file: {e}")
-                total_duration = 0
-
-            logging.info("Step 2: Transcoding with FFmpeg...")
-            stage_name = "FFmpeg Transcoding"
-            if lut_path:
-                stage_name = "Applying LUT + Transcoding"
-            update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": stage_name})
-            pix_fmt = _ffprobe_pix_fmt(source_path, ffprobe_path)
-            pre_vf = None
-            if pix_fmt and (pix_fmt.startswith("yuv444p") or "gbr" in pix_fmt):
-                if _ffmpeg_supports_filter(ffmpeg_path, "zscale"):
-                    pre_vf = "zscale=primaries=bt709:transfer=bt709:matrix=bt709,format=yuv422p"
-                elif _ffmpeg_supports_filter(ffmpeg_path, "colorspace"):
-                    pre_vf = "setparams=color_primaries=bt709:color_trc=bt709:colorspace=bt709,colorspace=all=bt709,format=yuv422p"
-                else:
-                    logging.warning("No colorspace filter available for 4444 input; attempting direct conversion.")
-            vf_chain = _build_vf_chain(lut_path, preset.get("vf") or "", pre_vf=pre_vf)
-            ffmpeg_cmd = _build_ffmpeg_cmd(ffmpeg_path, source_path, final_output_path, preset, vf_chain)
-        
-        process = subprocess.Popen(ffmpeg_cmd, stderr=subprocess.PIPE, universal_newlines=True)
-
-        time_regex = re.compile(r"time=(\d{2}:\d{2}:\d{2}\.\d{2})")
-        
-        for line in iter(process.stderr.readline, ''):
-            match = time_regex.search(line)
-            if match:
-                elapsed_time_str = match.group(1)
-                h, m, s = map(float, elapsed_time_str.split(':'))
-                elapsed_seconds = h * 3600 + m * 60 + s
-                
-                if total_duration > 0:
-                    percent = (elapsed_seconds / total_duration) * 100
-                    bar = '█' * int(percent / 2) + '-' * (50 - int(percent / 2))
-                    sys.stdout.write(f'\rProgress: [{bar}] {percent:.2f}% | Elapsed: {str(timedelta(seconds=int(elapsed_seconds)))} / {str(timedelta(seconds=int(total_duration)))}')
-                    sys.stdout.flush()
-                    update_status(status_path, {"status": "processing", "file": filename, "progress": round(percent, 2), "stage": "FFmpeg Transcoding", "elapsed": round(elapsed_seconds, 2), "total_duration": round(total_duration, 2)})
-            else:
-                logging.warning(f"[FFmpeg Warning]: {line.strip()}")
-
-        process.wait()
+            logging.warning(f"[FFmpeg Warning]: {line.strip()}")
+
+    process.wait()
+    if not on_progress:
         sys.stdout.write('\n')
-        
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, ffmpeg_cmd, stderr="FFmpeg failed. See warnings above.")
+    return process.returncode
+
+
+def _run_ffmpeg_with_progress(ffmpeg_cmd: list[str], total_duration: float, status_path: str, filename: str):
+    """Run FFmpeg to completion with progress updates. Raises CalledProcessError on failure."""
+    process = _popen(ffmpeg_cmd, stderr=subprocess.PIPE, universal_newlines=True)
+    if _monitor_ffmpeg(process, total_duration, status_path, filename) != 0:
+        raise subprocess.CalledProcessError(process.returncode, ffmpeg_cmd, stderr="FFmpeg failed. See warnings above.")
+
+
+@dataclass
+class ClipJob:
+    """State carried through the probe -> bake -> encode -> finalize stages for one clip."""
+    source_path: str
+    config: ConfigParser
+    filename: str = ""
+    status_path: str = ""
+    history_path: str = ""
+    start_time: datetime = field(default_factory=datetime.now)
+    status: str = "failed"  # Assume failure until proven otherwise
+    error_details: str = ""
+    failed: bool = False
+    media: MediaInfo | None = None
+    camera_family: str = "Unknown"
+    use_art: bool = False
+    stream_art: bool = False
+    art_colorspace: str | None = None
+    lut_path: str | None = None
+    preset: dict = field(default_factory=dict)
+    art_cli_path: str = ""
+    ffmpeg_path: str = ""
+    ffprobe_path: str = ""
+    temp_folder: str = ""
+    # Unique per job: temp and partial files of two clips with the same name never collide
+    token: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    intermediate_path: str = ""
+    final_output_path: str = ""
+    intermediate: MediaInfo | None = None
+    timings: dict = field(default_factory=dict)  # stage name -> seconds
+    queued_at: float | None = None  # time.monotonic() when handed to the next stage's queue
+    threads: int | None = None  # FFmpeg thread budget for the encode stage
+    source_fp: SourceFingerprint | None = None
+    recipe: str = ""  # digest of everything that determines the output
+    reused: str | None = None  # "current" (output already valid) or "linked" (hard-linked from the index)
+    # Encodes write here; finalize moves it onto final_output_path once the clip succeeded
+    partial_output_path: str = ""
+    cancel_reason: str | None = None
+    _processes: list = field(default_factory=list, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        paths = self.config['Paths']
+        self.filename = self.filename or os.path.basename(self.source_path)
+        self.status_path = os.path.expanduser(paths['status_file'])
+        self.history_path = os.path.expanduser(paths['history_file'])
+
+    def cancel(self, reason: str):
+        """Stop the clip: kill its running tools and skip its remaining stages. Its partial output is discarded."""
+        with self._lock:
+            self.cancel_reason = reason
+            processes = list(self._processes)
+        logging.warning(f"Cancelling {self.filename}: {reason}")
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+
+    def _track(self, process: subprocess.Popen):
+        with self._lock:
+            if self.cancel_reason is None:
+                self._processes = [p for p in self._processes if p.poll() is None] + [process]
+                return
+        process.kill()
+
+
+class ClipCancelled(Exception):
+    """Raised when a cancelled clip would start another tool."""
+
+
+# The ClipJob whose stage runs on this thread, so the tools it starts can be cancelled
+_stage_job = threading.local()
+
+
+def _bind_stage_job(job: ClipJob | None):
+    _stage_job.job = job
+
+
+def _popen(cmd: list[str], **kwargs) -> subprocess.Popen:
+    """subprocess.Popen for the current stage's clip; ClipJob.cancel() kills it."""
+    job = getattr(_stage_job, "job", None)
+    if job is not None and job.cancel_reason is not None:
+        raise ClipCancelled(job.cancel_reason)
+    process = subprocess.Popen(cmd, **kwargs)
+    if job is not None:
+        job._track(process)
+    return process
+
+
+def _run_checked(cmd: list[str]) -> subprocess.CompletedProcess:
+    """subprocess.run(cmd, capture_output=True, text=True, check=True) through _popen."""
+    process = _popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    stdout, stderr = process.communicate()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+@contextmanager
+def _timed(job: ClipJob, stage: str):
+    """Add the wall time of the enclosed block to job.timings[stage]."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        job.timings[stage] = round(job.timings.get(stage, 0.0) + time.monotonic() - started, 3)
 
-        logging.info("FFmpeg finished successfully.")
 
-        # --- 4. Cleanup ---
-        logging.info("Step 4: Cleaning up intermediate file...")
-        update_status(status_path, {"status": "processing", "file": filename, "progress": 100, "stage": "Cleaning Up"})
-        if use_art and os.path.exists(intermediate_path):
-            os.remove(intermediate_path)
-            logging.info(f"Removed intermediate file: {intermediate_path}")
+def mark_queued(job: ClipJob):
+    """Note that job is waiting for the next pipeline stage."""
+    job.queued_at = time.monotonic()
 
-        # --- 5. Complete (source file stays in place) ---
-        logging.info("Step 5: Processing complete (source file unchanged)")
-        update_status(status_path, {"status": "processing", "file": filename, "progress": 100, "stage": "Complete"})
 
-        logging.info(f"--- Successfully processed {filename}. Final file at: {final_output_path} ---")
-        processing_status = "succeeded" # Set success status
+def end_queue_wait(job: ClipJob):
+    """Add the time since mark_queued to job.timings["queue_wait"]."""
+    if job.queued_at is not None:
+        job.timings["queue_wait"] = round(job.timings.get("queue_wait", 0.0) + time.monotonic() - job.queued_at, 3)
+        job.queued_at = None
 
 
-    except subprocess.CalledProcessError as e:
+def _file_size(path: str | None) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+
+def _record_failure(job: ClipJob, exc: Exception):
+    """Turn a stage exception into the job's error details, matching the old process_clip messages."""
+    job.failed = True
+    source_path = job.source_path
+    if job.cancel_reason is not None:
+        # Whatever the killed tools reported, the clip was stopped on purpose
+        job.error_details = f"Cancelled: {job.cancel_reason}"
+        logging.warning(f"{job.filename} cancelled: {job.cancel_reason}")
+    elif isinstance(exc, subprocess.CalledProcessError):
         # Include both stdout and stderr since some tools write errors to stdout
-        stderr_output = e.stderr.strip() if e.stderr else ""
-        stdout_output = e.stdout.strip() if e.stdout else ""
+        stderr_output = exc.stderr.strip() if exc.stderr else ""
+        stdout_output = exc.stdout.strip() if exc.stdout else ""
         output_info = stderr_output or stdout_output or "(no output captured)"
-        error_details = f"Command '{' '.join(e.cmd)}' returned non-zero exit status {e.returncode}. Output: {output_info}"
+        cmd = exc.cmd if isinstance(exc.cmd, str) else ' '.join(exc.cmd)
+        job.error_details = f"Command '{cmd}' returned non-zero exit status {exc.returncode}. Output: {output_info}"
         logging.error(f"An error occurred while processing {source_path}.")
-        logging.error(error_details)
-        update_status(status_path, {"status": "error", "file": filename, "progress": 0, "stage": "Error"})
-    except FileNotFoundError as e:
+        logging.error(job.error_details)
+        update_status(job.status_path, {"status": "error", "file": job.filename, "progress": 0, "stage": "Error"})
+    elif isinstance(exc, FileNotFoundError):
         # Determine if this is a missing tool or a missing file
-        missing_path = e.filename if e.filename else str(e)
-        # Check if variables are defined (they might not be if error occurred early)
-        tool_paths = []
-        try:
-            tool_paths = [art_cli_path, ffmpeg_path]
-        except NameError:
-            pass
-
+        missing_path = exc.filename if exc.filename else str(exc)
+        tool_paths = [p for p in (job.art_cli_path, job.ffmpeg_path, job.ffprobe_path) if p]
         if missing_path and missing_path in tool_paths:
-            error_details = f"CLI tool not found: {missing_path}. Check config.ini."
+            job.error_details = f"CLI tool not found: {missing_path}. Check config.ini."
         elif missing_path and (missing_path == source_path or
                                'watch_folder' in str(missing_path) or
                                'processing_folder' in str(missing_path) or
                                missing_path.endswith('.mxf') or
                                missing_path.endswith('.mov')):
-            error_details = f"Source file not found: {missing_path}. File may have been moved or deleted."
+            job.error_details = f"Source file not found: {missing_path}. File may have been moved or deleted."
+        else:
+            job.error_details = f"File not found: {missing_path}"
+        logging.error(job.error_details)
+    else:
+        job.error_details = f"An unexpected error occurred while processing {source_path}: {exc}"
+        logging.error(job.error_details)
+        update_status(job.status_path, {"status": "error", "file": job.filename, "progress": 0, "stage": "Error"})
+
+
+def run_stage(stage, job: ClipJob) -> bool:
+    """Run one pipeline stage, recording any failure on the job. Returns True if the job can continue."""
+    if job.failed:
+        return False
+    _bind_stage_job(job)
+    try:
+        if job.cancel_reason is not None:
+            raise ClipCancelled(job.cancel_reason)
+        stage(job)
+    except Exception as e:
+        _record_failure(job, e)
+    finally:
+        _bind_stage_job(None)
+    return not job.failed
+
+
+def prepare_clip(job: ClipJob):
+    """Probe stage: pre-flight checks, media probe, camera detection and output plan."""
+    source_path = job.source_path
+    filename = job.filename
+    config = job.config
+    status_path = job.status_path
+
+    logging.info(f"--- Processing: {filename} ---")
+    update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "Starting"})
+
+    # --- Read paths and settings from config ---
+    paths = config['Paths']
+    settings = config['Settings']
+
+    job.art_cli_path = os.path.expanduser(paths['art_cli'])
+    job.ffmpeg_path = os.path.expanduser(paths['ffmpeg'])
+    job.ffprobe_path = _ffprobe_path(config)
+
+    job.temp_folder = os.path.expanduser(paths['temp'])
+    output_folder = os.path.expanduser(paths['output'])
+
+    # --- Pre-flight checks ---
+    if not os.path.exists(source_path):
+        raise RuntimeError(f"Source file not found or network share unavailable: {source_path}")
+
+    if not os.path.isdir(job.temp_folder):
+        raise RuntimeError(f"Temp folder not found: {job.temp_folder}")
+
+    if not os.path.isdir(output_folder):
+        raise RuntimeError(f"Output folder not found: {output_folder}")
+
+    # --- Validate input is readable ---
+    with _timed(job, "validate"):
+        ok, media = _validate_media_readable(source_path, job.ffprobe_path, cache=get_probe_cache(config))
+    if not ok:
+        raise RuntimeError(f"Invalid or incomplete media file: {media}")
+    job.media = media
+
+    # --- Detect camera family and LUT ---
+    with _timed(job, "detect"):
+        _detect_camera_and_lut(job)
+
+    if job.use_art and not os.path.exists(job.art_cli_path):
+        raise RuntimeError(f"ARRI Reference Tool (art-cmd) not found at: {job.art_cli_path}")
+
+    if job.use_art:
+        use_target_colorspace = settings.get("art_use_target_colorspace", "true").strip().lower() in ("1", "true", "yes", "on")
+        job.art_colorspace = settings['art_colorspace'] if use_target_colorspace else None
+        job.stream_art = _art_streaming_enabled(settings)
+
+    # --- Output preset ---
+    job.preset = _get_output_preset(config)
+    container_ext = job.preset["container"]
+
+    # --- Define file paths ---
+    stem = os.path.splitext(filename)[0]
+    job.intermediate_path = os.path.join(job.temp_folder, f"{stem}.{job.token}_BAKED.mxf")
+    job.final_output_path = _output_path_for(job.source_path, output_folder, stem, container_ext,
+                                             watch_root=os.path.expanduser(paths.get('watch', '')))
+    # Hidden and unique per job, so another node encoding the same clip never shares the file
+    out_dir, out_name = os.path.split(job.final_output_path)
+    job.partial_output_path = os.path.join(out_dir, f".{os.path.splitext(out_name)[0]}.{job.token}.partial.{container_ext}")
+
+    # --- Reuse an output that is already valid for this source and recipe ---
+    if config.getboolean('Output', 'reuse_existing', fallback=True):
+        with _timed(job, "fingerprint"):
+            _reuse_existing_output(job)
+
+
+# Output path -> source path for clips between prepare and finalize
+_outputs_in_flight = {}
+_outputs_in_flight_lock = threading.Lock()
+
+
+def _output_path_for(source_path: str, output_folder: str, stem: str, ext: str, watch_root: str = "") -> str:
+    """
+    Pick and reserve <stem>.<ext> in the output folder, unless another clip
+    with the same name (C001.mov from another card) is writing it or its
+    fingerprint shows it came from one; then the name of the card folder
+    (first folder below the watch root, else the clip's own folder) is
+    appended, plus a counter if that is taken too.
+    """
+    with _outputs_in_flight_lock:
+        path = _choose_output_path(source_path, output_folder, stem, ext, watch_root)
+        _outputs_in_flight[path] = source_path
+    return path
+
+
+def _release_output_path(job: ClipJob):
+    with _outputs_in_flight_lock:
+        if _outputs_in_flight.get(job.final_output_path) == job.source_path:
+            del _outputs_in_flight[job.final_output_path]
+
+
+def _choose_output_path(source_path: str, output_folder: str, stem: str, ext: str, watch_root: str) -> str:
+    candidates = [f"{stem}.{ext}"]
+    source_dir = os.path.dirname(os.path.abspath(source_path))
+    parent = os.path.basename(source_dir)
+    if watch_root:
+        relative = os.path.relpath(source_dir, os.path.abspath(watch_root))
+        if relative != os.curdir and not relative.startswith(os.pardir):
+            parent = relative.split(os.sep)[0]
+    if parent:
+        candidates.append(f"{stem}_{parent}.{ext}")
+    candidates += [f"{stem}_{parent or 'clip'}_{n}.{ext}" for n in range(2, 100)]
+    source = None
+    for name in candidates:
+        path = os.path.join(output_folder, name)
+        if _outputs_in_flight.get(path, source_path) != source_path:
+            logging.info(f"{name} is being written for {_outputs_in_flight[path]}; choosing another name.")
+            continue
+        sidecar = read_sidecar(path)
+        if not sidecar or sidecar.get("source_path") == source_path:
+            break
+        try:
+            source = source or SourceFingerprint(source_path)
+            if source.matches(sidecar.get("source") or {}):
+                break  # Same clip seen under another mount point
+        except OSError:
+            break
+        logging.info(f"{name} in the output folder came from {sidecar.get('source_path')}; choosing another name.")
+    return path
+
+
+def _output_recipe(job: ClipJob) -> dict:
+    """Everything that decides what the encoder writes for this clip."""
+    preset = {k: v for k, v in job.preset.items() if k not in ("scaling", "threads", "cost")}
+    if job.use_art:
+        # The intermediate's pixel format (and so any pre-filter) follows from the ART settings
+        vf_chain = _build_vf_chain(None, preset.get("vf") or "")
+    else:
+        vf_chain = _build_vf_chain(None, preset.get("vf") or "", pre_vf=_pre_vf_for_pix_fmt(job.media.pix_fmt, job.ffmpeg_path))
+    return {
+        "preset": preset,
+        "use_art": job.use_art,
+        "art_colorspace": job.art_colorspace if job.use_art else None,
+        "lut": file_digest(job.lut_path) if job.lut_path else None,
+        "vf": vf_chain,
+    }
+
+
+def _fingerprint(job: ClipJob):
+    if job.source_fp is None:
+        job.source_fp = SourceFingerprint(job.source_path)
+    if not job.recipe:
+        job.recipe = recipe_digest(_output_recipe(job))
+
+
+def _reuse_existing_output(job: ClipJob):
+    """Mark the job reused if its output is already valid, or hard-link one made from the same source elsewhere."""
+    try:
+        _fingerprint(job)
+        if output_is_current(job.final_output_path, job.source_fp, job.recipe):
+            job.reused = "current"
+            logging.info(f"Output for {job.filename} is already up to date; skipping transcode.")
+            return
+        content_key = job.source_fp.content_key(job.recipe)
+    except OSError as e:
+        logging.warning(f"Could not fingerprint {job.filename}: {e}")
+        return
+    index = get_output_index(job.config)
+    existing = index.find(content_key, exclude=job.final_output_path)
+    if existing is None:
+        return
+    link_path = f"{job.final_output_path}.link"
+    try:
+        if os.path.exists(link_path):
+            os.remove(link_path)
+        if not (os.path.exists(job.final_output_path) and os.path.samefile(existing, job.final_output_path)):
+            os.link(existing, link_path)
+            os.replace(link_path, job.final_output_path)
+    except OSError as e:
+        logging.info(f"Could not hard-link {existing} for {job.filename} ({e}); transcoding.")
+        return
+    write_sidecar(job.final_output_path, job.source_fp, job.recipe)
+    index.record(content_key, job.final_output_path)
+    job.reused = "linked"
+    logging.info(f"Hard-linked existing output {existing} for {job.filename}; skipping transcode.")
+
+
+def _record_output(job: ClipJob):
+    """Fingerprint a freshly written output so later runs can skip or link it."""
+    try:
+        _fingerprint(job)
+        write_sidecar(job.final_output_path, job.source_fp, job.recipe)
+        get_output_index(job.config).record(job.source_fp.content_key(job.recipe), job.final_output_path)
+    except OSError as e:
+        logging.warning(f"Could not fingerprint output for {job.filename}: {e}")
+
+
+def _detect_camera_and_lut(job: ClipJob):
+    """Pick the camera family, ART vs LUT pipeline and the LUT to embed."""
+    source_path = job.source_path
+    job.camera_family = _detect_camera_family(source_path, job.media)
+    logging.info(f"Detected camera: {job.camera_family}")
+    job.use_art = _should_use_art(job.camera_family, job.art_cli_path, source_path)
+    if job.camera_family.startswith("ARRI") and not job.use_art:
+        ext = os.path.splitext(source_path)[1].lower()
+        if ext in (".mov", ".mp4", ".m4v"):
+            logging.info("ART CLI skipped for MOV/MP4 container; using LUT/FFmpeg pipeline.")
+    embed_lut = os.environ.get("TEN2_EMBED_LUT", "1") != "0"
+    skip_lut_env = os.environ.get("TEN2_SKIP_LUT_CAMERAS", "")
+    skip_lut = {c.strip() for c in skip_lut_env.split(";") if c.strip()}
+    if embed_lut and not job.use_art and job.camera_family not in skip_lut:
+        job.lut_path = _get_lut_for_camera(job.camera_family, job.config)
+    if not job.use_art and job.lut_path is None:
+        logging.warning(f"No LUT found for {job.camera_family}. Proceeding without LUT.")
+
+
+def bake_clip(job: ClipJob):
+    """Bake stage: run ART into a temp intermediate. No-op for non-ARRI or streamed clips."""
+    if job.reused or not job.use_art or job.stream_art:
+        return
+    _bake_two_pass(job)
+
+
+def _bake_two_pass(job: ClipJob):
+    # --- 1. Run ARRI CLI ---
+    logging.info("Step 1: Baking ARRI Look with ART CLI...")
+    update_status(job.status_path, {"status": "processing", "file": job.filename, "progress": 0, "stage": "ARRI Processing", "elapsed": 0})
+    with _timed(job, "art_bake"):
+        _bake_art_intermediate(job.art_cli_path, job.source_path, job.intermediate_path, job.art_colorspace, job.status_path, job.filename)
+
+    # --- 2. Get video duration for progress calculation ---
+    logging.info("Step 2: Analyzing intermediate file...")
+    update_status(job.status_path, {"status": "processing", "file": job.filename, "progress": 0, "stage": "Analyzing"})
+    with _timed(job, "analyze"):
+        try:
+            job.intermediate = probe_media(job.intermediate_path, job.ffprobe_path)
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Failed to probe intermediate file: {e}")
+            job.intermediate = MediaInfo(path=job.intermediate_path)
+    if job.intermediate.duration > 0:
+        logging.info(f"Total duration to process: {job.intermediate.duration:.2f}s")
+    else:
+        logging.error("Failed to get video duration from intermediate file.")
+
+
+def encode_clip(job: ClipJob):
+    """Encode stage: FFmpeg from the intermediate, the ART pipe, or the source (with optional LUT)."""
+    if job.reused:
+        return
+    # Encodes write to partial_output_path; finalize replaces the output (never writing
+    # through a hard-linked copy) only once the clip succeeded
+    with thread_planner.reserve(job.preset) as threads:
+        job.threads = threads
+        logging.info(f"Encoding {job.filename} with {threads} thread(s).")
+        _encode_clip(job)
+
+
+def _encode_clip(job: ClipJob):
+    status_path = job.status_path
+    filename = job.filename
+    preset = job.preset
+    ffmpeg_path = job.ffmpeg_path
+
+    if job.use_art and job.stream_art:
+        # --- 1+2. ART writes into a FIFO that FFmpeg reads concurrently ---
+        logging.info("Step 1: Streaming ARRI Look from ART CLI into FFmpeg...")
+        update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "ARRI Processing + Transcoding"})
+        fifo_path = os.path.join(job.temp_folder, f"{os.path.splitext(filename)[0]}.{job.token}_BAKED_pipe.mxf")
+        vf_chain = _build_vf_chain(None, preset.get("vf") or "", pre_vf=None)
+        ffmpeg_cmd = _build_ffmpeg_cmd(ffmpeg_path, fifo_path, job.partial_output_path, preset, vf_chain, input_args=["-f", "mxf"],
+                                       threads=job.threads)
+        with _timed(job, "art_stream_encode"):
+            streamed = _stream_art_into_ffmpeg(job.art_cli_path, job.source_path, fifo_path, job.art_colorspace, ffmpeg_cmd,
+                                               job.media.duration, status_path, filename)
+        if streamed:
+            logging.info("FFmpeg finished successfully.")
+            return
+        if job.cancel_reason is not None:
+            raise ClipCancelled(job.cancel_reason)
+        logging.warning("ART CLI could not stream into FFmpeg; falling back to a temp intermediate file.")
+        if os.path.exists(job.partial_output_path):
+            os.remove(job.partial_output_path)
+        job.stream_art = False
+        _bake_two_pass(job)
+        # The pipe attempt failed but a regular bake worked: stop trying this session
+        _mark_art_streaming_unsupported()
+
+    if job.use_art:
+        # --- 3. Run FFmpeg and monitor progress ---
+        logging.info("Step 3: Transcoding with FFmpeg...")
+        update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "FFmpeg Transcoding"})
+        pre_vf = _pre_vf_for_pix_fmt(job.intermediate.pix_fmt, ffmpeg_path)
+        vf_chain = _build_vf_chain(None, preset.get("vf") or "", pre_vf=pre_vf)
+        ffmpeg_cmd = _build_ffmpeg_cmd(ffmpeg_path, job.intermediate_path, job.partial_output_path, preset, vf_chain,
+                                       threads=job.threads)
+        with _timed(job, "encode"):
+            if not _encode_segmented(job, job.intermediate_path, job.intermediate, vf_chain):
+                _run_ffmpeg_with_progress(ffmpeg_cmd, job.intermediate.duration, status_path, filename)
+    else:
+        # --- Direct FFmpeg transcode (optional LUT) ---
+        logging.info("Step 1: Analyzing source file...")
+        update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": "Analyzing"})
+        total_duration = job.media.duration
+        if total_duration > 0:
+            logging.info(f"Total duration to process: {total_duration:.2f}s")
         else:
-            error_details = f"File not found: {missing_path}"
-        logging.error(error_details)
+            logging.error("Failed to get video duration from source file.")
+
+        logging.info("Step 2: Transcoding with FFmpeg...")
+        stage_name = "FFmpeg Transcoding"
+        if job.lut_path:
+            stage_name = "Applying LUT + Transcoding"
+        update_status(status_path, {"status": "processing", "file": filename, "progress": 0, "stage": stage_name})
+        pre_vf = _pre_vf_for_pix_fmt(job.media.pix_fmt, ffmpeg_path)
+        vf_chain = _build_vf_chain(job.lut_path, preset.get("vf") or "", pre_vf=pre_vf)
+        ffmpeg_cmd = _build_ffmpeg_cmd(ffmpeg_path, job.source_path, job.partial_output_path, preset, vf_chain,
+                                       threads=job.threads)
+        with _timed(job, "encode"):
+            if not _encode_segmented(job, job.source_path, job.media, vf_chain):
+                _run_ffmpeg_with_progress(ffmpeg_cmd, total_duration, status_path, filename)
+
+    logging.info("FFmpeg finished successfully.")
+
+
+def _encode_segmented(job: ClipJob, input_path: str, media: MediaInfo, vf_chain: str | None) -> bool:
+    """
+    Opt-in chunked encode ([Segments]): video in keyframe-aligned ranges run in
+    parallel, audio in one pass, then a stream-copy concat into the final
+    output. Returns False (nothing written) when the clip isn't eligible or any
+    step fails, so the caller falls back to a single FFmpeg pass.
+    """
+    settings = segment_settings(job.config)
+    if not settings.enabled or media is None or media.duration < settings.min_duration:
+        return False
+
+    preset = job.preset
+    count = settings.segments or max(2, thread_planner.cpu_count // 4)
+    try:
+        keyframes = keyframe_times(_run_checked(keyframe_probe_cmd(input_path, job.ffprobe_path)).stdout)
+    except subprocess.CalledProcessError as e:
+        logging.warning(f"Could not read keyframes for segmented encode; encoding in one pass: {e}")
+        return False
+    ranges = plan_segments(media.duration, keyframes, count, settings.min_segment_seconds)
+    if len(ranges) < 2:
+        logging.info("Not enough keyframes to split this clip; encoding in one pass.")
+        return False
+
+    stem = os.path.splitext(job.filename)[0]
+    segment_dir = os.path.join(job.temp_folder, f"{stem}.{job.token}_segments")
+    shutil.rmtree(segment_dir, ignore_errors=True)
+    os.makedirs(segment_dir)
+    container = preset["container"]
+    has_audio = any(s.get("codec_type") == "audio" for s in media.streams)
+
+    progress = [0.0] * len(ranges)
+    progress_lock = threading.Lock()
+
+    def report(index, seconds):
+        with progress_lock:
+            progress[index] = seconds
+            done = sum(progress)
+        percent = min(100.0, done / media.duration * 100)
+        update_status(job.status_path, {"status": "processing", "file": job.filename, "progress": round(percent, 2),
+                                        "stage": f"FFmpeg Transcoding ({len(ranges)} segments)",
+                                        "elapsed": round(done, 2), "total_duration": round(media.duration, 2)})
+
+    def encode_segment(index, start, end):
+        seek = ["-ss", f"{start:.6f}"]
+        if end is not None:
+            seek += ["-t", f"{end - start:.6f}"]
+        out_path = os.path.join(segment_dir, f"{index:03d}.{container}")
+        cmd = _build_ffmpeg_cmd(job.ffmpeg_path, input_path, out_path, preset, vf_chain, input_args=seek,
+                                threads=segment_threads, audio=False)
+        process = _popen(cmd, stderr=subprocess.PIPE, universal_newlines=True)
+        if _monitor_ffmpeg(process, 0, job.status_path, job.filename, on_progress=lambda t: report(index, t)) != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr=f"Segment {index} failed. See warnings above.")
+        return out_path
+
+    def encode_audio():
+        # One pass over the whole clip so there are no gaps at segment joins. Same
+        # (default) stream selection as the single-pass encode, so the audio matches
+        out_path = os.path.join(segment_dir, "audio.mka")
+        cmd = [job.ffmpeg_path, "-i", input_path, "-vn", *_audio_args(preset), "-f", "matroska", "-y", out_path]
+        _run_checked(cmd)
+        return out_path
+
+    # The clip's own budget plus whatever CPUs no other encode holds (idle at the end of a batch)
+    budget = job.threads or useful_threads(preset)
+    with thread_planner.borrow_idle(useful_threads(preset) * len(ranges) - budget) as borrowed:
+        segment_threads = max(1, (budget + borrowed) // len(ranges))
+        logging.info(f"Segmented encode: {len(ranges)} segments at keyframes "
+                     f"{', '.join(f'{start:.2f}s' for start, _ in ranges[1:])} with {segment_threads} thread(s) each.")
+        try:
+            with ThreadPoolExecutor(max_workers=len(ranges) + 1, thread_name_prefix="segment",
+                                    initializer=_bind_stage_job, initargs=(job,)) as pool:
+                audio_future = pool.submit(encode_audio) if has_audio else None
+                segment_futures = [pool.submit(encode_segment, i, start, end) for i, (start, end) in enumerate(ranges)]
+                segment_paths = [f.result() for f in segment_futures]
+                audio_path = audio_future.result() if audio_future else None
+
+            list_path = os.path.join(segment_dir, "segments.txt")
+            write_concat_list(list_path, segment_paths)
+            cmd = [job.ffmpeg_path, "-f", "concat", "-safe", "0", "-i", list_path]
+            if audio_path:
+                cmd += ["-i", audio_path, "-map", "0:v", "-map", "1:a"]
+            cmd += ["-c", "copy", "-f", container, "-y", job.partial_output_path]
+            update_status(job.status_path, {"status": "processing", "file": job.filename, "progress": 100, "stage": "Joining Segments"})
+            _run_checked(cmd)
+
+            # The joined output must cover the whole source
+            output = probe_media(job.partial_output_path, job.ffprobe_path)
+            tolerance = max(0.5, 2 / media.frame_rate) if media.frame_rate else 0.5
+            if abs(output.duration - media.duration) > tolerance:
+                raise RuntimeError(f"segmented output is {output.duration:.3f}s, source is {media.duration:.3f}s")
+            logging.info(f"Segmented encode joined: {output.duration:.3f}s (source {media.duration:.3f}s).")
+            return True
+        except (subprocess.CalledProcessError, RuntimeError, OSError) as e:
+            if job.cancel_reason is not None:
+                raise ClipCancelled(job.cancel_reason) from e
+            detail = e.stderr.strip() if isinstance(e, subprocess.CalledProcessError) and e.stderr else str(e)
+            logging.warning(f"Segmented encode failed ({detail}); encoding in one pass.")
+            if os.path.exists(job.partial_output_path):
+                os.remove(job.partial_output_path)
+            return False
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+
+def finalize_clip(job: ClipJob):
+    """Finalize stage: remove the intermediate, record history and drop the clip from status. Always runs."""
+    status_path = job.status_path
+    filename = job.filename
+    # The intermediate is written by ART and read back by FFmpeg
+    intermediate_bytes = _file_size(job.intermediate_path) if job.use_art else 0
+    try:
+        _release_output_path(job)
+        if not job.failed:
+            # --- 4. Cleanup ---
+            logging.info("Step 4: Cleaning up intermediate file...")
+            update_status(status_path, {"status": "processing", "file": filename, "progress": 100, "stage": "Cleaning Up"})
+        with _timed(job, "cleanup"):
+            if job.use_art and job.intermediate_path and os.path.exists(job.intermediate_path):
+                os.remove(job.intermediate_path)
+                logging.info(f"Removed intermediate file: {job.intermediate_path}")
+
+        if not job.failed and job.cancel_reason is None:
+            # --- 5. Complete (source file stays in place) ---
+            logging.info("Step 5: Processing complete (source file unchanged)")
+            update_status(status_path, {"status": "processing", "file": filename, "progress": 100, "stage": "Complete"})
+
+            if job.reused is None:
+                # Atomic: readers and hard-linked copies never see a half-written output
+                os.replace(job.partial_output_path, job.final_output_path)
+                _record_output(job)
+            logging.info(f"--- Successfully processed {filename}. Final file at: {job.final_output_path} ---")
+            job.status = "succeeded"  # Set success status
     except Exception as e:
-        error_details = f"An unexpected error occurred while processing {source_path}: {e}"
-        logging.error(error_details)
-        update_status(status_path, {"status": "error", "file": filename, "progress": 0, "stage": "Error"})
+        _record_failure(job, e)
     finally:
+        if job.status != "succeeded" and job.partial_output_path and os.path.exists(job.partial_output_path):
+            os.remove(job.partial_output_path)
         end_time = datetime.now()
+        # Time spent waiting for a free bake/encode worker is reported as its own stage
+        wall_time = (end_time - job.start_time).total_seconds() - job.timings.get("queue_wait", 0.0)
+        media_duration = job.media.duration if job.media else 0.0
         history_record = {
             "file": filename,
-            "source_path": source_path,
-            "start_time": start_time.isoformat(),
+            "source_path": job.source_path,
+            "start_time": job.start_time.isoformat(),
             "end_time": end_time.isoformat(),
-            "status": processing_status,
-            "error_details": error_details
+            "status": job.status,
+            "error_details": job.error_details,
+            "camera": job.camera_family,
+            "timings": dict(job.timings),
+            "wall_time": round(wall_time, 3),
+            "media_duration": round(media_duration, 3),
+            "realtime_factor": round(media_duration / wall_time, 3) if wall_time > 0 and media_duration > 0 else None,
+            "bytes_read": (_file_size(job.source_path) if job.media and not job.reused else 0) + intermediate_bytes,
+            "bytes_written": (_file_size(job.final_output_path) if job.status == "succeeded" and not job.reused else 0) + intermediate_bytes,
         }
-        log_to_history(history_path, history_record)
-        update_status(status_path, {"status": "idle", "file": "None", "progress": 0, "stage": "Idle"})
+        if job.reused:
+            history_record["reused"] = job.reused
+        log_to_history(job.history_path, history_record)
+        if not job.reused:
+            # Skipped clips would distort the throughput histograms
+            clip_metrics.observe(history_record)
+        finish_status(status_path, filename)
+
+
+def process_clip(source_path: str, config: ConfigParser):
+    """
+    Processes a single video file by applying ARRI look and transcoding to DNxHD.
+    Runs every pipeline stage back to back; ClipPipeline runs them overlapped.
+    """
+    job = ClipJob(source_path, config)
+    for stage in (prepare_clip, bake_clip, encode_clip):
+        if not run_stage(stage, job):
+            break
+    finalize_clip(job)
+    return job
@@ -21,6 +21,11 @@ DND_AVAILABLE = False
 
 # Import the refactored main engine script
 import main as ingest_engine
+from probe_cache import get_probe_cache
+from scanner import CardScanner
+from status import read_status
+from history import get_history_store
+from journal import get_job_journal
 
 # --- Color Palette (Dark + Green "Matrix" Theme) ---
 COLORS = {
@@ -233,16 +238,8 @@ class FieldIngestApp(ctk.CTk):
     def _ffprobe_camera_info(self, file_path):
         ffmpeg_path = os.path.expanduser(self.config.get('Paths', 'ffmpeg', fallback='ffmpeg'))
         ffprobe_path = ffmpeg_path.replace('ffmpeg', 'ffprobe')
-        cmd = [
-            ffprobe_path,
-            "-v", "error",
-            "-show_entries", "format_tags:stream_tags",
-            "-of", "json",
-            file_path
-        ]
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            data = json.loads(result.stdout) if result.stdout else {}
+            data = get_probe_cache(self.config).probe(file_path, ffprobe_path)
         except Exception:
             return {}
         tags = {}
@@ -358,26 +355,23 @@ class FieldIngestApp(ctk.CTk):
         required = []
         camera_samples = {}
 
+        extensions = self.config.get('Processing', 'allowed_extensions', fallback='.mov,.mxf,.mp4').split(',')
+        extensions = [e.strip().lower() for e in extensions if e.strip()]
+
         if selected_files:
-            entries = [os.path.basename(p) for p in selected_files]
-            entry_map = {os.path.basename(p): p for p in selected_files}
+            candidates = list(selected_files)
         else:
             try:
-                entries = sorted(os.listdir(source_folder))
+                candidates = [f.path for f in CardScanner(source_folder, extensions).scan()]
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to scan source folder: {e}")
                 return False
-            entry_map = {}
-
-        extensions = self.config.get('Processing', 'allowed_extensions', fallback='.mov,.mxf,.mp4').split(',')
-        extensions = [e.strip().lower() for e in extensions if e.strip()]
 
         seen_cameras = set()
-        for name in entries:
-            full_path = entry_map.get(name) or os.path.join(source_folder, name)
+        for full_path in candidates:
             if not os.path.isfile(full_path):
                 continue
-            _, ext = os.path.splitext(name)
+            _, ext = os.path.splitext(full_path)
             if ext.lower() not in extensions:
                 continue
             camera = self._detect_camera_family(full_path)
@@ -646,24 +640,12 @@ class FieldIngestApp(ctk.CTk):
             ffprobe = _find_ffprobe_local()
             if not ffprobe:
                 return {}
-            ext = os.path.splitext(path)[1].lower()
-            input_fmt = ["-f", "mxf"] if ext == ".mxf" else []
-            cmd = [
-                ffprobe,
-                "-v", "error",
-                "-probesize", "200M",
-                "-analyzeduration", "200M",
-                *input_fmt,
-                "-show_entries", "format=duration,format_name:stream=index,codec_name,codec_type,width,height,avg_frame_rate,channels,sample_rate",
-                "-of", "json",
-                path,
-            ]
             try:
-                out = subprocess.check_output(cmd, text=True, timeout=10)
-                return json.loads(out)
+                return probe_cache.probe(path, ffprobe)
             except Exception:
                 return {}
 
+        probe_cache = get_probe_cache(self.config)
         story = []
 
         # Icon path
@@ -1463,16 +1445,8 @@ class SetupFrame(ctk.CTkFrame):
         skip_ext = [e.strip().lower() for e in skip_ext if e.strip()]
 
         cameras = {}
-        for name in sorted(os.listdir(self.selected_folder)):
-            full_path = os.path.join(self.selected_folder, name)
-            if not os.path.isfile(full_path):
-                continue
-            _, ext = os.path.splitext(name)
-            if ext.lower() in skip_ext:
-                continue
-            if ext.lower() not in extensions:
-                continue
-            camera = self.app._detect_camera_family(full_path)
+        for scanned in CardScanner(self.selected_folder, extensions, skip_ext).scan():
+            camera = self.app._detect_camera_family(scanned.path)
             cameras[camera] = cameras.get(camera, 0) + 1
 
         if not cameras:
@@ -2081,31 +2055,12 @@ class MonitorFrame(ctk.CTkFrame):
             self.log_expanded = True
 
     def get_pause_state(self):
-        """Read current pause state from control file."""
-        pause_file = self.app.paths.get('pause_file', '')
-        if not pause_file or not os.path.exists(pause_file):
-            return {"paused": False, "pause_requested": False}
-        try:
-            with open(pause_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {"paused": False, "pause_requested": False}
+        """Read current pause state from the engine's in-process control."""
+        return ingest_engine.engine_control.state()
 
     def set_pause_state(self, paused=None, pause_requested=None):
-        """Update the pause state control file."""
-        pause_file = self.app.paths.get('pause_file', '')
-        if not pause_file:
-            return
-        state = self.get_pause_state()
-        if paused is not None:
-            state["paused"] = paused
-        if pause_requested is not None:
-            state["pause_requested"] = pause_requested
-        try:
-            with open(pause_file, 'w') as f:
-                json.dump(state, f)
-        except Exception as e:
-            print(f"Failed to write pause state: {e}")
+        """Update the engine's pause state; paused workers wake immediately on resume."""
+        ingest_engine.engine_control.update(paused=paused, pause_requested=pause_requested)
 
     def toggle_pause(self):
         """Toggle between pause and resume states."""
@@ -2157,12 +2112,11 @@ class MonitorFrame(ctk.CTkFrame):
         current_stage = "—"
         progress = 0
 
-        # Read status file
+        # Read status (in-memory while the engine runs in this process)
         try:
             status_file = self.app.paths.get('status_file', '')
-            if status_file and os.path.exists(status_file):
-                with open(status_file, 'r') as f:
-                    status = json.load(f)
+            if status_file:
+                status = read_status(status_file)
 
                 is_idle = status.get('status') == 'idle'
                 current_stage = status.get('stage', '—')
@@ -2290,12 +2244,11 @@ class MonitorFrame(ctk.CTkFrame):
     def update_queue_list(self):
         """Update the queue list display."""
         queue_file = self.app.paths.get('queue_file', '')
-        if not queue_file or not os.path.exists(queue_file):
+        if not queue_file:
             return
 
         try:
-            with open(queue_file, 'r') as f:
-                data = json.load(f)
+            data = get_job_journal(queue_file).pending()
 
             if data != self.app.current_queue:
                 self.app.current_queue = data.copy()
@@ -2319,29 +2272,20 @@ class MonitorFrame(ctk.CTkFrame):
 
                 # Update header
                 self.queue_header.configure(text=f"QUEUE ({len(data)})")
-        except (FileNotFoundError, json.JSONDecodeError):
+        except OSError:
             pass
 
     def update_history_list(self):
         """Update the history list display (current session only)."""
         history_file = self.app.paths.get('history_file', '')
-        if not history_file or not os.path.exists(history_file):
+        if not history_file:
             return
 
         try:
-            with open(history_file, 'r') as f:
-                all_data = json.load(f)
-
-            # Filter to only current session (items processed after session start)
+            # Only the current session (items processed after session start)
             session_data = []
             if self.app.start_time:
-                for item in all_data:
-                    try:
-                        item_start = datetime.fromisoformat(item.get('start_time', ''))
-                        if item_start >= self.app.start_time:
-                            session_data.append(item)
-                    except (ValueError, TypeError):
-                        pass
+                session_data = get_history_store(history_file).query(since=self.app.start_time.isoformat(), limit=None)
 
             # Store session-only data for PDF generation
             self.app.session_history = session_data
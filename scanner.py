@@ -0,0 +1,327 @@
+"""
+Recursive camera-card scanner for the watch folder.
+
+Camera cards nest clips several levels deep (ARRI reel folders, Sony XDROOT,
+DJI DCIM). CardScanner walks the tree with os.scandir, reusing the stat data
+from each DirEntry, and remembers every directory's listing together with its
+mtime. A directory whose mtime hasn't changed since the last pass is not
+re-listed; only its subdirectories are stat'ed again, so rescanning a large,
+unchanged card costs one stat per directory instead of one per file.
+
+StabilizationTracker runs alongside the scanner and releases files to the
+processing queue only once they have stopped changing. IdentityIndex then
+remembers what was queued by file identity rather than name.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# Known card layouts, keyed by the camera families in processor.CAMERA_FAMILIES.
+# "markers" identify the layout from the card root, "clip_dirs" are where the
+# camera writes clips and "skip_dirs" hold proxies/thumbnails we never transcode.
+CARD_LAYOUTS = {
+    "ARRI Alexa": {
+        # Reel folders such as A001R1AB/ hold the clips (ARRIRAW adds one folder per clip)
+        "markers": (),
+        "reel_pattern": re.compile(r"^[A-Z]\d{3}R[A-Z0-9]{2,4}$"),
+        "clip_dirs": (),
+        "skip_dirs": ("Proxy", "PROXY"),
+    },
+    "Sony": {
+        "markers": ("XDROOT", "PRIVATE/M4ROOT"),
+        "clip_dirs": ("XDROOT/Clip", "PRIVATE/M4ROOT/CLIP"),
+        "skip_dirs": ("XDROOT/Sub", "XDROOT/Take", "XDROOT/Edit", "XDROOT/General",
+                      "PRIVATE/M4ROOT/SUB", "PRIVATE/M4ROOT/THMBNL", "PRIVATE/M4ROOT/GENERAL"),
+    },
+    "DJI Video": {
+        "markers": ("DCIM",),
+        "clip_dirs": ("DCIM",),
+        "skip_dirs": ("MISC", "DCIM/PANORAMA"),
+    },
+}
+
+DEFAULT_IDENTITY_INDEX_SIZE = 50000
+
+# Never descend into these (macOS/Windows volume metadata)
+IGNORED_DIRS = {".Trashes", ".Spotlight-V100", ".fseventsd", ".TemporaryItems", "System Volume Information", "$RECYCLE.BIN"}
+
+
+def _reel_dirs(root: str, pattern) -> list[str]:
+    try:
+        with os.scandir(root) as it:
+            return sorted(e.path for e in it if e.is_dir(follow_symlinks=False) and pattern.match(e.name))
+    except OSError:
+        return []
+
+
+def detect_card_layout(root: str) -> str | None:
+    """Return the CARD_LAYOUTS family whose markers exist under root, if any."""
+    for family, layout in CARD_LAYOUTS.items():
+        for marker in layout["markers"]:
+            if os.path.isdir(os.path.join(root, marker)):
+                return family
+        pattern = layout.get("reel_pattern")
+        if pattern and _reel_dirs(root, pattern):
+            return family
+    return None
+
+
+@dataclass
+class ScannedFile:
+    path: str
+    size: int
+    mtime: float
+
+
+@dataclass
+class _DirState:
+    mtime_ns: int
+    files: list = field(default_factory=list)    # ScannedFile entries directly in this dir
+    subdirs: list = field(default_factory=list)  # child directory paths
+
+
+class CardScanner:
+    """Recursively finds media files under a root, skipping unchanged directories."""
+
+    def __init__(self, root: str, extensions, skip_extensions=(), max_depth: int = 8):
+        self.root = root
+        self.extensions = {e.strip().lower() for e in extensions if e.strip()}
+        self.skip_extensions = {e.strip().lower() for e in skip_extensions if e.strip()}
+        self.max_depth = max_depth
+        self.layout = None
+        self._dirs = {}
+        self._warned_skips = set()
+
+    def _scan_roots(self):
+        self.layout = detect_card_layout(self.root)
+        if self.layout:
+            layout = CARD_LAYOUTS[self.layout]
+            roots = [os.path.join(self.root, d) for d in layout["clip_dirs"]]
+            if layout.get("reel_pattern"):
+                roots += _reel_dirs(self.root, layout["reel_pattern"])
+            roots = [r for r in roots if os.path.isdir(r)]
+            if roots:
+                return roots
+        return [self.root]
+
+    def _is_skipped_dir(self, path: str, name: str) -> bool:
+        if name.startswith('.') or name in IGNORED_DIRS:
+            return True
+        rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+        for layout in CARD_LAYOUTS.values():
+            for skip in layout["skip_dirs"]:
+                if rel == skip or rel.endswith('/' + skip) or name == skip:
+                    return True
+        return False
+
+    def is_candidate(self, path: str) -> bool:
+        """True if a path reported by a file event is a media file outside skipped folders."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in self.extensions or os.path.basename(path).startswith('.'):
+            return False
+        parent = os.path.dirname(path)
+        while parent and parent != self.root and parent.startswith(self.root):
+            if self._is_skipped_dir(parent, os.path.basename(parent)):
+                return False
+            parent = os.path.dirname(parent)
+        return True
+
+    def _list_dir(self, path: str, mtime_ns: int) -> _DirState:
+        state = _DirState(mtime_ns=mtime_ns)
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self._is_skipped_dir(entry.path, entry.name):
+                            state.subdirs.append(entry.path)
+                        continue
+                    if not entry.is_file() or entry.name.startswith('.'):
+                        continue
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    if ext in self.skip_extensions:
+                        if path not in self._warned_skips:
+                            logging.warning(f"Skipping unsupported image sequence files in: {path}")
+                            self._warned_skips.add(path)
+                        continue
+                    if ext not in self.extensions:
+                        continue
+                    st = entry.stat()
+                    state.files.append(ScannedFile(entry.path, st.st_size, st.st_mtime))
+                except OSError:
+                    continue
+        state.subdirs.sort()
+        return state
+
+    def _walk(self, path: str, depth: int, seen: set, out: list):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self._dirs.pop(path, None)
+            return
+        seen.add(path)
+        state = self._dirs.get(path)
+        if state is None or state.mtime_ns != mtime_ns:
+            try:
+                state = self._list_dir(path, mtime_ns)
+            except OSError as e:
+                logging.error(f"Error scanning {path}: {e}")
+                return
+            self._dirs[path] = state
+        out.extend(state.files)
+        if depth < self.max_depth:
+            for sub in state.subdirs:
+                self._walk(sub, depth + 1, seen, out)
+
+    def scan(self) -> list[ScannedFile]:
+        """Return every media file under the root, sorted by path (C001, C002, ...)."""
+        seen = set()
+        found = []
+        roots = self._scan_roots()
+        if roots != [self.root]:
+            # Loose clips copied next to the card folders still count (no descent)
+            self._walk(self.root, self.max_depth, seen, found)
+        for root in roots:
+            self._walk(root, 0, seen, found)
+        # Forget directories that disappeared (card ejected, folder deleted)
+        for stale in set(self._dirs) - seen:
+            del self._dirs[stale]
+        found.sort(key=lambda f: f.path)
+        return found
+
+
+class StabilizationTracker:
+    """
+    Decides when detected files are safe to hand to a worker.
+
+    Files whose mtime is older than settle_age are treated as stable at once
+    (clips that have sat on a card for hours). Anything newer must show the
+    same size and mtime on two batched passes at least min_interval apart.
+    Workers only ever receive files that passed this check. Files that can
+    never pass (still empty after settle_age, or unreadable on max_errors
+    passes in a row) are dropped with a warning.
+    """
+
+    def __init__(self, settle_age: float = 30.0, min_interval: float = 2.0, max_errors: int = 5):
+        self.settle_age = settle_age
+        self.min_interval = min_interval
+        self.max_errors = max_errors
+        self._pending = {}  # path -> (source, size, mtime_ns, observed_at, errors)
+        self._lock = threading.Lock()
+
+    def add(self, path: str, source: str = "scan"):
+        with self._lock:
+            if path not in self._pending:
+                self._pending[path] = (source, None, None, 0.0, 0)
+
+    def discard(self, path: str):
+        with self._lock:
+            self._pending.pop(path, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def poll(self) -> list[tuple[str, str]]:
+        """Stat every pending file once; return (path, source) for those now stable, in path order."""
+        with self._lock:
+            pending = list(self._pending.items())
+        now = time.time()
+        ready = []
+        updates = {}
+        gone = []
+        for path, (source, last_size, last_mtime_ns, observed_at, errors) in pending:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                logging.warning(f"File {path} disappeared before it stabilized.")
+                gone.append(path)
+                continue
+            except OSError as e:
+                errors += 1
+                if errors >= self.max_errors:
+                    logging.warning(f"Giving up on {path} after {errors} failed stability checks: {e}")
+                    gone.append(path)
+                else:
+                    logging.error(f"Error checking file stability for {path}: {e}")
+                    updates[path] = (source, last_size, last_mtime_ns, observed_at, errors)
+                continue
+            if st.st_size == 0 and now - st.st_mtime >= self.settle_age:
+                logging.warning(f"Skipping {path}: the file is empty.")
+                gone.append(path)
+            elif st.st_size > 0 and now - st.st_mtime >= self.settle_age:
+                ready.append((path, source))
+            elif (st.st_size > 0 and (st.st_size, st.st_mtime_ns) == (last_size, last_mtime_ns)
+                  and now - observed_at >= self.min_interval):
+                ready.append((path, source))
+            elif (st.st_size, st.st_mtime_ns) != (last_size, last_mtime_ns) or errors:
+                updates[path] = (source, st.st_size, st.st_mtime_ns, now, 0)
+        with self._lock:
+            for path in gone:
+                self._pending.pop(path, None)
+            for path, _ in ready:
+                self._pending.pop(path, None)
+            for path, state in updates.items():
+                if path in self._pending:
+                    self._pending[path] = state
+        ready.sort()
+        return ready
+
+
+class IdentityIndex:
+    """
+    Files already queued this session, keyed by (st_dev, st_ino, size, mtime_ns).
+
+    Two cards can both hold C001.mov, so names can't identify a clip; a file
+    that is replaced or re-copied gets a new identity and is queued again.
+    The index holds at most max_entries identities and forgets the least
+    recently seen first, so a long-running watch session stays flat in memory.
+    A forgotten file that turns up again is still caught by the job journal.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_IDENTITY_INDEX_SIZE):
+        self.max_entries = max_entries
+        self.session_id = None
+        self._entries = OrderedDict()  # identity -> path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def identity(path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+    def add(self, path: str) -> bool:
+        """Remember path; False if the same file is already in the index (or can't be stat'ed)."""
+        identity = self.identity(path)
+        if identity is None:
+            return False
+        with self._lock:
+            if identity in self._entries:
+                self._entries.move_to_end(identity)
+                return False
+            self._entries[identity] = path
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def discard(self, path: str):
+        identity = self.identity(path)
+        with self._lock:
+            self._entries.pop(identity, None)
+
+    def start_session(self, session_id: str | None):
+        """Forget everything queued by the previous session."""
+        with self._lock:
+            self._entries.clear()
+            self.session_id = session_id
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,190 @@
+"""
+Scheduling policies for the engine's processing queue.
+
+Clips used to be handed out strictly first-in first-out, so one 40-minute
+clip at C001 held back every short clip behind it. SchedulerQueue is a drop-in
+queue.Queue whose get() order comes from [Scheduler] policy:
+
+- fifo: arrival order (the old behaviour)
+- sjf: shortest job first, by probed duration x preset cost (x art_cost for
+  ARRI clips that go through ART), so most of a card is delivered early and
+  the longest clips finish last
+- round_robin: alternate between camera families so every camera's clips
+  keep flowing
+
+Boosted clips (POST /api/queue/boost) go ahead of everything with a lower
+boost, whatever the policy.
+"""
+
+import heapq
+import logging
+import itertools
+import subprocess
+import queue
+from dataclasses import dataclass
+from configparser import ConfigParser
+
+from probe_cache import get_probe_cache
+from processor import probe_media, _detect_camera_family, _ffprobe_path, _get_output_preset
+from thread_budget import preset_scaling
+
+FIFO = "fifo"
+SJF = "sjf"
+ROUND_ROBIN = "round_robin"
+POLICIES = (FIFO, SJF, ROUND_ROBIN)
+
+# Encode seconds per second of media, relative to DNxHD, for presets without a cost
+SCALING_COST = {"poor": 1.0, "moderate": 1.5, "good": 4.0}
+
+DEFAULT_ART_COST = 2.0
+
+# The running engine's queue, for the API
+_active_queue = None
+
+
+def preset_cost(preset: dict) -> float:
+    """[Preset.*] cost, or an estimate from the preset's thread scaling class."""
+    try:
+        cost = float(preset.get("cost") or 0)
+    except ValueError:
+        cost = 0.0
+    return cost if cost > 0 else SCALING_COST[preset_scaling(preset)]
+
+
+@dataclass
+class ClipEstimate:
+    duration: float = 0.0
+    camera: str = "Unknown"
+    cost: float = 0.0
+
+
+class ClipEstimator:
+    """Probes queued clips (through the shared probe cache) for duration and camera."""
+
+    def __init__(self, config: ConfigParser):
+        self.config = config
+        self.ffprobe_path = _ffprobe_path(config)
+        self.preset_cost = preset_cost(_get_output_preset(config))
+        self.art_cost = config.getfloat('Scheduler', 'art_cost', fallback=DEFAULT_ART_COST)
+
+    def __call__(self, path: str) -> ClipEstimate:
+        try:
+            media = probe_media(path, self.ffprobe_path, cache=get_probe_cache(self.config))
+        except (subprocess.CalledProcessError, OSError) as e:
+            # Unreadable clips fail fast in the probe stage; let them through early
+            logging.debug(f"Scheduler could not probe {path}: {e}")
+            return ClipEstimate()
+        camera = _detect_camera_family(path, media)
+        cost = media.duration * self.preset_cost * (self.art_cost if camera.startswith("ARRI") else 1.0)
+        return ClipEstimate(media.duration, camera, cost)
+
+
+class _Pending:
+    __slots__ = ("path", "estimate")
+
+    def __init__(self, path, estimate):
+        self.path = path
+        self.estimate = estimate
+
+
+class SchedulerQueue(queue.Queue):
+    """
+    queue.Queue ordered by a scheduling policy. put()/get()/task_done()/join()
+    behave as usual; None (the worker stop signal) always sorts last.
+    """
+
+    def __init__(self, policy: str = FIFO, estimator=None):
+        if policy not in POLICIES:
+            logging.warning(f"Unknown scheduler policy '{policy}'; using {FIFO}.")
+            policy = FIFO
+        self.policy = policy
+        self.estimator = estimator
+        # Called after the order changes (new clip or boost), outside the queue lock
+        self.on_change = None
+        super().__init__()
+
+    # --- queue.Queue storage hooks (called with self.mutex held) ---
+
+    def _init(self, maxsize):
+        self._heap = []  # [[boost, policy key, seq], path, estimate]
+        self._seq = itertools.count()
+        self._boosts = {}
+        self._camera_round = {}  # camera -> next round-robin round
+        self._round = 0
+
+    def _qsize(self):
+        return len(self._heap)
+
+    def _put(self, pending):
+        seq = next(self._seq)
+        if pending.path is None:
+            heapq.heappush(self._heap, [[float('inf'), 0, seq], None, None])
+            return
+        key = [-self._boosts.get(pending.path, 0), self._policy_key(pending.estimate), seq]
+        heapq.heappush(self._heap, [key, pending.path, pending.estimate])
+
+    def _get(self):
+        key, path, _ = heapq.heappop(self._heap)
+        self._boosts.pop(path, None)
+        if self.policy == ROUND_ROBIN and path is not None:
+            self._round = max(self._round, key[1])
+        return path
+
+    def _policy_key(self, estimate):
+        if self.policy == SJF:
+            return estimate.cost
+        if self.policy == ROUND_ROBIN:
+            # A camera's next clip joins the current round at the earliest, so a
+            # camera that shows up late doesn't get a run of turns to catch up
+            turn = max(self._camera_round.get(estimate.camera, 0), self._round)
+            self._camera_round[estimate.camera] = turn + 1
+            return turn
+        return 0
+
+    # --- public API ---
+
+    def put(self, item, block=True, timeout=None):
+        estimate = None
+        if item is not None:
+            # Probe outside the queue lock; FIFO doesn't need to know anything
+            estimate = self.estimator(item) if self.estimator and self.policy != FIFO else ClipEstimate()
+        super().put(_Pending(item, estimate), block, timeout)
+        if item is not None and self.on_change:
+            self.on_change()
+
+    def boost(self, path: str, priority: int = 1) -> bool:
+        """Give a queued (or soon to be queued) clip a priority; higher runs first. Returns True if it is queued."""
+        with self.mutex:
+            if priority:
+                self._boosts[path] = priority
+            else:
+                self._boosts.pop(path, None)
+            found = False
+            for entry in self._heap:
+                if entry[1] == path:
+                    entry[0][0] = -priority
+                    found = True
+            if found:
+                heapq.heapify(self._heap)
+        if found and self.on_change:
+            self.on_change()
+        return found
+
+    def order(self) -> list[str]:
+        """Queued paths in the order they will be handed out."""
+        with self.mutex:
+            entries = sorted(self._heap)
+        return [path for _, path, _ in entries if path is not None]
+
+
+def create_queue(config: ConfigParser) -> SchedulerQueue:
+    """Build the engine queue for [Scheduler] policy and make it the active one."""
+    global _active_queue
+    policy = config.get('Scheduler', 'policy', fallback=FIFO).strip().lower()
+    _active_queue = SchedulerQueue(policy, ClipEstimator(config))
+    logging.info(f"Scheduler policy: {_active_queue.policy}")
+    return _active_queue
+
+
+def active_queue() -> SchedulerQueue | None:
+    return _active_queue
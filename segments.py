@@ -0,0 +1,99 @@
+"""
+Keyframe-aligned segment planning for chunked encodes of long clips.
+
+A long clip on a single FFmpeg process leaves cores idle at the end of a
+batch. With [Segments] enabled, processor splits such clips at source
+keyframes into N time ranges, encodes the video of each range in parallel,
+encodes the audio once over the whole clip, and joins everything with the
+concat demuxer without re-encoding.
+"""
+
+import os
+import bisect
+import logging
+from dataclasses import dataclass
+from configparser import ConfigParser
+
+
+@dataclass
+class SegmentSettings:
+    enabled: bool = False
+    min_duration: float = 600.0       # only clips at least this long (seconds)
+    segments: int | None = None       # None = auto
+    min_segment_seconds: float = 60.0
+
+
+def segment_settings(config: ConfigParser) -> SegmentSettings:
+    raw = config.get('Segments', 'segments', fallback='auto').strip().lower()
+    try:
+        segments = None if raw in ('', 'auto') else max(2, int(raw))
+    except ValueError:
+        logging.warning(f"Invalid [Segments] segments value '{raw}'; using auto.")
+        segments = None
+    return SegmentSettings(
+        enabled=config.getboolean('Segments', 'enabled', fallback=False),
+        min_duration=config.getfloat('Segments', 'min_duration', fallback=600.0),
+        segments=segments,
+        min_segment_seconds=config.getfloat('Segments', 'min_segment_seconds', fallback=60.0),
+    )
+
+
+def keyframe_probe_cmd(input_path: str, ffprobe_path: str) -> list[str]:
+    """ffprobe command listing the first video stream's packets (reads packets, no decoding)."""
+    return [
+        ffprobe_path,
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        input_path
+    ]
+
+
+def keyframe_times(probe_output: str) -> list[float]:
+    """Sorted presentation times of the keyframes in keyframe_probe_cmd's output."""
+    times = []
+    for line in probe_output.splitlines():
+        pts, _, flags = line.partition(',')
+        if 'K' not in flags:
+            continue
+        try:
+            times.append(float(pts))
+        except ValueError:
+            continue
+    times.sort()
+    return times
+
+
+def plan_segments(duration: float, keyframes: list[float], count: int, min_segment_seconds: float) -> list[tuple[float, float | None]]:
+    """
+    Split [0, duration) into up to `count` ranges whose boundaries sit on
+    keyframes. The last range is open-ended (None) so it runs to the end of
+    the source. Returns [] when the clip can't be usefully split.
+    """
+    count = min(count, int(duration // max(min_segment_seconds, 1)))
+    if count < 2 or not keyframes:
+        return []
+    boundaries = []
+    for i in range(1, count):
+        target = duration * i / count
+        idx = bisect.bisect_left(keyframes, target)
+        candidates = [keyframes[j] for j in (idx - 1, idx) if 0 <= j < len(keyframes)]
+        cut = min(candidates, key=lambda t: abs(t - target))
+        previous = boundaries[-1] if boundaries else 0.0
+        # Skip cuts that would leave a sliver of a segment on either side
+        if cut - previous >= min_segment_seconds / 2 and duration - cut >= min_segment_seconds / 2:
+            boundaries.append(cut)
+    if not boundaries:
+        return []
+    starts = [0.0] + boundaries
+    ends = boundaries + [None]
+    return list(zip(starts, ends))
+
+
+def write_concat_list(list_path: str, files: list[str]):
+    """Write a concat demuxer list (paths quoted for the demuxer's parser)."""
+    with open(list_path, 'w') as f:
+        for path in files:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
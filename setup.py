@@ -53,6 +53,20 @@ OPTIONS = {
         'main',
         'processor',
         'api_server',
+        'probe_cache',
+        'pipeline',
+        'scanner',
+        'control',
+        'status',
+        'history',
+        'journal',
+        'scheduler',
+        'farm',
+        'events',
+        'metrics',
+        'thread_budget',
+        'segments',
+        'fingerprint',
         'configparser',
         'json',
         'threading',
@@ -62,6 +76,7 @@ OPTIONS = {
         'atexit',
         'logging',
         'subprocess',
+        'sqlite3',
     ],
     'frameworks': [],
     'resources': [
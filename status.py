@@ -0,0 +1,179 @@
+"""
+Coalescing status publisher for status.json.
+
+FFmpeg reports progress on every stderr line and ART once a second; rewriting
+status.json for each of those made the output drive busy and let readers catch
+a half-written file. A StatusPublisher keeps the latest status in memory,
+serves it directly to the API and GUI, and writes it to disk at most
+rate_hz times per second (tmp file + os.replace, so readers only ever see a
+complete document). The most recent update is always the one that lands.
+
+Several clips encode at once, so status is kept per clip (keyed by "file").
+The top-level fields mirror the most recently updated clip, "jobs" lists
+every clip in flight, and the engine only reports idle once the last of
+them has finished.
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+
+from events import event_bus
+
+DEFAULT_RATE_HZ = 4.0
+
+IDLE_STATUS = {"status": "idle", "file": "None", "progress": 0, "stage": "Idle"}
+
+_publishers = {}
+_publishers_lock = threading.Lock()
+
+
+class StatusPublisher:
+    """In-memory status with throttled, atomic writes to status_path."""
+
+    def __init__(self, status_path: str, rate_hz: float = DEFAULT_RATE_HZ):
+        self.status_path = status_path
+        self.rate_hz = rate_hz
+        self._state = dict(IDLE_STATUS)
+        self._jobs = {}  # file -> its latest status, least recently updated first
+        self._dirty = False
+        self._last_write = 0.0
+        self._cond = threading.Condition()
+        self._thread = None
+        # Disk writes happen outside _cond; the sequence keeps an older snapshot from landing last
+        self._write_lock = threading.Lock()
+        self._taken_seq = 0
+        self._written_seq = 0
+
+    @property
+    def min_interval(self) -> float:
+        return 1.0 / self.rate_hz if self.rate_hz > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        """Return a copy of the current status."""
+        with self._cond:
+            return dict(self._state)
+
+    def publish(self, status_data: dict):
+        """
+        Update the status of status_data["file"]; an idle status clears every
+        clip. The file is updated within 1/rate_hz seconds.
+        """
+        with self._cond:
+            if status_data.get("status") == "idle":
+                self._jobs.clear()
+            else:
+                file = status_data.get("file")
+                self._jobs.pop(file, None)
+                self._jobs[file] = dict(status_data)
+            pending = self._changed_locked()
+        if pending:
+            self._write(*pending)
+
+    def finish(self, file: str):
+        """Drop a clip that has left the pipeline; status goes idle with the last one."""
+        with self._cond:
+            if self._jobs.pop(file, None) is None and self._jobs:
+                return
+            pending = self._changed_locked()
+        if pending:
+            self._write(*pending)
+
+    def _changed_locked(self):
+        # Caller holds the condition; returns a snapshot the caller must _write() when unthrottled
+        if self._jobs:
+            self._state = dict(next(reversed(self._jobs.values())))
+            self._state["active"] = len(self._jobs)
+            self._state["jobs"] = [dict(job) for job in self._jobs.values()]
+        else:
+            self._state = dict(IDLE_STATUS)
+        self._dirty = True
+        if self.min_interval == 0:
+            return self._take_locked()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name="status-publisher", daemon=True)
+            self._thread.start()
+        self._cond.notify()
+        return None
+
+    def flush(self):
+        """Write any pending status immediately."""
+        with self._cond:
+            if not self._dirty:
+                return
+            pending = self._take_locked()
+        self._write(*pending)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._dirty)
+                delay = self._last_write + self.min_interval - time.monotonic()
+                if delay > 0:
+                    # Let further updates coalesce into this write
+                    self._cond.wait(delay)
+                    continue
+                pending = self._take_locked()
+            self._write(*pending)
+
+    def _take_locked(self) -> tuple[int, str]:
+        # Caller holds the condition; the slow disk write is left to _write()
+        event_bus.publish("status", dict(self._state))
+        self._dirty = False
+        self._last_write = time.monotonic()
+        self._taken_seq += 1
+        return self._taken_seq, json.dumps(self._state)
+
+    def _write(self, seq: int, data: str):
+        # Runs without _cond, so a slow output drive (SMB, USB) never holds up publish()
+        with self._write_lock:
+            if seq <= self._written_seq:
+                return
+            self._written_seq = seq
+            tmp_path = f"{self.status_path}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.status_path)
+            except Exception as e:
+                logging.error(f"Failed to write status file {self.status_path}: {e}")
+
+
+def get_status_publisher(status_path: str, rate_hz: float | None = None) -> StatusPublisher:
+    """Return the process-wide publisher for status_path, optionally updating its rate."""
+    key = os.path.abspath(os.path.expanduser(status_path))
+    with _publishers_lock:
+        publisher = _publishers.get(key)
+        if publisher is None:
+            publisher = StatusPublisher(key, DEFAULT_RATE_HZ if rate_hz is None else rate_hz)
+            _publishers[key] = publisher
+        elif rate_hz is not None:
+            publisher.rate_hz = rate_hz
+        return publisher
+
+
+def read_status(status_path: str) -> dict:
+    """
+    Return the current status for status_path: the in-memory state when the
+    engine runs in this process, otherwise the last copy written to disk.
+    """
+    key = os.path.abspath(os.path.expanduser(status_path))
+    with _publishers_lock:
+        publisher = _publishers.get(key)
+    if publisher is not None:
+        return publisher.snapshot()
+    if not os.path.exists(key):
+        return dict(IDLE_STATUS)
+    with open(key, 'r') as f:
+        return json.load(f)
+
+
+@atexit.register
+def _flush_all():
+    with _publishers_lock:
+        publishers = list(_publishers.values())
+    for publisher in publishers:
+        publisher.flush()
@@ -0,0 +1,107 @@
+"""
+CPU thread budgets for concurrent FFmpeg encodes.
+
+Left alone, every FFmpeg process sizes its decoder, filter and encoder thread
+pools to the whole machine, so two or three clips encoding at once badly
+oversubscribe the CPU. Presets declare how well their encoder scales inside
+one process (DNxHD poorly, x264/x265 well). The planner uses that to decide
+how many encodes to run side by side and hands each one a share of the CPUs
+when it starts.
+"""
+
+import os
+import logging
+import threading
+from contextlib import contextmanager
+
+# Threads one encode of each scaling class can keep busy
+SCALING_THREADS = {"poor": 4, "moderate": 8, "good": 16}
+
+# Scaling assumed for presets that don't declare one
+CODEC_SCALING = {
+    "dnxhd": "poor",
+    "prores": "moderate",
+    "prores_ks": "moderate",
+    "libx264": "good",
+    "libx265": "good",
+}
+
+
+def preset_scaling(preset: dict) -> str:
+    scaling = (preset.get("scaling") or "").strip().lower()
+    if scaling in SCALING_THREADS:
+        return scaling
+    return CODEC_SCALING.get(preset.get("vcodec", ""), "moderate")
+
+
+def useful_threads(preset: dict) -> int:
+    """Threads a single encode of this preset can use well ([Preset.*] threads overrides)."""
+    try:
+        fixed = int(preset.get("threads") or 0)
+    except ValueError:
+        fixed = 0
+    return fixed if fixed > 0 else SCALING_THREADS[preset_scaling(preset)]
+
+
+class ThreadPlanner:
+    """Splits the CPU budget between the encodes running at the same time."""
+
+    def __init__(self, cpu_count: int | None = None):
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+        # Encode slots the pipeline runs; budgets assume they all fill up, so an
+        # early job never takes threads a later one will need
+        self.planned_jobs = 1
+        self._active = 0
+        self._in_use = 0  # threads handed out by reserve() and borrow_idle()
+        self._lock = threading.Lock()
+
+    def recommended_jobs(self, preset: dict) -> int:
+        """Many jobs x few threads for poorly scaling encoders, few jobs x many threads otherwise."""
+        return max(1, self.cpu_count // useful_threads(preset))
+
+    @contextmanager
+    def reserve(self, preset: dict):
+        """Count an encode as active for the duration and yield its thread budget."""
+        with self._lock:
+            self._active += 1
+            threads = max(1, min(useful_threads(preset), self.cpu_count // max(self._active, self.planned_jobs)))
+            self._in_use += threads
+        try:
+            yield threads
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._in_use -= threads
+
+    @contextmanager
+    def borrow_idle(self, limit: int):
+        """
+        Hold up to `limit` CPUs that no running encode has reserved and yield
+        how many (possibly 0). Lets a segmented encode spread over cores left
+        idle when it is the last clip of a batch. Encodes that start meanwhile
+        still get their full share from reserve().
+        """
+        with self._lock:
+            extra = max(0, min(limit, self.cpu_count - self._in_use))
+            self._in_use += extra
+        try:
+            yield extra
+        finally:
+            with self._lock:
+                self._in_use -= extra
+
+    def configure(self, value: str | None):
+        """Apply [Pipeline] cpu_budget: auto (all CPUs) or a CPU count."""
+        raw = (value or 'auto').strip().lower()
+        if raw in ('', 'auto'):
+            self.cpu_count = os.cpu_count() or 1
+            return
+        try:
+            self.cpu_count = max(1, int(raw))
+        except ValueError:
+            logging.warning(f"Invalid [Pipeline] cpu_budget value '{raw}'; using all CPUs.")
+            self.cpu_count = os.cpu_count() or 1
+
+
+# Process-wide planner shared by every encode stage thread
+thread_planner = ThreadPlanner()